@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Micro benchmarks for cardtable cards.
+
+Run from the repository root:  python benchmarks/bench_cardtable.py
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from handnfoot import cardtable
+
+def shoe_memory(num_packs = 5, backs = None) -> int:
+    """ Bytes allocated while building a shoe of num_packs packs """
+    if backs is None:
+        backs = [None] * num_packs
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    packs = [cardtable.Pack(back) for back in backs]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del packs
+    return after - before
+
+def setup_seconds(number = 2000) -> tuple:
+    """ Seconds to get a ready-to-shuffle 5-pack pile from Packs, and from a reused Shoe """
+    backs = ['B1', 'R1', 'B2', 'R2', 'B3']
+    def from_packs():
+        pile = cardtable.Pile()
+        for back in backs:
+            pile.add(cardtable.Pack(back).get_pile())
+        return pile
+    shoe = cardtable.Shoe(backs = backs)
+    return (timeit.timeit(from_packs, number = number) / number,
+        timeit.timeit(shoe.get_pile, number = number) / number)
+
+def per_call(stmt, card, number = 200000) -> float:
+    """ Seconds per call of stmt """
+    return timeit.timeit(stmt, globals={"card": card}, number=number) / number
+
+if __name__ == "__main__":
+    card = cardtable.Card.parse("QD")
+    print(f"5-pack shoe memory: {shoe_memory(5) / 1024:.1f} KiB")
+    print(f"5-pack shoe memory, backs reused: {shoe_memory(5, backs = ['B1', 'R1', 'B2', 'R2', 'B3']) / 1024:.1f} KiB")
+    from_packs, from_shoe = setup_seconds()
+    print(f"5-pack pile from Packs: {from_packs * 1e6:.1f}us, from a Shoe: {from_shoe * 1e6:.1f}us")
+    print(f"get_shorthand: {per_call('card.get_shorthand()', card) * 1e9:.0f} ns/call")
+    print(f"get_color:     {per_call('card.get_color()', card) * 1e9:.0f} ns/call")
+    print(f"is_face_card:  {per_call('card.is_face_card()', card) * 1e9:.0f} ns/call")
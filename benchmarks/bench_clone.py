@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+"""
+Cost of copying a mid-round four player game: HNFGame.clone against copy.deepcopy,
+and the size and speed of snapshot/restore.
+
+Run from the repository root:  python benchmarks/bench_clone.py
+"""
+import os
+import sys
+import copy
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from handnfoot import cardtable
+from handnfoot import handnfoot
+
+def mid_round_game(turns = 20) -> handnfoot.HNFGame:
+    game = handnfoot.HNFGame(seed = 1)
+    for name in ["J", "S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy())
+    game.start()
+    for turn in range(turns):
+        game.play_turn(game.players[turn % len(game.players)])
+    return game
+
+def per_call_us(func, number) -> float:
+    return min(timeit.repeat(func, number = number, repeat = 5)) / number * 1e6
+
+if __name__ == "__main__":
+    game = mid_round_game()
+    memo = {id(game.rules): game.rules, id(game.modifiers): game.modifiers, id(game.shoe): game.shoe}
+    snapshot = game.snapshot()
+    print(f"clone:    {per_call_us(game.clone, 2000):.1f} us")
+    print(f"deepcopy: {per_call_us(lambda: copy.deepcopy(game, dict(memo)), 50):.1f} us")
+    print(f"snapshot: {per_call_us(game.snapshot, 2000):.1f} us, {len(snapshot)} bytes")
+    print(f"restore:  {per_call_us(lambda: game.restore(snapshot), 2000):.1f} us")
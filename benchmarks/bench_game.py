@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Time per play_turn over whole rounds of a four player game, and whole games per second
+from HNFGame.run_game.
+
+Run from the repository root:  python benchmarks/bench_game.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from handnfoot import cardtable
+from handnfoot import handnfoot
+
+PLAYERS = [("J", 5, 1.2), ("S", 10, 1), ("L", 7, 1), ("A", 15, .9)]
+
+def turn_seconds(num_rounds = 50, max_turns = 400) -> float:
+    """ Mean seconds per play_turn over num_rounds first rounds, of at most max_turns turns each """
+    total = 0.0
+    turns = 0
+    for round_idx in range(num_rounds):
+        game = handnfoot.HNFGame(seed = round_idx)
+        for name, precision, speed in PLAYERS:
+            game.add_player(cardtable.Player(name, precision = precision, speed = speed), handnfoot.Strategy())
+        game.start()
+        round_turns = 0
+        start = time.perf_counter()
+        while not game.round_complete and round_turns < max_turns:
+            try:
+                game.play_turn(game.players[round_turns % len(game.players)])
+            except (ValueError, IndexError):
+                break # Draw piles ran out
+            round_turns += 1
+        total += time.perf_counter() - start
+        turns += round_turns
+    return total / turns
+
+def games_per_second(num_games = 50) -> float:
+    """ Full four round games per second, including setup """
+    start = time.perf_counter()
+    for seed in range(num_games):
+        game = handnfoot.HNFGame(seed = seed)
+        for name, precision, speed in PLAYERS:
+            game.add_player(cardtable.Player(name, precision = precision, speed = speed), handnfoot.Strategy())
+        game.run_game()
+    return num_games / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    print(f"play_turn: {turn_seconds() * 1e6:.0f}us/turn")
+    print(f"run_game: {games_per_second():.1f} games/s")
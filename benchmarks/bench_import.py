@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Time to import handnfoot.handnfoot in a fresh interpreter, as a worker process would.
+
+Fails if the best of several runs is over IMPORT_BUDGET_SECONDS, or if the import
+prints anything or loads NumPy. Bytecode caching is always on for the children, since
+installed packages have their .pyc files.
+
+Run from the repository root:  python benchmarks/bench_import.py
+"""
+import os
+import sys
+import subprocess
+
+IMPORT_BUDGET_SECONDS = 0.05
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CHILD = """
+import sys
+import time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import handnfoot.handnfoot
+seconds = time.perf_counter() - start
+sys.stderr.write(f"{seconds} {'numpy' in sys.modules}")
+"""
+
+def import_seconds(runs = 7) -> float:
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", CHILD, ROOT], capture_output = True, text = True, check = True, env = env)
+        assert result.stdout == "", "Import printed: "+result.stdout
+        seconds, numpy_loaded = result.stderr.split()
+        assert numpy_loaded == "False", "Import loaded NumPy"
+        if best is None or float(seconds) < best:
+            best = float(seconds)
+    return best
+
+if __name__ == "__main__":
+    seconds = import_seconds()
+    print(f"import handnfoot.handnfoot: {seconds * 1e3:.1f}ms (budget {IMPORT_BUDGET_SECONDS * 1e3:.0f}ms)")
+    assert seconds < IMPORT_BUDGET_SECONDS, "Over the import time budget"
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+Compare Pile storage backends when dealing a 5-pack shoe.
+
+Run from the repository root:  python benchmarks/bench_piles.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from handnfoot import cardtable
+
+SHOE = [card for back in ["B1", "R1", "B2", "R2", "B3"] for card in cardtable.Pack(back).cards]
+
+def per_op(pile_cls, op, repeat = 2000) -> float:
+    """ Seconds per op(pile) on a fresh 5-pack pile, excluding pile construction """
+    total = 0.0
+    for _ in range(repeat):
+        pile = pile_cls(cards = list(SHOE))
+        start = time.perf_counter()
+        op(pile)
+        total += time.perf_counter() - start
+    return total / repeat
+
+OPS = {
+    "draw(11)": lambda pile: pile.draw(11),
+    "draw_pile(11)": lambda pile: pile.draw_pile(11),
+    "deal(4, 11)": lambda pile: pile.deal(4, 11),
+    "split(4)": lambda pile: pile.split(4),
+    "deal(1, 270)": lambda pile: pile.deal(1, len(SHOE)),
+}
+
+if __name__ == "__main__":
+    print(f"{'op':<16}{'Pile':>12}{'ArrayPile':>12}")
+    for name, op in OPS.items():
+        print(f"{name:<16}{per_op(cardtable.Pile, op) * 1e6:>10.1f}us{per_op(cardtable.ArrayPile, op) * 1e6:>10.1f}us")
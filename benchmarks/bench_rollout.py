@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+Rollouts per second of RolloutStrategy from a mid-round position of a four player game.
+
+Run from the repository root:  python benchmarks/bench_rollout.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from handnfoot import cardtable
+from handnfoot import handnfoot
+from handnfoot import rollout
+
+def mid_round_game(turns = 20) -> handnfoot.HNFGame:
+    game = handnfoot.HNFGame(seed = 1)
+    for name in ["J", "S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy())
+    game.start()
+    for turn in range(turns):
+        game.play_turn(game.players[turn % len(game.players)])
+    return game
+
+def rollouts_per_second(depth = None, number = 100) -> float:
+    game = mid_round_game()
+    player = game.players[0]
+    strategy = rollout.RolloutStrategy(depth = depth, seed = 0)
+    card = player.get_hand().cards[0]
+    start = time.perf_counter()
+    for _ in range(number):
+        strategy.rollout(player, card)
+    return number / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    print(f"rollout to round end: {rollouts_per_second():.0f} rollouts/s")
+    print(f"rollout 8 turns deep: {rollouts_per_second(depth = 8):.0f} rollouts/s")
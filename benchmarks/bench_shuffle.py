@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Time per shuffle for the Pile shuffle methods.
+
+Run from the repository root:  python benchmarks/bench_shuffle.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from handnfoot import cardtable
+from handnfoot import shuffling
+
+def shoe(num_packs):
+    return [card for idx in range(num_packs) for card in cardtable.Pack("S"+str(idx)).cards]
+
+def per_shuffle(cards, method, pile_cls = cardtable.Pile, repeat = 200) -> float:
+    pile = pile_cls(cards = list(cards))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        pile.shuffle(iterations = 7, precision = 10, method = method)
+    return (time.perf_counter() - start) / repeat
+
+def batch_seconds(method, num_decks = 100000, count = 54) -> float:
+    decks = shuffling.new_decks(num_decks, count)
+    start = time.perf_counter()
+    shuffling.shuffle_decks(decks, method = method, iterations = 7, precision = 10)
+    return time.perf_counter() - start
+
+def multi_quick_seconds(num_packs, num_players, seconds, repeat = 20) -> float:
+    cards = shoe(num_packs)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cardtable.Pile(cards = list(cards)).multi_quick_shuffle(num_players = num_players, seconds = seconds)
+    return (time.perf_counter() - start) / repeat
+
+if __name__ == "__main__":
+    print(f"riffle_shuffle, 1 pack:              {per_shuffle(shoe(1), cardtable.Pile.RIFFLE_SHUFFLE) * 1e6:.0f}us")
+    for num_packs in [1, 5, 6]:
+        for pile_cls in [cardtable.Pile, cardtable.ArrayPile]:
+            t = per_shuffle(shoe(num_packs), cardtable.Pile.VECTOR_RIFFLE_SHUFFLE, pile_cls = pile_cls)
+            print(f"vector_riffle_shuffle, {num_packs} pack {pile_cls.__name__ + ':':<11}{t * 1e6:.0f}us")
+    for name, method in [("perfect", shuffling.PERFECT_SHUFFLE), ("riffle", shuffling.RIFFLE_SHUFFLE), ("overhand", shuffling.OVERHAND_SHUFFLE)]:
+        print(f"shuffle_decks {name}, 100k x 1 pack: {batch_seconds(method):.2f}s")
+    for num_packs, num_players, seconds in [(5, 4, 120), (5, 4, 600), (5, 4, 3600), (12, 30, 1200)]:
+        t = multi_quick_seconds(num_packs, num_players, seconds)
+        print(f"multi_quick_shuffle, {num_packs} packs, {num_players} players, {seconds}s: {t * 1e3:.1f}ms")
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+"""
+Games per second from handnfoot.sim with one worker and with one per core.
+
+Run from the repository root:  python benchmarks/bench_sim.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from handnfoot import sim
+
+def games_per_second(workers, num_games = 200) -> float:
+    config = sim.GameConfig(players = (("J", 5, 1.2), ("S", 10, 1), ("L", 7, 1), ("A", 15, .9)), seed = 0, num_games = num_games)
+    return sim.simulate(config, workers = workers).games_per_second()
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    single = games_per_second(1)
+    print(f"1 worker: {single:.1f} games/s")
+    if cores > 1:
+        pooled = games_per_second(cores, num_games = 200 * cores)
+        print(f"{cores} workers: {pooled:.1f} games/s ({pooled / single / cores:.0%} of linear)")
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+"""
+Games a tournament uses with early stopping against a fixed-N test with the same
+error rates, for the default Strategy against one that discards at random.
+
+Run from the repository root:  python benchmarks/bench_tournament.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from handnfoot import handnfoot
+from handnfoot import tournament
+
+class RandomDiscard(handnfoot.Strategy):
+    def choose_discard(self, cards, player):
+        return cards[int(self.get_rng(player.game).integers(len(cards)))]
+
+if __name__ == "__main__":
+    config = tournament.TournamentConfig(strategies = (handnfoot.Strategy(), RandomDiscard()), seed = 0, batch_size = 10)
+    for rule in [tournament.Racing(), tournament.SPRT()]:
+        stats = tournament.run_tournament(config, rule = rule)
+        fixed = rule.fixed_matches(stats) * tournament.SEATINGS
+        print(f"{type(rule).__name__}: {tournament.decision_name(stats.decision)} after {stats.games} games"
+            f" ({stats.games_per_second():.1f} games/s), fixed-N needs {fixed} games ({fixed / stats.games:.1f}x)")
@@ -1,22 +1,37 @@
 """
 Classes for a standard deck of cards
+
+NumPy is only imported when something needs it (ArrayPile and the vectorized shuffles),
+so importing this module stays cheap for short-lived worker processes.
 """
 from __future__ import annotations
 import typing
 import itertools
-from xmlrpc.client import Boolean
-import numpy as np
 from enum import Enum
 import random
 import math
+import heapq
+import collections
+import html
+import array
 from types import SimpleNamespace
 
 BACKS = ["B", "R", "G", "Y", "K"]
+def get_back(back_idx) -> str:
+    """ Back name for the back_idx'th pack at a table: B1, R1, B2, R2, ... """
+    return (BACKS[back_idx % 2] + str(back_idx // 2 + 1))
+
 def get_next_back():
     get_next_back.back_idx += 1
-    return (BACKS[get_next_back.back_idx % 2] + str(get_next_back.back_idx // 2 + 1))
+    return get_back(get_next_back.back_idx)
 get_next_back.back_idx = -1
 
+def _random_from(rng):
+    """ random.Random seeded from the numpy Generator rng, or the random module if rng is None """
+    if rng is None:
+        return random
+    return random.Random(int(rng.integers(1 << 62)))
+
 class Color(Enum):
     RED = 1
     BLACK = 2
@@ -25,6 +40,10 @@ class Color(Enum):
     def __str__(self) -> str:
         return self.name
 
+_SUIT_SHORTHANDS = ("H", "D", "S", "C", "B", "R")
+_SUIT_FILE_NAMES = ("hearts", "diamonds", "spades", "clubs", "black", "red")
+_SUIT_COLORS = (Color.RED, Color.RED, Color.BLACK, Color.BLACK, Color.BLACK, Color.RED)
+
 class Suit(Enum):
     """ Suit of the card. e.g. Hearts.
 
@@ -37,25 +56,29 @@ class Suit(Enum):
     BLACK = 5 # For Jokers
     RED = 6 # For Jokers
     def _get_shorthands(self) -> str:
-        return ["H", "D", "S", "C", "B", "R"]
+        return _SUIT_SHORTHANDS
     def get_shorthand(self) -> str:
-        return self._get_shorthands()[self.value - 1]
+        return _SUIT_SHORTHANDS[self.value - 1]
     def _get_name_for_file(self) -> str:
-        return ["hearts", "diamonds", "spades", "clubs", "black", "red"]
+        return _SUIT_FILE_NAMES
     def get_name_for_file(self) -> str:
-        return self._get_name_for_file()[self.value - 1]
+        return _SUIT_FILE_NAMES[self.value - 1]
     def get_color(self) -> Color:
-        return [Color.RED, Color.RED, Color.BLACK, Color.BLACK, Color.BLACK, Color.RED][self.value - 1]
+        return _SUIT_COLORS[self.value - 1]
     def __repr__(self) -> str:
         return self.name+"!"
     def __str__(self) -> str:
         return self.name
     @classmethod
     def _shorthands(self) -> str:
-        return ["H", "D", "S", "C", "B", "R"]
+        return _SUIT_SHORTHANDS
     @classmethod
     def parse(cls, shorthand) -> Suit:
-        return cls(cls._shorthands().index(shorthand) + 1)
+        return cls(_SUIT_SHORTHANDS.index(shorthand) + 1)
+
+_RANK_SHORTHANDS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "*")
+_RANK_PARSE_SHORTHANDS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "*")
+_RANK_FILE_NAMES = ("ace", "2", "3", "4", "5", "6", "7", "8", "9", "10", "jack", "queen", "king", "joker")
 
 class Rank(Enum):
     """ Rank is the number of the card. E.g. Ace, Two, Jack, etc
@@ -75,55 +98,123 @@ class Rank(Enum):
     KING = 13
     JOKER = 14
     def _get_shorthands(self) -> str:
-        return ["A", "2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "*"]
+        return _RANK_SHORTHANDS
     def get_shorthand(self) -> str:
-        return self._get_shorthands()[self.value - 1]
+        return _RANK_SHORTHANDS[self.value - 1]
     def get_name(self) -> str:
         return ["Ace", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "None", "Ten", "Jack", "Queen", "King", "Ace"]
     def _get_name_for_file(self) -> str:
-        return ["ace", "2", "3", "4", "5", "6", "7", "8", "9", "10", "jack", "queen", "king", "joker"]
+        return _RANK_FILE_NAMES
     def get_name_for_file(self) -> str:
-        return self._get_name_for_file()[self.value - 1]
-    def is_face_card(self) -> Boolean:
-        if self.value >= self.JACK.value and self.value <= self.KING.value: # Jokers are not considered face cards
-            return True
-        else:
-            return False
-    def is_number_card(self) -> Boolean:
-        if self.value >= self.TWO.value and self.value <= self.TEN.value:
-            return True
-        else:
-            return False
+        return _RANK_FILE_NAMES[self.value - 1]
+    def is_face_card(self) -> bool:
+        # Jokers are not considered face cards
+        return Rank.JACK.value <= self.value <= Rank.KING.value
+    def is_number_card(self) -> bool:
+        return Rank.TWO.value <= self.value <= Rank.TEN.value
     def __repr__(self) -> str:
         return self.name+"!"
     def __str__(self) -> str:
         return self.name
     @classmethod
     def _shorthands(self) -> str:
-        return ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "*"]
+        return _RANK_PARSE_SHORTHANDS
     @classmethod
     def parse(cls, shorthand) -> Rank:
-        return cls(cls._shorthands().index(shorthand) + 1)
+        return cls(_RANK_PARSE_SHORTHANDS.index(shorthand) + 1)
+
+# Card ids pack the back, rank and suit into one small int:
+#   id = back_idx << FACE_BITS | rank.value << RANK_SHIFT | suit.value
+# The low FACE_BITS (the "face") identify the rank and suit, so per-face
+# properties are looked up in tables of NUM_FACES entries.
+RANK_SHIFT = 3
+FACE_BITS = 7
+FACE_MASK = (1 << FACE_BITS) - 1
+NUM_FACES = 1 << FACE_BITS
+
+def face_id(rank, suit) -> int:
+    return rank.value << RANK_SHIFT | suit.value
+
+def _build_face_table(fn) -> tuple:
+    table = [None] * NUM_FACES
+    for rank in Rank:
+        for suit in Suit:
+            table[face_id(rank, suit)] = fn(rank, suit)
+    return tuple(table)
+
+_FACE_RANKS = _build_face_table(lambda rank, suit: rank)
+_FACE_SUITS = _build_face_table(lambda rank, suit: suit)
+_FACE_SHORTHANDS = _build_face_table(lambda rank, suit: rank.get_shorthand() + suit.get_shorthand())
+_FACE_COLORS = _build_face_table(lambda rank, suit: suit.get_color())
+_FACE_IS_FACE_CARD = _build_face_table(lambda rank, suit: rank.is_face_card())
+_FACE_IS_NUMBER_CARD = _build_face_table(lambda rank, suit: rank.is_number_card())
+
+# Backs are interned to small ints so they fit in a card id.
+# _CARDS_BY_ID is indexed by card id and grows by NUM_FACES slots per back.
+_BACK_NAMES = []
+_BACK_IDS = {}
+_CARDS_BY_ID = []
+def _get_back_id(back) -> int:
+    back_id = _BACK_IDS.get(back)
+    if back_id is None:
+        back_id = len(_BACK_NAMES)
+        _BACK_NAMES.append(back)
+        _BACK_IDS[back] = back_id
+        _CARDS_BY_ID.extend([None] * NUM_FACES)
+    return back_id
 
 class Card:
     """
     Defines a card
+
+    Cards are immutable flyweights: Card(rank, suit, back) always returns the
+    same instance, identified by a small integer id (see face_id).
     """
-    rank = suit = back = None
-    def __init__(self, rank, suit, back = ""):
-        self.rank = rank
-        self.suit = suit
-        self.back = back
+    __slots__ = ("face", "back_id", "rank", "suit")
+    def __new__(cls, rank, suit, back = ""):
+        back_id = _get_back_id(back)
+        face = rank.value << RANK_SHIFT | suit.value
+        card = _CARDS_BY_ID[back_id << FACE_BITS | face]
+        if card is None:
+            card = object.__new__(cls)
+            card.face = face
+            card.back_id = back_id
+            card.rank = rank
+            card.suit = suit
+            _CARDS_BY_ID[back_id << FACE_BITS | face] = card
+        return card
+    def __reduce__(self):
+        # Back ids are per process, so pickle by value and re-intern on load
+        return (Card, (self.rank, self.suit, self.back))
+    def __copy__(self):
+        return self
+    def __deepcopy__(self, memo):
+        return self
+    @property
+    def id(self) -> int:
+        return self.back_id << FACE_BITS | self.face
+    @property
+    def back(self):
+        return _BACK_NAMES[self.back_id]
+    @classmethod
+    def from_id(cls, card_id) -> Card:
+        card = _CARDS_BY_ID[card_id]
+        if card is None:
+            face = card_id & FACE_MASK
+            card = cls(_FACE_RANKS[face], _FACE_SUITS[face], _BACK_NAMES[card_id >> FACE_BITS])
+        return card
     def _parse(shorthand):
         shorthand = Suit.HEARTS
     def __repr__(self) -> str:
         return (str(self.back)+" "+str(self.rank)+" of "+str(self.suit)).strip() # +" is "+str(self.suit.get_color())
     def get_shorthand(self) -> str:
-        return self.rank.get_shorthand()+self.suit.get_shorthand()
-    def is_face_card(self) -> Boolean:
-        return self.rank.is_face_card()
+        return _FACE_SHORTHANDS[self.face]
+    def is_face_card(self) -> bool:
+        return _FACE_IS_FACE_CARD[self.face]
+    def is_number_card(self) -> bool:
+        return _FACE_IS_NUMBER_CARD[self.face]
     def get_color(self) -> Color:
-        return self.suit.get_color()
+        return _FACE_COLORS[self.face]
     def count_eyes(self) -> int:
         if self.rank == Rank.JOKER:
             return 2
@@ -134,10 +225,32 @@ class Card:
         elif self.rank == Rank.JOKER:
             return 2
         return 0
-    def is_wild(self):
-        return (Modifiers.card_is_wild(self))
-    def get_HTML(self, type="png") -> str:
+    def is_wild(self, modifiers=None):
+        if modifiers is None:
+            modifiers = Modifiers
+        return modifiers.wild_faces[self.face]
+    def get_HTML(self, type=None) -> str:
+        """ HTML for the card face, built once per face and type.
+
+        "sprite" (the default) is an empty span placed on the sprite sheet by the
+        cardtable_r* and cardtable_s* classes in styles/cardtable.css, "png" an img
+        per card and "unicode" the playing card character.
+        """
+        if type is None:
+            type = HTML_TYPE
+        fragments = _CARD_HTML.get(type)
+        if fragments is None:
+            if type not in ("sprite", "png", "unicode"):
+                raise ValueError("Unknown get_HTML type: "+str(type))
+            fragments = _CARD_HTML[type] = [None] * NUM_FACES
+        s = fragments[self.face]
+        if s is None:
+            s = fragments[self.face] = self._build_HTML(type)
+        return s
+    def _build_HTML(self, type) -> str:
         match type:
+            case "sprite":
+                s = f'<span class="cardtable_card cardtable_sprite cardtable_r{self.rank.value} cardtable_s{self.suit.value}"></span>'
             case "png":
                 image_path = "handnfoot/pcassets/png"
                 file_name = self.get_name_for_file()
@@ -146,8 +259,6 @@ class Card:
                 s = '<span style="background:white;color:'+str(self.get_color())+'">'
                 s += self.get_unicode()
                 s += '</span>'
-            case _:
-                raise("Unknown get_HTML type")
         return s
     def get_name_for_file(self) -> str:
         if self.suit == Suit.RED or self.suit == Suit.BLACK:
@@ -180,172 +291,397 @@ class Card:
                 code += self.rank.value + 1 #skip the "Knight" card
         #print(code)
         return chr(code)
-    def get_meld_type(self, method=None) -> str:
+    def get_meld_type(self, method=None, modifiers=None) -> int:
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
-        return Meld.get_card_meld_type(self, method)
+            method = modifiers.meld_method
+        return modifiers.get_meld_type_table(method)[self.face]
     @classmethod
     def parse(cls, shorthand, back = "") -> Card:
         return cls(Rank.parse(shorthand[0]), Suit.parse(shorthand[1]), back)
     @classmethod
-    def get_wilds(cls, cards) -> typing.List['Card']:
+    def get_wilds(cls, cards, modifiers=None) -> typing.List['Card']:
         wilds = []
         for card in cards:
-            if card.is_wild():
+            if card.is_wild(modifiers):
                 wilds.append(card)
         return wilds
     @classmethod
-    def count_wilds(cls, cards) -> int:
+    def count_wilds(cls, cards, modifiers=None) -> int:
         wild_cnt = 0
         for card in cards:
-            if card.is_wild():
+            if card.is_wild(modifiers):
                 wild_cnt += 1
         return wild_cnt
 
+HTML_TYPE = "sprite" # Default Card.get_HTML type
+CARD_BACK_HTML = '<span class="cardtable_card cardtable_sprite cardtable_back"></span>'
+_CARD_HTML = dict() # get_HTML type -> fragment per face, filled in as faces are rendered
+
+# Faces of a pack in order: each Rank of each Suit, then the jokers
+_PACK_FACES = tuple(face_id(rank, suit) for rank, suit in itertools.product(Rank, Suit)
+    if rank is not Rank.JOKER and suit is not Suit.BLACK and suit is not Suit.RED)
+_JOKER_FACES = (face_id(Rank.JOKER, Suit.BLACK), face_id(Rank.JOKER, Suit.RED))
+
+def pack_faces(jokers = 2) -> tuple:
+    """ Faces of a pack with the given number of jokers, alternating black and red """
+    if jokers < 0:
+        raise ValueError("Can't have "+str(jokers)+" jokers")
+    return _PACK_FACES + tuple(_JOKER_FACES[idx % 2] for idx in range(jokers))
+
 class Pack:
     """
     Defines a pack of cards, i.e. a deck that comes scrinkwrapped.
-    For a group of cards stacked as a deck, see Pile.
+    For a group of cards stacked as a deck, see Pile. For many packs, see Shoe.
     """
     back = cards = None
-    def __init__(self, back = None):
+    def __init__(self, back = None, jokers = 2):
         if back == None:
             back = get_next_back()
         self.back = back
-        self.cards = []
-        for r in itertools.product([e for e in Rank], [e for e in Suit]):
-            if r[0] is not Rank.JOKER and r[1] is not Suit.BLACK and r[1] is not Suit.RED:
-                self.cards.append(Card(r[0], r[1], self.back))
-        self.cards.append(Card(Rank.JOKER, Suit.BLACK, self.back))
-        self.cards.append(Card(Rank.JOKER, Suit.RED, self.back))
-        #print(self.cards)
-    def get_pile(self, face_up = False) -> Pile:
-        return Pile(self.cards)
+        card_base = _get_back_id(back) << FACE_BITS
+        self.cards = [Card.from_id(card_base | face) for face in pack_faces(jokers)]
+    def get_pile(self, face_up = False, pile_cls = None) -> Pile:
+        if pile_cls is None:
+            pile_cls = Pile
+        return pile_cls(self.cards)
+
+class Shoe:
+    """
+    Several packs of cards to shuffle together, one per back.
+
+    The cards are looked up once from the template pack faces. get_pile then hands out
+    every card in pack order in one step, so a Shoe can be reused each round without
+    building cards again.
+    """
+    backs = jokers = cards = _ids = None
+    def __init__(self, num_packs = None, backs = None, jokers = 2):
+        if backs is None:
+            if num_packs is None:
+                raise ValueError("Shoe needs num_packs or backs")
+            backs = [get_back(back_idx) for back_idx in range(num_packs)]
+        elif num_packs is not None and num_packs != len(backs):
+            raise ValueError("Expected "+str(num_packs)+" backs, got "+str(len(backs)))
+        self.backs = list(backs)
+        self.jokers = jokers
+        faces = pack_faces(jokers)
+        self.cards = tuple(Card.from_id(_get_back_id(back) << FACE_BITS | face) for back in self.backs for face in faces)
+    def __len__(self):
+        return len(self.cards)
+    def get_ids(self) -> np.ndarray:
+        """ Card ids in pack order, as a read-only array shared by every pile from get_pile """
+        if self._ids is None:
+            self._ids = card_ids(self.cards)
+            self._ids.flags.writeable = False
+        return self._ids
+    def get_pile(self, face_up = False, pile_cls = None) -> Pile:
+        if pile_cls is None:
+            pile_cls = Pile
+        if issubclass(pile_cls, ArrayPile):
+            # ArrayPile copies ids it was given before writing to them, so it can share ours
+            return pile_cls(ids = self.get_ids(), face_up = face_up)
+        return pile_cls(cards = list(self.cards), face_up = face_up)
 
 class Meld(list):
     """ Represents a set of cards that match.
 
     RANK meld are cards that have the same rank (e.g. n of a kind)
     RANKCOLOR meld are cards that have the same rank (value) and color (red or black)
+
+    Meld types are small int codes, WILD for wild cards, looked up per card face in a
+    table for the meld method and wild ranks (see CardModifiers.get_meld_type_table).
+    Use get_type_name to display them.
     """
     RANK = 1
     RANKCOLOR = 2
-    def __init__(self, method=None, cards = []):
+    WILD = 0
+    _RANKCOLOR_BASE = 32 # RANKCOLOR codes follow the RANK codes (rank values)
+    def __init__(self, method=None, cards = [], modifiers=None):
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
+            method = modifiers.meld_method
         self.method = method
+        self.modifiers = modifiers
         if cards:
             super(Meld, self).__init__(cards)
         else:
             super(Meld, self).__init__()
-    def get_type(self) -> str:
+    def get_type(self) -> int:
         if len(self):
-            return Meld.get_card_meld_type(card = self[0], method = self.method)
+            return Meld.get_card_meld_type(card = self[0], method = self.method, modifiers = self.modifiers)
         else:
             return None
     @classmethod
-    def get_card_meld_type(cls, card, method=None) -> str:
+    def build_type_table(cls, method, wild_faces) -> tuple:
+        """ Meld type code for each card face """
+        match method:
+            case cls.RANK:
+                code = lambda rank, suit: rank.value
+            case cls.RANKCOLOR:
+                code = lambda rank, suit: cls._RANKCOLOR_BASE + (rank.value << 1) + suit.get_color().value - 1
+            case _:
+                raise ValueError("Unknown method "+str(method))
+        return tuple(cls.WILD if wild else meld_type for wild, meld_type in zip(wild_faces, _build_face_table(code)))
+    @classmethod
+    def get_type_name(cls, meld_type) -> str:
+        """ Display name of a meld type code, e.g. "A", "ABLACK" or "WILD" """
+        if meld_type is None:
+            return str(None)
+        if meld_type == cls.WILD:
+            return "WILD"
+        if meld_type < cls._RANKCOLOR_BASE:
+            return Rank(meld_type).get_shorthand()
+        rank_color = meld_type - cls._RANKCOLOR_BASE
+        return Rank(rank_color >> 1).get_shorthand() + str(Color((rank_color & 1) + 1))
+    @classmethod
+    def get_card_meld_type(cls, card, method=None, modifiers=None) -> int:
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
-        if card.is_wild():
-            meld_type = "WILD"
-        else:
-            match method:
-                case cls.RANK:
-                    meld_type = card.rank.get_shorthand()
-                case cls.RANKCOLOR:
-                    meld_type = card.rank.get_shorthand() + str(card.get_color())
-                case _:
-                    raise ValueError("Unknown method "+str(method))
-        return meld_type
+            method = modifiers.meld_method
+        return modifiers.get_meld_type_table(method)[card.face]
     @classmethod
-    def cards_include_meld_type(cls, cards, meld_type, method=None) -> Boolean:
+    def cards_include_meld_type(cls, cards, meld_type, method=None, modifiers=None) -> bool:
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
+            method = modifiers.meld_method
         for card in cards:
-            if Meld.get_card_meld_type(card, method) == meld_type:
+            if Meld.get_card_meld_type(card, method, modifiers) == meld_type:
                 return True
         return False
     @classmethod
-    def get_melds(cls, cards, method=None, exclude_wilds=False) -> typing.List['Meld']:
+    def get_melds(cls, cards, method=None, exclude_wilds=False, modifiers=None) -> typing.List['Meld']:
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
+            method = modifiers.meld_method
         if len(cards) == 0:
             return []
         melds = dict()
         for card in cards:
-            meld_type = cls.get_card_meld_type(card, method)
-            if meld_type == "WILD" and exclude_wilds:
+            meld_type = cls.get_card_meld_type(card, method, modifiers)
+            if meld_type == Meld.WILD and exclude_wilds:
                 continue
             if meld_type not in melds:
-                melds[meld_type] = Meld(method = method)
+                melds[meld_type] = Meld(method = method, modifiers = modifiers)
             melds[meld_type].append(card)
         return list(melds.values()) # Return just the melds, not their type names
     @classmethod
-    def get_cards_by_meld(cls, cards, meld_type) -> typing.List['Card']:
+    def get_cards_by_meld(cls, cards, meld_type, modifiers=None) -> typing.List['Card']:
         matches = []
         for card in cards:
-            if meld_type == cls.get_card_meld_type(card):
+            if meld_type == cls.get_card_meld_type(card, modifiers = modifiers):
                 matches.append(card)
         return matches
 
 
+class MeldIndex():
+    """ The cards of a group bucketed by meld type, for one meld type table.
+
+    Buckets are kept in the order their meld type first appeared.
+    """
+    def __init__(self, cards, table):
+        self.table = table
+        self.buckets = dict()
+        self.add(cards)
+    def add(self, cards) -> None:
+        buckets = self.buckets
+        table = self.table
+        for card in cards:
+            meld_type = table[card.face]
+            bucket = buckets.get(meld_type)
+            if bucket is None:
+                buckets[meld_type] = [card]
+            else:
+                bucket.append(card)
+    def remove(self, cards) -> None:
+        buckets = self.buckets
+        table = self.table
+        for card in cards:
+            meld_type = table[card.face]
+            bucket = buckets[meld_type]
+            bucket.remove(card)
+            if not bucket:
+                del buckets[meld_type]
+    def clone(self) -> 'MeldIndex':
+        index = object.__new__(MeldIndex)
+        index.table = self.table
+        index.buckets = {meld_type: list(bucket) for meld_type, bucket in self.buckets.items()}
+        return index
+
 class CardGroup():
-    cards = None
+    """
+    Base for groups of cards.
+
+    Meld queries read from a MeldIndex per meld method, built on first use and then
+    updated by add, push, pop and remove. Assigning cards, or querying with changed
+    modifiers, rebuilds it on the next query, so change groups through their methods or by
+    assigning cards rather than by mutating the cards list. version goes up with each of
+    those changes, so callers can tell whether something they worked out is stale.
+    get_face_total keeps a running total the same way.
+
+    meld_type is the meld type the group was laid down as, if any, so a group of only
+    wilds is still found by it.
+    """
+    _cards = None
+    _meld_indexes = None
+    _total_table = None
+    _total = 0
+    version = 0
+    meld_type = None
+    @property
+    def cards(self) -> typing.List['Card']:
+        return self._cards
+    @cards.setter
+    def cards(self, cards) -> None:
+        self._cards = cards
+        self._meld_indexes = None
+        self._total_table = None
+        self.version += 1
+    def _get_meld_index(self, method, modifiers) -> MeldIndex:
+        if self._meld_indexes is None:
+            self._meld_indexes = dict()
+        table = modifiers.get_meld_type_table(method)
+        index = self._meld_indexes.get(method)
+        if index is None or index.table is not table:
+            index = MeldIndex(self.cards, table)
+            self._meld_indexes[method] = index
+        return index
+    def _index_add(self, cards) -> None:
+        self.version += 1
+        table = self._total_table
+        if table is not None:
+            for card in cards:
+                self._total += table[card.face]
+        if self._meld_indexes:
+            for index in self._meld_indexes.values():
+                index.add(cards)
+    def _index_remove(self, cards) -> None:
+        self.version += 1
+        table = self._total_table
+        if table is not None:
+            for card in cards:
+                self._total -= table[card.face]
+        if self._meld_indexes:
+            for index in self._meld_indexes.values():
+                index.remove(cards)
+    def clone(self) -> 'CardGroup':
+        """ Copy of the group, sharing the cards but with its own list and indexes.
+
+        Other attributes (e.g. face_up) are copied as they are.
+        """
+        group = object.__new__(type(self))
+        group.__dict__.update(self.__dict__)
+        if self._cards is not None:
+            group._cards = list(self._cards)
+        if self._meld_indexes:
+            group._meld_indexes = {method: index.clone() for method, index in self._meld_indexes.items()}
+        return group
     def count(self) -> int:
         return len(self.cards)
     def __str__(self) -> str:
         return str(self)
-    def get_melds(self, method=None, exclude_wilds=False) -> typing.List['Meld']:
+    def get_melds(self, method=None, exclude_wilds=False, modifiers=None) -> typing.List['Meld']:
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
-        return Meld.get_melds(cards = self.cards, method = method, exclude_wilds=exclude_wilds)
-    def get_wilds(self) -> typing.List['Card']:
-        return Card.get_wilds(cards = self.cards)
-    def count_wilds(self) -> int:
-        return Card.count_wilds(self.cards)
-    def get_cards_by_meld(self, meld_type) -> typing.List['Card']:
-        return Meld.get_cards_by_meld(self.cards, meld_type)
-    def count_melds(self, method=None, exclude_wilds=False) -> int:
+            method = modifiers.meld_method
+        melds = []
+        for meld_type, bucket in self._get_meld_index(method, modifiers).buckets.items():
+            if meld_type == Meld.WILD and exclude_wilds:
+                continue
+            melds.append(Meld(method = method, cards = bucket, modifiers = modifiers))
+        return melds
+    def get_wilds(self, modifiers=None) -> typing.List['Card']:
+        if modifiers is None:
+            modifiers = Modifiers
+        # Wild cards are the same for every meld method
+        return list(self._get_meld_index(Meld.RANK, modifiers).buckets.get(Meld.WILD, ()))
+    def count_wilds(self, modifiers=None) -> int:
+        if modifiers is None:
+            modifiers = Modifiers
+        return len(self._get_meld_index(Meld.RANK, modifiers).buckets.get(Meld.WILD, ()))
+    def get_cards_by_meld(self, meld_type, modifiers=None) -> typing.List['Card']:
+        if modifiers is None:
+            modifiers = Modifiers
+        return list(self._get_meld_index(modifiers.meld_method, modifiers).buckets.get(meld_type, ()))
+    def count_melds(self, method=None, exclude_wilds=False, modifiers=None) -> int:
+        if modifiers is None:
+            modifiers = Modifiers
+        if method is None:
+            method = modifiers.meld_method
+        buckets = self._get_meld_index(method, modifiers).buckets
+        if exclude_wilds and Meld.WILD in buckets:
+            return len(buckets) - 1
+        return len(buckets)
+    def includes_meld_type(self, meld_type, method=None, modifiers=None) -> bool:
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
-        return len(self.get_melds(method), exclude_wilds = exclude_wilds)
-    def includes_meld_type(self, meld_type, method=None) -> Boolean:
+            method = modifiers.meld_method
+        return meld_type in self._get_meld_index(method, modifiers).buckets
+    def get_face_total(self, table) -> int:
+        """ Sum of table[card.face] over the cards, e.g. their points.
+
+        The total for the last table asked for is kept as cards come and go.
+        """
+        if self._total_table is not table:
+            self._total = sum(table[card.face] for card in self.cards)
+            self._total_table = table
+        return self._total
+    def get_meld_counts(self, method=None, modifiers=None) -> typing.Dict[int, int]:
+        """ Number of cards of each meld type in the group """
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
-        return Meld.cards_include_meld_type(cards = self.cards, meld_type = meld_type, method = method)
+            method = modifiers.meld_method
+        return {meld_type: len(bucket) for meld_type, bucket in self._get_meld_index(method, modifiers).buckets.items()}
     def add(self, cards) -> None:
         if isinstance(cards, CardGroup):
-            self.cards.extend(cards.cards)
+            moved = cards.cards
             cards.cards = []
         else:
-            self.cards.extend(cards)
+            moved = cards
+        self.cards.extend(moved)
+        self._index_add(moved)
     def push(self, card) -> None:
         self.cards.append(card)
+        self._index_add((card,))
     def pop(self) -> Card:
-        return self.cards.pop()
+        card = self.cards.pop()
+        self._index_remove((card,))
+        return card
     def remove_all_cards(self):
-        cs = []
-        cs.extend(self.cards)
-        self.cards.clear()
+        cs = self.cards
+        self.cards = []
         return cs
-    def sort(self, method=None) -> None:
+    def sort(self, method=None, modifiers=None) -> None:
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
+            method = modifiers.meld_method
+
         match method:
             case Meld.RANK:
-                self.cards.sort(key=lambda card: card.rank.get_shorthand())
+                self.cards = sorted(self.cards, key=lambda card: card.rank.get_shorthand())
             case Meld.RANKCOLOR:
-                self.cards.sort(key=lambda card: card.rank.get_shorthand()+str(card.get_color()))
+                self.cards = sorted(self.cards, key=lambda card: card.rank.get_shorthand()+str(card.get_color()))
             case _:
                 raise ValueError("Unknown method "+str(method))
-    def calc_entropy(self, method=None) -> float:
+    def calc_entropy(self, method=None, modifiers=None) -> float:
+        """ Rough shuffle measure from the number of melds. See handnfoot.metrics for better ones. """
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
+            method = modifiers.meld_method
+
         # See https://stackoverflow.com/questions/19434884/determining-how-well-a-deck-is-shuffled
         match method:
             case Meld.RANK | Meld.RANKCOLOR:
-                num_sets = self.count_melds(method=method)
+                num_sets = self.count_melds(method=method, modifiers=modifiers)
                 #print(num_sets)
                 min_sets = 1 #math.ceil(self.count() / 2)
                 max_sets = min(28, self.count())
@@ -356,6 +692,15 @@ class CardGroup():
                 raise ValueError("Unknown method "+str(method))
     def __len__(self):
          return len(self.cards)
+    def get_HTML(self, type=None) -> str:
+        parts = []
+        self.append_HTML(parts, type)
+        return "".join(parts)
+    def append_HTML(self, parts, type=None) -> None:
+        """ Append the HTML fragments for this group to parts, to be joined once """
+        parts.append(f'<span class="{self.HTML_CLASS}">')
+        parts.extend(card.get_HTML(type) for card in self.cards)
+        parts.append('</span>')
 
 class Pile(CardGroup):
     """
@@ -363,61 +708,85 @@ class Pile(CardGroup):
 
     Can be face up or face down.
     """
-    cards = face_up = None
+    face_up = None
+    HTML_CLASS = "cardtable_pile"
+    HTML_EDGES = 5 # Cards shown under the top card to give the pile some depth
     PERFECT_SHUFFLE = 1
     RIFFLE_SHUFFLE = 2
     MULTI_QUICK_SHUFFLE = 3
+    VECTOR_RIFFLE_SHUFFLE = 4
+    OVERHAND_SHUFFLE = 5
     def __init__(self, cards = None, face_up = False):
         if cards == None: cards = list()
         self.cards = cards
         self.face_up = face_up
     def draw(self, number = 1) -> typing.List['Card']:
-        cards = []
-        for _ in range(number):
-            cards.append(self.pop())
+        if number <= 0:
+            return []
+        if number > len(self.cards):
+            raise IndexError("Not enough cards to draw "+str(number))
+        cards = self.cards[-number:]
+        del self.cards[-number:]
+        self._index_remove(cards)
+        cards.reverse() # Top card first, as if popped one at a time
         return cards
+    def draw_pile(self, number = 1, face_up = False) -> Pile:
+        return type(self)(cards = self.draw(number), face_up = face_up)
     def peek(self) -> Card:
         return self.cards[-1]
     def flip(self) -> None:
         self.face_up = not self.face_up
-        self.cards.reverse()
+        self.cards = self.cards[::-1]
     def deal(self, num_piles, num_cards = 1, face_up = False) -> typing.List['Pile']:
-        piles = []
-        for _ in range(num_piles):
-            piles.append(Pile(face_up = face_up))
-        for _ in range(num_cards):
-            for p_idx in range(num_piles):
-                card = self.pop()
-                if card == None:
-                    raise ValueError("No more cards to deal!")
-                #print(str(card)+" to pile "+str(p_idx))
-                piles[p_idx].push(card)
-        return piles
+        # Equivalent to popping one card at a time to each pile in turn
+        dealt = self.draw(self._deal_count(num_piles, num_cards))
+        return [type(self)(cards = dealt[p_idx::num_piles], face_up = face_up) for p_idx in range(num_piles)]
+    def _deal_count(self, num_piles, num_cards) -> int:
+        total = num_piles * num_cards
+        if total > len(self):
+            raise ValueError("No more cards to deal!")
+        return total
     def split(self, num_piles, face_up = False, include_current = False) -> typing.List['Pile']:
+        # Same sizes as numpy.array_split: the first (count % num_piles) piles get one extra card
         piles = []
-        cards_list = np.array_split(self.cards, num_piles)
-        for cards in cards_list:
-            piles.append(Pile(cards = list(cards), face_up = face_up))
+        start = 0
+        for size in split_sizes(len(self), num_piles):
+            piles.append(type(self)(cards = self.cards[start:start + size], face_up = face_up))
+            start += size
         if include_current:
             self.cards = piles[0].cards
             del piles[0]
         else:
             self.cards = []
         return piles
-    def shuffle(self, iterations = 7, precision = 10, method = RIFFLE_SHUFFLE) -> None:
-        if len(self.cards) > 100:
-            raise ValueError("Can't shuffle that many. Specify another method.")
+    def shuffle(self, iterations = 7, precision = 10, method = RIFFLE_SHUFFLE, rng = None) -> None:
+        """ Shuffle with the given method.
+
+        rng is a numpy Generator to draw all randomness from, for reproducible shuffles.
+        Without one the random module and a shared Generator are used.
+        """
         if method == self.PERFECT_SHUFFLE:
-            random.shuffle(self.cards)
+            cards = self.cards
+            _random_from(rng).shuffle(cards)
+            self.cards = cards
         elif method == self.RIFFLE_SHUFFLE:
-            self.riffle_shuffle(iterations = iterations, precision = precision)
+            # riffle_shuffle is capped at 100 cards; the vector version is the same shuffle
+            if len(self) > 100:
+                self.vector_riffle_shuffle(iterations = iterations, precision = precision, rng = rng)
+            else:
+                self.riffle_shuffle(iterations = iterations, precision = precision, rng = rng)
         elif method == self.MULTI_QUICK_SHUFFLE:
-            self.multi_quick_shuffle(iterations = iterations, precision = precision)
+            self.multi_quick_shuffle(iterations = iterations, precision = precision, rng = rng)
+        elif method == self.VECTOR_RIFFLE_SHUFFLE:
+            self.vector_riffle_shuffle(iterations = iterations, precision = precision, rng = rng)
+        elif method == self.OVERHAND_SHUFFLE:
+            self.overhand_shuffle(iterations = iterations, precision = precision, rng = rng)
         else:
             raise ValueError("Unknown shuffle method: "+method)
-    def riffle_shuffle(self, iterations = 7, precision = 10) -> None:
+    def riffle_shuffle(self, iterations = 7, precision = 10, rng = None) -> None:
         if len(self.cards) > 100:
             raise ValueError("Can't riffle shuffle that many. Specify another method.")
+        rand = _random_from(rng)
         half = [[],[]]
         if len(self.cards) < 2:
             return
@@ -428,13 +797,13 @@ class Pile(CardGroup):
             if precision == 1:
                 error = 0
             else:
-                error = random.randrange(0 - (precision - 1), (precision - 1), 1)
+                error = rand.randrange(0 - (precision - 1), (precision - 1), 1)
             mid_idx = int(len(self.cards) / 2) + error
             half[0] = self.cards[:mid_idx]
             half[1] = self.cards[mid_idx:]
             # Next let them fall back together
             cards = []
-            side = random.randrange(0, 1, 1)
+            side = rand.randrange(0, 1, 1)
             loop_count = 0
             while len(half[0]) > 0 and len(half[1]) > 0:
                 side = (side + 1) % 2
@@ -442,7 +811,7 @@ class Pile(CardGroup):
                 if precision == 1:
                     count = 1
                 else:
-                    count = min( len(half[side]), random.randrange(1, precision, 1))
+                    count = min( len(half[side]), rand.randrange(1, precision, 1))
                 for _ in range(count):
                     cards.append(half[side][0])
                     del half[side][0]
@@ -453,7 +822,18 @@ class Pile(CardGroup):
             cards.extend(half[0])
             cards.extend(half[1])
             self.cards = cards
-    def multi_quick_shuffle(self, iterations = 1, precision = 10, players = None, num_players = None, seconds = 120) -> None:
+    def vector_riffle_shuffle(self, iterations = 7, precision = 10, rng = None) -> None:
+        """ Same shuffle as riffle_shuffle, in linear time on any number of cards """
+        from . import shuffling
+        self.permute(shuffling.riffle_order(len(self), iterations = iterations, precision = precision, rng = rng))
+    def overhand_shuffle(self, iterations = 7, precision = 10, rng = None) -> None:
+        from . import shuffling
+        self.permute(shuffling.overhand_order(len(self), iterations = iterations, precision = precision, rng = rng))
+    def permute(self, order) -> None:
+        """ Reorder the cards so the new cards are the old cards[order] """
+        cards = self.cards
+        self.cards = [cards[idx] for idx in order.tolist()]
+    def multi_quick_shuffle(self, iterations = 1, precision = 10, players = None, num_players = None, seconds = 120, rng = None) -> None:
         '''
         Custom shuffle method where multiple players shuffle many decks together
         The method is to take a ~52 cards at a time shuffle once then trade half the cards for another set
@@ -469,45 +849,74 @@ class Pile(CardGroup):
                 players.append(Player(precision = precision))
         else:
             num_players = len(players)
+        rand = _random_from(rng)
         piles = self.split(num_players)
         for player in players:
             if hasattr(player, "multi_quick") and player.multi_quick:
                 raise ValueError("Unexpected multi_quick_pile")
             player.multi_quick = SimpleNamespace()
             player.multi_quick.pile = None
-        # iterate a second at a time
-        while seconds > 0:
-            for player in players:
-                if player.multi_quick.pile == None or player.multi_quick.done_time >= seconds:
-                    old_pile = None
-                    if player.multi_quick.pile:
-                        if player.multi_quick.pile.count() < 30:
-                            old_pile = player.multi_quick.pile
-                            player.multi_quick.pile = None
-                        else:
-                            old_pile = player.multi_quick.pile.split(2, include_current = True)[0]
-                    if len(piles) > 0:
-                        new_pile = random.choice(piles)
-                        if player.multi_quick.pile:
-                            max_count = 40
-                        else:
-                            max_count = 80
-                        if new_pile.count() < max_count:
-                            piles.remove(new_pile) # take whole pile
-                        else:
-                            new_pile = new_pile.split(2, include_current = True)[0]
-                        if player.multi_quick.pile:
-                            player.multi_quick.pile.add(new_pile)
-                        else:
-                            player.multi_quick.pile = new_pile
-                        player.multi_quick.pile.shuffle(precision = player.precision, iterations = iterations, method = self.RIFFLE_SHUFFLE)
-                        player.multi_quick.done_time = seconds - (max(1, int((5 + 10 * iterations) / player.speed))) \
-                            - random.normalvariate(0, 3)
-                    # now that we got a new file (or not) return the old one
-                    if old_pile: piles.append(old_pile)
-            seconds -= 1
+        # The clock counts seconds down and players act on whole seconds, in player order
+        # within a second, when they have no pile or are done shuffling (done_time >= seconds).
+        # Rather than checking every player every second, keep a queue of (-seconds, index)
+        # for the next second each player acts, and a list of players waiting for a pile.
+        queue = [(-seconds, idx) for idx in range(num_players)]
+        waiting = []
+        while queue:
+            seconds, idx = heapq.heappop(queue)
+            seconds = -seconds
+            player = players[idx]
+            shuffled = False
+            old_pile = None
+            if player.multi_quick.pile:
+                if player.multi_quick.pile.count() < 30:
+                    old_pile = player.multi_quick.pile
+                    player.multi_quick.pile = None
+                else:
+                    old_pile = player.multi_quick.pile.split(2, include_current = True)[0]
+            if len(piles) > 0:
+                pile_idx = rand.randrange(len(piles))
+                new_pile = piles[pile_idx]
+                if player.multi_quick.pile:
+                    max_count = 40
+                else:
+                    max_count = 80
+                if new_pile.count() < max_count:
+                    # take whole pile
+                    piles[pile_idx] = piles[-1]
+                    piles.pop()
+                else:
+                    new_pile = new_pile.split(2, include_current = True)[0]
+                if player.multi_quick.pile:
+                    player.multi_quick.pile.add(new_pile)
+                else:
+                    player.multi_quick.pile = new_pile
+                player.multi_quick.pile.shuffle(precision = player.precision, iterations = iterations, method = self.RIFFLE_SHUFFLE, rng = rng)
+                player.multi_quick.done_time = seconds - (max(1, int((5 + 10 * iterations) / player.speed))) \
+                    - rand.normalvariate(0, 3)
+                shuffled = True
+            # now that we got a new file (or not) return the old one
+            if old_pile:
+                piles.append(old_pile)
+                # Waiting players after this one still act this second
+                for waiting_idx in waiting:
+                    if waiting_idx > idx:
+                        heapq.heappush(queue, (-seconds, waiting_idx))
+                    elif seconds > 1:
+                        heapq.heappush(queue, (1 - seconds, waiting_idx))
+                waiting.clear()
+            if shuffled:
+                next_seconds = min(seconds - 1, math.floor(player.multi_quick.done_time))
+            elif player.multi_quick.pile or len(piles) > 0:
+                next_seconds = seconds - 1
+            else:
+                waiting.append(idx)
+                continue
+            if next_seconds > 0:
+                heapq.heappush(queue, (-next_seconds, idx))
         for player in players:
-            piles.append(player.multi_quick.pile)
+            if player.multi_quick.pile is not None:
+                piles.append(player.multi_quick.pile)
             player.multi_quick = None
         for pile in piles:
             self.add(pile)
@@ -525,29 +934,193 @@ class Pile(CardGroup):
         return s
     def __repr__(self) -> str:
         return self.__str__()
+    def append_HTML(self, parts, type=None) -> None:
+        count = len(self)
+        parts.append(f'<span class="{self.HTML_CLASS}" title="{count} cards">')
+        if count:
+            parts.extend([CARD_BACK_HTML] * (min(count, self.HTML_EDGES) - 1))
+            parts.append(self.peek().get_HTML(type) if self.face_up else CARD_BACK_HTML)
+        parts.append('</span>')
+
+class ArrayPile(Pile):
+    """
+    A Pile that stores card ids in a NumPy array instead of a list of Cards.
+
+    draw, deal, split and flip work on slices of the id array rather than moving
+    one Card at a time. push and add write into spare room at the end of an array
+    the pile allocated itself, growing it by doubling, so adding cards one at a
+    time is amortized constant time. ids is a view of that array, so copy it to
+    keep it past the pile's next change. The cards attribute is materialized on
+    each access, so modify the pile through its methods (or assign cards) rather
+    than mutating the returned list.
+    """
+    _buffer = None
+    _length = 0
+    _owned = False # _buffer was allocated here, so its spare end can be written
+    _meld_version = None
+    _total_version = None
+    def __init__(self, cards = None, face_up = False, ids = None):
+        if ids is None:
+            ids = card_ids(cards if cards is not None else [])
+        self.ids = ids
+        self.face_up = face_up
+    @property
+    def ids(self) -> np.ndarray:
+        return self._buffer[:self._length]
+    @ids.setter
+    def ids(self, ids) -> None:
+        # Shared with whoever passed it in, so copied before it's written
+        self._buffer = ids
+        self._length = len(ids)
+        self._owned = False
+        self.version += 1
+    @property
+    def cards(self) -> typing.List['Card']:
+        return cards_from_ids(self.ids)
+    @cards.setter
+    def cards(self, cards) -> None:
+        self.ids = card_ids(cards)
+    def _reserve(self, extra) -> None:
+        needed = self._length + extra
+        if not self._owned or needed > len(self._buffer):
+            import numpy as np
+            buffer = np.empty(max(needed, 2 * self._length, 16), dtype = np.int32)
+            buffer[:self._length] = self._buffer[:self._length]
+            self._buffer = buffer
+            self._owned = True
+    def _append_ids(self, ids) -> None:
+        count = len(ids)
+        self._reserve(count)
+        self._buffer[self._length:self._length + count] = ids
+        self._length += count
+        self.version += 1
+    def _get_meld_index(self, method, modifiers) -> MeldIndex:
+        # Changes don't update the meld indexes, so rebuild them when the version changes
+        if self._meld_version != self.version:
+            self._meld_indexes = None
+            self._meld_version = self.version
+        return super(ArrayPile, self)._get_meld_index(method, modifiers)
+    def get_face_total(self, table) -> int:
+        if self._total_table is not table or self._total_version != self.version:
+            self._total = sum(table[card_id & FACE_MASK] for card_id in self.ids.tolist())
+            self._total_table = table
+            self._total_version = self.version
+        return self._total
+    def clone(self) -> 'ArrayPile':
+        # The meld indexes are rebuilt rather than changed, so can be shared
+        group = object.__new__(type(self))
+        group.__dict__.update(self.__dict__)
+        if self._meld_indexes:
+            group._meld_indexes = dict(self._meld_indexes)
+        # Both share the buffer now, so neither may write into it
+        self._owned = False
+        group._owned = False
+        return group
+    def count(self) -> int:
+        return self._length
+    def __len__(self):
+        return self._length
+    def push(self, card) -> None:
+        self._reserve(1)
+        self._buffer[self._length] = card.id
+        self._length += 1
+        self.version += 1
+    def pop(self) -> Card:
+        if self._length == 0:
+            raise IndexError("pop from empty pile")
+        self._length -= 1
+        self.version += 1
+        return Card.from_id(int(self._buffer[self._length]))
+    def add(self, cards) -> None:
+        if isinstance(cards, ArrayPile):
+            self._append_ids(cards.ids)
+            cards.ids = cards.ids[:0]
+        elif isinstance(cards, CardGroup):
+            self._append_ids(card_ids(cards.cards))
+            cards.cards = []
+        else:
+            self._append_ids(card_ids(cards))
+    def remove_all_cards(self):
+        cs = self.cards
+        self.ids = self.ids[:0]
+        return cs
+    def peek(self) -> Card:
+        return Card.from_id(int(self.ids[-1]))
+    def flip(self) -> None:
+        self.face_up = not self.face_up
+        self.ids = self.ids[::-1]
+    def permute(self, order) -> None:
+        self.ids = self.ids[order]
+    def draw_ids(self, number = 1) -> np.ndarray:
+        """ Remove the top number cards and return their ids, top card first """
+        if number <= 0:
+            return self.ids[:0]
+        if number > len(self.ids):
+            raise IndexError("Not enough cards to draw "+str(number))
+        remaining = self._length - number
+        # Copied, as pushes may write over the drawn end of the buffer
+        drawn = self._buffer[remaining:self._length][::-1].copy()
+        self._length = remaining
+        self.version += 1
+        return drawn
+    def draw(self, number = 1) -> typing.List['Card']:
+        return cards_from_ids(self.draw_ids(number))
+    def draw_pile(self, number = 1, face_up = False) -> Pile:
+        return ArrayPile(ids = self.draw_ids(number), face_up = face_up)
+    def deal(self, num_piles, num_cards = 1, face_up = False) -> typing.List['Pile']:
+        dealt = self.draw_ids(self._deal_count(num_piles, num_cards))
+        return [ArrayPile(ids = dealt[p_idx::num_piles], face_up = face_up) for p_idx in range(num_piles)]
+    def split(self, num_piles, face_up = False, include_current = False) -> typing.List['Pile']:
+        piles = []
+        start = 0
+        for size in split_sizes(len(self.ids), num_piles):
+            piles.append(ArrayPile(ids = self.ids[start:start + size], face_up = face_up))
+            start += size
+        if include_current:
+            self.ids = piles[0].ids
+            del piles[0]
+        else:
+            self.ids = self.ids[:0]
+        return piles
 
 class Hand(CardGroup):
-    cards = None
+    HTML_CLASS = "cardtable_hand"
     def __init__(self, cards = None):
         if cards == None: cards = list()
         self.cards = list(cards)
     def add(self, cards) -> None:
         self.cards.extend(cards)
+        self._index_add(cards)
     def remove(self, card) -> None:
         self.cards.remove(card)
-    def remove_cards(self, cards) -> None:
+        self._index_remove((card,))
+    def remove_cards(self, cards, by_face = False) -> typing.List['Card']:
+        """ Remove exactly the given cards, counting repeats, and return the removed cards.
+
+        Cards match by identity, or by rank and suit alone (any back) if by_face is set.
+        Raises ValueError, leaving the hand unchanged, if the hand doesn't hold them all.
+        """
+        if by_face:
+            wanted = collections.Counter(card.face for card in cards)
+        else:
+            wanted = collections.Counter(cards)
+        missing = sum(wanted.values())
         keepers = []
+        removed = []
         for card in self.cards:
-            if card not in cards:
+            key = card.face if by_face else card
+            if wanted[key] > 0:
+                wanted[key] -= 1
+                removed.append(card)
+            else:
                 keepers.append(card)
-        self.cards = keepers
+        missing -= len(removed)
+        if missing:
+            raise ValueError(str(missing)+" cards not in hand")
+        self._cards = keepers
+        self._index_remove(removed)
+        return removed
 
-    def get_HTML(self) -> str:
-        s = '<span class="cardtable_hand">'
-        for card in self.cards:
-            s += card.get_HTML()
-        s += '</span>'
-        return s
 
     #def sort(self, method = SUITRANK):
     #    self.cards.sort()
@@ -571,21 +1144,17 @@ class Fan(CardGroup):
     A group of cards layed out so all can see them.
     Similar to a Hand but typically not private.
     """
-    cards = None
+    HTML_CLASS = "cardtable_fan_vertical"
     def __init__(self, cards = None, face_up = True):
         if cards == None: cards = list()
         self.cards = list(cards)
         self.face_up = face_up
     def add(self, cards) -> None:
         self.cards.extend(cards)
+        self._index_add(cards)
     def remove(self, card) -> None:
         self.cards.remove(card)
-    def get_HTML(self) -> str:
-        s = '<span class="cardtable_fan_vertical">'
-        for card in self.cards:
-            s += card.get_HTML()
-        s += '</span>'
-        return s
+        self._index_remove((card,))
     def __str__(self) -> str:
         s = ""
         if len(self.cards) == 0:
@@ -599,21 +1168,106 @@ class Fan(CardGroup):
         s += "]"
         return s
 
+class MeldGroupIndex():
+    """ The first group holding each meld type in a PlayingArea, for one meld method.
+
+    Groups are indexed by every meld type among their cards and the meld type they
+    were laid down as, except that wilds only type groups with no other. version is
+    the sum of the groups' versions when indexed, so the area can tell when a group
+    changed behind the index's back.
+    """
+    def __init__(self, groups, method, modifiers):
+        self.method = method
+        self.modifiers = modifiers
+        self.table = modifiers.get_meld_type_table(method)
+        self.area_groups = groups
+        self.groups = dict()
+        self.positions = dict() # id(group) -> position in the area
+        self.group_meld_types = dict() # id(group) -> meld types it is indexed by
+        self.version = 0
+        for group in groups:
+            self.add(group)
+    def add(self, group) -> None:
+        """ Index group, after the groups already in the index """
+        self.positions[id(group)] = len(self.positions)
+        self.version += group.version
+        self._index(group)
+    def update(self, group, version) -> None:
+        """ Index group again after it changed from version through the area """
+        self.version += group.version - version
+        self._index(group)
+    def _index(self, group) -> None:
+        meld_types = set(group._get_meld_index(self.method, self.modifiers).buckets)
+        if group.meld_type is not None and group.meld_type in self.table:
+            meld_types.add(group.meld_type)
+        if len(meld_types) > 1:
+            meld_types.discard(Meld.WILD)
+        position = self.positions[id(group)]
+        for meld_type in meld_types:
+            other = self.groups.get(meld_type)
+            if other is None or self.positions[id(other)] > position:
+                self.groups[meld_type] = group
+        # Meld types the group no longer has go to the next group with them, if any
+        for meld_type in self.group_meld_types.get(id(group), set()) - meld_types:
+            if self.groups.get(meld_type) is group:
+                del self.groups[meld_type]
+                for other in self.area_groups:
+                    if meld_type in self.group_meld_types.get(id(other), ()) and other is not group:
+                        self.groups[meld_type] = other
+                        break
+        self.group_meld_types[id(group)] = meld_types
+    def get(self, meld_type):
+        return self.groups.get(meld_type)
+
 class PlayingArea():
-    groups = None
+    """
+    A named set of groups of cards, e.g. the discard pile or a player's melds.
+
+    Lookups by meld type read from a MeldGroupIndex per meld method, kept up to date
+    by append and add_to_group_by_meld_type. Other changes to the groups, or to the
+    cards in them, rebuild it on the next lookup.
+    """
+    _groups = None
+    _meld_group_indexes = None
     def __init__(self, name = None, groups = None):
         self.name = name
         if groups == None: groups = list()
         self.groups = groups
+    @property
+    def groups(self):
+        return self._groups
+    @groups.setter
+    def groups(self, groups) -> None:
+        self._groups = groups
+        self._meld_group_indexes = None
+    def _get_meld_group_index(self, method, modifiers) -> MeldGroupIndex:
+        if self._meld_group_indexes is None:
+            self._meld_group_indexes = dict()
+        table = modifiers.get_meld_type_table(method)
+        index = self._meld_group_indexes.get(method)
+        if index is None or index.table is not table or index.version != sum(group.version for group in self._groups):
+            index = MeldGroupIndex(self._groups, method, modifiers)
+            self._meld_group_indexes[method] = index
+        return index
     def get_groups(self):
         return self.groups.copy()
-    def combine_groups(self):
-        pile = Pile()
+    def clone(self) -> 'PlayingArea':
+        """ Copy of the area with clones of its groups """
+        area = object.__new__(type(self))
+        area.__dict__.update(self.__dict__)
+        area.groups = [group.clone() for group in self._groups]
+        return area
+    def combine_groups(self, pile_cls = None):
+        if pile_cls is None:
+            pile_cls = Pile
+        pile = pile_cls()
         for group in self.groups:
             pile.add(group)
         self.groups = [pile]
-    def clear_groups(self):
-        pile = Pile()
+    def clear_groups(self, pile_cls = None):
+        if pile_cls is None:
+            pile_cls = Pile
+        pile = pile_cls()
         for group in self.groups:
             pile.add(group)
         self.groups = []
@@ -621,51 +1275,101 @@ class PlayingArea():
     def append(self, group):
         if group in self.groups:
             raise ValueError("Group already in playing area!")
-        self.groups.append(group)
+        self._groups.append(group)
+        if self._meld_group_indexes:
+            for index in self._meld_group_indexes.values():
+                index.add(group)
     def remove(self, group):
-        self.groups.remove(group)
+        self._groups.remove(group)
+        self._meld_group_indexes = None
     def remove_empty_groups(self):
         new_groups = []
         for group in self.groups:
-            if len(group.cards) > 0:
+            if len(group) > 0:
                 new_groups.append(group)
         self.groups = new_groups
     def transfer_cards(self, areas):
         for area in areas:
-            self.groups.extend(area.groups)
+            self._groups.extend(area.groups)
             area.groups = []
-    def includes_meld_type(self, meld_type, method=None):
+        self._meld_group_indexes = None
+    def includes_meld_type(self, meld_type, method=None, modifiers=None):
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
+            method = modifiers.meld_method
         for group in self.groups:
-            if group.includes_meld_type(meld_type = meld_type, method = method):
+            if group.includes_meld_type(meld_type = meld_type, method = method, modifiers = modifiers):
                 return True
         return False
-    def get_group_by_meld_type(self, meld_type, method=None):
+    def get_face_total(self, table) -> int:
+        """ Sum of table[card.face] over the cards in the area, see CardGroup.get_face_total """
+        return sum(group.get_face_total(table) for group in self.groups)
+    def get_meld_types(self, method=None, modifiers=None) -> typing.Set[int]:
+        """ Meld types of all the cards in the area's groups """
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
+            method = modifiers.meld_method
+        meld_types = set()
         for group in self.groups:
-            if group.cards and group.cards[0].get_meld_type(method = method) == meld_type:
-                return group
-        return None
-    def add_to_group_by_meld_type(self, cards, group_cls, method=None, meld_type=None) -> None:
+            meld_types.update(group._get_meld_index(method, modifiers).buckets)
+        return meld_types
+    def get_group_by_meld_type(self, meld_type, method=None, modifiers=None):
+        if modifiers is None:
+            modifiers = Modifiers
         if method is None:
-            method = Modifiers.meld_method
+            method = modifiers.meld_method
+        return self._get_meld_group_index(method, modifiers).get(meld_type)
+    def add_to_group_by_meld_type(self, cards, group_cls, method=None, meld_type=None, modifiers=None) -> typing.List['CardGroup']:
+        """ Add each card to the group for its meld type, creating groups as needed.
+
+        Returns the groups that changed.
+        """
+        if modifiers is None:
+            modifiers = Modifiers
+        if method is None:
+            method = modifiers.meld_method
+        index = self._get_meld_group_index(method, modifiers)
+        changed = []
         for card in cards:
-            if meld_type:
+            if meld_type is not None:
                 card_meld_type = meld_type
             else:
-                card_meld_type = card.get_meld_type(method = method)
-            group = self.get_group_by_meld_type(meld_type = card_meld_type, method = method)
-            if not group:
+                card_meld_type = index.table[card.face]
+            group = index.get(card_meld_type)
+            if group is None:
                 group = group_cls()
-                self.groups.append(group)
-            if not isinstance(group, group_cls):
-                raise ValueError("Unexpected group type: "+str(type(group))+" expected: ")+str(group_cls)
-            group.push(card)
+                if meld_type is not None:
+                    group.meld_type = meld_type
+                group.push(card)
+                self._groups.append(group)
+                for other_index in self._meld_group_indexes.values():
+                    other_index.add(group)
+            else:
+                if not isinstance(group, group_cls):
+                    raise ValueError("Unexpected group type: "+str(type(group))+" expected: "+str(group_cls))
+                version = group.version
+                group.push(card)
+                for other_index in self._meld_group_indexes.values():
+                    other_index.update(group, version)
+            if group not in changed:
+                changed.append(group)
+        return changed
     def display(self):
         if self.name: print(self.name+":", end=" ")
         print("  ".join([str(x) for x in self.groups]))
+    def get_HTML(self, type=None) -> str:
+        parts = []
+        self.append_HTML(parts, type)
+        return "".join(parts)
+    def append_HTML(self, parts, type=None) -> None:
+        parts.append('<div class="cardtable_area">')
+        if self.name:
+            parts.append(f'<span class="cardtable_area_name">{html.escape(self.name)}</span>')
+        for group in self.groups:
+            group.append_HTML(parts, type)
+        parts.append('</div>')
 #        Columns:
 #        table_data = [
 #            ['a', 'b', 'c'],
@@ -677,28 +1381,58 @@ class PlayingArea():
 
 
 class Table():
-    areas = players = None
-    def __init__(self):
+    """
+    Areas and players around a table.
+
+    pile_cls selects the Pile storage used for piles created for the table,
+    e.g. ArrayPile to deal and split large shoes without moving individual cards.
+    """
+    areas = players = pile_cls = None
+    def __init__(self, pile_cls = None):
         self.areas = list()
+        self._areas_by_name = dict()
         self.players = list()
+        if pile_cls is None:
+            pile_cls = Pile
+        self.pile_cls = pile_cls
     def add_area(self, area):
         if area in self.areas:
             raise ValueError("Area already on the table!")
         self.areas.append(area)
+        self._areas_by_name.setdefault(area.name, area)
     def get_area(self, name) -> PlayingArea:
-        for area in self.areas:
-            if area.name == name:
-                return area
-        raise ValueError("Area not found: "+name)
+        area = self._areas_by_name.get(name)
+        if area is None:
+            raise ValueError("Area not found: "+name)
+        return area
     def add_player(self, player):
         if player in self.players:
             raise ValueError("Player already at the table: "+str(player))
         self.players.append(player)
+    def clone(self, players = None) -> 'Table':
+        """ Copy of the table with clones of its areas, seating players (default: the same ones) """
+        table = object.__new__(type(self))
+        table.__dict__.update(self.__dict__)
+        table.areas = [area.clone() for area in self.areas]
+        table._areas_by_name = dict()
+        for area in table.areas:
+            table._areas_by_name.setdefault(area.name, area)
+        table.players = list(self.players if players is None else players)
+        return table
     def display(self):
         for area in self.areas:
             area.display()
         for player in self.players:
             player.display()
+    def get_HTML(self, type=None) -> str:
+        """ The whole table as HTML, built from cached card fragments in one join """
+        parts = ['<div class="cardtable_table">']
+        for area in self.areas:
+            area.append_HTML(parts, type)
+        for player in self.players:
+            player.append_HTML(parts, type)
+        parts.append('</div>')
+        return "".join(parts)
 
 class Player():
     name = areas = precision = speed = None
@@ -707,15 +1441,26 @@ class Player():
         self.precision = precision
         self.speed = speed
         self.areas = []
+        self._areas_by_name = dict()
     def add_area(self, area):
         if area in self.areas:
             raise ValueError("Area already associated with Player!")
         self.areas.append(area)
+        self._areas_by_name.setdefault(area.name, area)
+    def clone(self) -> 'Player':
+        """ Copy of the player with clones of their areas; other attributes are shared """
+        player = object.__new__(type(self))
+        player.__dict__.update(self.__dict__)
+        player.areas = [area.clone() for area in self.areas]
+        player._areas_by_name = dict()
+        for area in player.areas:
+            player._areas_by_name.setdefault(area.name, area)
+        return player
     def get_area(self, name):
-        for area in self.areas:
-            if area.name == name:
-                return area
-        raise ValueError("Player area not found: "+name)
+        area = self._areas_by_name.get(name)
+        if area is None:
+            raise ValueError("Player area not found: "+name)
+        return area
     def get_hand(self):
         area = self.get_area("hand")
         if area is None:
@@ -736,6 +1481,48 @@ class Player():
     def display_areas(self):
         for area in self.areas:
             area.display()
+    def get_HTML(self, type=None) -> str:
+        parts = []
+        self.append_HTML(parts, type)
+        return "".join(parts)
+    def append_HTML(self, parts, type=None) -> None:
+        parts.append('<div class="cardtable_player">')
+        if self.name:
+            parts.append(f'<span class="cardtable_player_name">{html.escape(self.name)}</span>')
+        for area in self.areas:
+            area.append_HTML(parts, type)
+        parts.append('</div>')
+
+def card_ids(cards) -> np.ndarray:
+    import numpy as np
+    return np.array([card.back_id << FACE_BITS | card.face for card in cards], dtype = np.int32)
+
+def cards_from_ids(ids) -> typing.List['Card']:
+    # ids always come from existing cards, so skip Card.from_id
+    cards_by_id = _CARDS_BY_ID
+    return [cards_by_id[card_id] for card_id in ids.tolist()]
+
+def get_back_names() -> typing.Tuple[str, ...]:
+    """ Backs by back id in this process, to map ids packed by cards_to_bytes elsewhere """
+    return tuple(_BACK_NAMES)
+
+def cards_to_bytes(cards) -> bytes:
+    """ Card ids packed four bytes each, wide enough for the backs of any number of packs """
+    return array.array("I", [card.back_id << FACE_BITS | card.face for card in cards]).tobytes()
+
+def cards_from_bytes(data, back_names = None) -> typing.List['Card']:
+    """ Cards packed by cards_to_bytes, with back ids mapped through back_names if given """
+    ids = array.array("I")
+    ids.frombytes(data)
+    if back_names is None:
+        return [Card.from_id(card_id) for card_id in ids]
+    back_ids = [_get_back_id(back) for back in back_names]
+    return [Card.from_id(back_ids[card_id >> FACE_BITS] << FACE_BITS | card_id & FACE_MASK) for card_id in ids]
+
+def split_sizes(count, num_piles) -> typing.List[int]:
+    """ Pile sizes when splitting count cards as evenly as possible """
+    size, extra = divmod(count, num_piles)
+    return [size + 1] * extra + [size] * (num_piles - extra)
 
 def cards_to_str(cards) -> str:
     s = ""
@@ -747,19 +1534,39 @@ def cards_to_str(cards) -> str:
     s += "]"
     return s
 
+class CardModifiers():
+    """
+    House rules for the cards: which ranks are wild and the default meld method.
+
+    Wild and meld type lookups read from tables built from these, so each game can
+    hold its own CardModifiers and pass it as modifiers to card, meld, group and
+    area methods. Those fall back to the shared Modifiers when none is passed.
+    """
+    meld_method = wild_ranks = wild_faces = meld_type_tables = None
+    def __init__(self, wild_ranks = None, meld_method = None):
+        if wild_ranks is None: wild_ranks = []
+        self.set_meld_method(meld_method)
+        self.set_wild_ranks(wild_ranks)
+    def set_meld_method(self, method):
+        self.meld_method = method
+    def set_wild_ranks(self, ranks):
+        self.wild_ranks = ranks
+        self.wild_faces = _build_face_table(lambda rank, suit: rank in ranks)
+        self.meld_type_tables = dict() # meld method -> Meld.build_type_table for these modifiers
+    def card_is_wild(self, card):
+        return self.wild_faces[card.face]
+    def get_meld_type_table(self, method=None) -> tuple:
+        if method is None:
+            method = self.meld_method
+        table = self.meld_type_tables.get(method)
+        if table is None:
+            table = Meld.build_type_table(method, self.wild_faces)
+            self.meld_type_tables[method] = table
+        return table
+
 # A bit of a hack but not sure the best way to do this:
-class Modifiers():
-    meld_method = None
-    wild_ranks = []
-    @classmethod
-    def set_meld_method(cls, method):
-        cls.meld_method = method
-    @classmethod
-    def set_wild_ranks(cls, ranks):
-        cls.wild_ranks = ranks
-    @classmethod
-    def card_is_wild(cls, card):
-        return (card.rank in cls.wild_ranks)
+# the modifiers used when none are passed, shared by everything in the process
+Modifiers = CardModifiers()
 
 
 
@@ -813,7 +1620,8 @@ p3 = p.deal(num_piles=1, num_cards=54)[0]
 print(p3.calc_entropy(method=Meld.RANKCOLOR))
 '''
 
-p = Pack().get_pile()
-p.draw(11)
-p.draw(11)
-print(p)
+if __name__ == "__main__":
+    p = Pack().get_pile()
+    p.draw(11)
+    p.draw(11)
+    print(p)
@@ -1,11 +1,11 @@
 """
   Simulate Hand and Foot card game
 """
-import random
 import typing
 import logging
 from types import SimpleNamespace
 from . import cardtable
+from . import trace
 
 """
 TODO:
@@ -13,20 +13,81 @@ TODO:
 """
 
 MIN_PILE_SIZE = 7
+NUM_ROUNDS = 4
+
+class GameResult(typing.NamedTuple):
+    """ Outcome of HNFGame.run_game, small enough to send back from a worker process """
+    seed: tuple # entropy and spawn_key of the game's SeedSequence, to replay it
+    round_turns: typing.Tuple[int, ...]
+    round_scores: typing.Tuple[typing.Tuple[int, ...], ...] # per round, per player
+    scores: typing.Tuple[int, ...] # per player, over all rounds
+    winner: int # index into players; ties go to the earlier player
 
 class Strategy(SimpleNamespace):
+    """
+    How a player plays, set by its parameters:
+
+    laydown_dirty: lay down pairs with a wild once down
+    dirty_for_safety: put wilds on clean fans to get them out of hand, unless safe
+    safe_when_hand_gt: safe from having to do that with more cards than this in hand
+        (None for never safe)
+    prefer_high: keep high cards rather than low ones
+    draw_from: which draw pile to try first, one of the DRAW_ constants
+    down_tier ... pair_tier: desirability of cards for a fan that's down, a ready meld,
+        wilds, complete piles and pairs (pair_tier None for no pair tier)
+    seed: seed of the strategy's own rng, for DRAW_RANDOM; None to spawn one from the
+        seed of the first game it plays
+    """
     DRAW_CLOSEST = 1
     DRAW_RANDOM = 2
     DRAW_HAND_SOURCE = 3
     DRAW_FOOT_SOURCE = 4
     DRAW_CURRENT_SOURCE = 5
-    def __init__(self):
-        laydown_dirty = True
-        dirty_for_safety = True
-        safe_when_missing_pile = True
-        safe_when_hand_gt = 5
-        prefer_high = True
-        draw_from = self.DRAW_CLOSEST
+    def __init__(self, laydown_dirty = True, dirty_for_safety = True, safe_when_missing_pile = True,
+            safe_when_hand_gt = None, prefer_high = True, draw_from = DRAW_CLOSEST,
+            down_tier = 10000, ready_tier = 9000, wild_tier = 8000, complete_tier = 7000, pair_tier = None, seed = None):
+        super(Strategy, self).__init__()
+        self.laydown_dirty = laydown_dirty
+        self.dirty_for_safety = dirty_for_safety
+        self.safe_when_missing_pile = safe_when_missing_pile # TODO not used yet
+        self.safe_when_hand_gt = safe_when_hand_gt
+        self.prefer_high = prefer_high
+        self.draw_from = draw_from
+        self.down_tier = down_tier
+        self.ready_tier = ready_tier
+        self.wild_tier = wild_tier
+        self.complete_tier = complete_tier
+        self.pair_tier = pair_tier
+        self.seed = seed
+    _evaluation = None
+    _rng = None
+    def __deepcopy__(self, memo) -> 'Strategy':
+        # The cached evaluation refers to a player and their game, so isn't copied
+        import copy
+        strategy = type(self).__new__(type(self))
+        memo[id(self)] = strategy
+        for name, value in vars(self).items():
+            if name != "_evaluation":
+                setattr(strategy, name, copy.deepcopy(value, memo))
+        return strategy
+    def get_params(self) -> dict:
+        """ The parameters to make a strategy of this type that plays the same """
+        import inspect
+        return {name: getattr(self, name) for name in inspect.signature(type(self).__init__).parameters if name != "self"}
+    def get_rng(self, game) -> 'np.random.Generator':
+        """ The strategy's own rng, so its choices don't change the game's deals """
+        if self._rng is None:
+            import numpy as np
+            self._rng = np.random.default_rng(game.seed_sequence.spawn(1)[0] if self.seed is None else self.seed)
+        return self._rng
+    def get_evaluation(self, player: cardtable.Player) -> 'Evaluation':
+        """ Evaluation of player's position, reused until their hand changes """
+        hand = player.get_hand()
+        evaluation = self._evaluation
+        if evaluation is None or evaluation.hand is not hand or evaluation.hand_version != hand.version:
+            evaluation = Evaluation(player, self)
+            self._evaluation = evaluation
+        return evaluation
     def get_card_desirability(self, card: cardtable.Card, player: cardtable.Player) -> int:
         """ Preference:
                 If have incomplete pile
@@ -35,38 +96,174 @@ class Strategy(SimpleNamespace):
                 If have ready meld (3-6)
                 If have pair (2)
                 If high card (or low if prefer low)
+
+        Evaluation scores every card this way at once; this is the one card version.
         """
         game = player.game
+        modifiers = game.modifiers
         card_points = game.get_card_points(card)
+        bonus = card_points if self.prefer_high else -card_points
         if card_points < 0:
             desirability = card_points
         elif card.rank == cardtable.Rank.THREE:
             desirability = 0
-        elif player.get_area("down").includes_meld_type(card.get_meld_type(), method = cardtable.Meld.RANK):
-            desirability = 10000 + game.get_card_points(card)
-        elif any(meld.get_type() == card.get_meld_type() for meld in game.get_ready_melds(player)):
-            desirability = 9000
-        elif card.is_wild(): # TODO unless have too many wilds?
-            desirability = 8000
-        elif player.get_area("complete").includes_meld_type(card.get_meld_type(), method = cardtable.Meld.RANK):
-            desirability = 7000 + card_points
+        elif player.get_area("down").includes_meld_type(card.get_meld_type(modifiers = modifiers), method = cardtable.Meld.RANK, modifiers = modifiers):
+            desirability = self.down_tier + bonus
+        elif any(meld.get_type() == card.get_meld_type(modifiers = modifiers) for meld in game.get_ready_melds(player)):
+            desirability = self.ready_tier
+        elif card.is_wild(modifiers): # TODO unless have too many wilds?
+            desirability = self.wild_tier
+        elif player.get_area("complete").includes_meld_type(card.get_meld_type(modifiers = modifiers), method = cardtable.Meld.RANK, modifiers = modifiers):
+            desirability = self.complete_tier + bonus
         # If have at least a pair (2)
-        elif len(player.get_hand().get_cards_by_meld(card.get_meld_type)) >= 2:
-            desirability = 1000 + card_points
+        elif self.pair_tier is not None and len(player.get_hand().get_cards_by_meld(card.get_meld_type(modifiers = modifiers), modifiers = modifiers)) >= 2:
+            desirability = self.pair_tier + bonus
         else:
-            desirability = card_points #TODO how to take into account NOT wanting high value cards near the end?
+            desirability = bonus #TODO how to take into account NOT wanting high value cards near the end?
 
         # TODO remember recent meld_types and favor those?
-        '''
-        if meld_size < 3:
-            desirability = meld_size * 1000
-            if strategy.prefer_high:
-                desirability +=
-        # '''
         return desirability
     def sort_by_desirability(self, cards: typing.List['cardtable.Card'], player: 'cardtable.Player') -> typing.List['cardtable.Card']:
-        cards = sorted(cards, key=lambda card: self.get_card_desirability(card, player), reverse=True)
+        scores = self.get_evaluation(player).face_scores
+        cards = sorted(cards, key=lambda card: scores[card.face], reverse=True)
         return cards
+    def choose_discard(self, cards: typing.List['cardtable.Card'], player: 'cardtable.Player') -> 'cardtable.Card':
+        """ Card to discard from cards, player's hand in Hand.sort order """
+        return self.sort_by_desirability(cards, player)[-1]
+    def choose_lay_down(self, player) -> bool:
+        """ Whether to lay down cards this turn, after the draw, or hold them all """
+        return True
+    def choose_draw_pile(self, player) -> int:
+        """ Index of the draw pile to try first; the others are tried in turn round the table """
+        game = player.game
+        if self.draw_from == self.DRAW_RANDOM:
+            return int(self.get_rng(game).integers(len(game.players)))
+        if self.draw_from == self.DRAW_HAND_SOURCE:
+            return player.hnf_hand_source
+        if self.draw_from == self.DRAW_FOOT_SOURCE:
+            return player.hnf_foot_source
+        if self.draw_from == self.DRAW_CURRENT_SOURCE:
+            return player.hnf_foot_source if player.hnf_in_foot else player.hnf_hand_source
+        return game.players.index(player)
+
+class Evaluation():
+    """
+    Strategy.get_card_desirability for every card face, worked out together.
+
+    The hand's meld counts and the meld types in the down and complete areas are
+    gathered once, then the desirability tiers are picked for all faces in one set of
+    array operations, so scoring a hand is a lookup per card. Only valid while the hand
+    is unchanged (see hand_version); cards only reach the down and complete areas from
+    the hand, so those can't change without it.
+    """
+    def __init__(self, player: cardtable.Player, strategy: Strategy = None):
+        import numpy as np
+        if strategy is None:
+            strategy = player.strategy
+        game = player.game
+        modifiers = game.modifiers
+        method = cardtable.Meld.RANK
+        self.hand = player.get_hand()
+        self.hand_version = self.hand.version
+        points, meld_types, wild, three = game.get_face_arrays()
+        num_types = int(meld_types.max()) + 1
+        ready = np.zeros(num_types, dtype = bool)
+        ready[[meld_type for meld_type, count in self.hand.get_meld_counts(method, modifiers).items()
+            if count >= 3 and meld_type != cardtable.Meld.WILD]] = True
+        in_down = np.zeros(num_types, dtype = bool)
+        in_down[list(player.get_area("down").get_meld_types(method, modifiers))] = True
+        in_complete = np.zeros(num_types, dtype = bool)
+        in_complete[list(player.get_area("complete").get_meld_types(method, modifiers))] = True
+        # The tiers of Strategy.get_card_desirability, lowest first so higher ones overwrite
+        bonus = points if strategy.prefer_high else -points
+        scores = bonus.copy()
+        if strategy.pair_tier is not None:
+            pair = np.zeros(num_types, dtype = bool)
+            pair[[meld_type for meld_type, count in self.hand.get_meld_counts(method, modifiers).items() if count >= 2]] = True
+            tier = pair[meld_types]
+            scores[tier] = bonus[tier] + strategy.pair_tier
+        tier = in_complete[meld_types]
+        scores[tier] = bonus[tier] + strategy.complete_tier
+        scores[wild] = strategy.wild_tier
+        scores[ready[meld_types]] = strategy.ready_tier
+        tier = in_down[meld_types]
+        scores[tier] = bonus[tier] + strategy.down_tier
+        scores[three] = 0
+        tier = points < 0
+        scores[tier] = points[tier]
+        self.face_scores = scores.tolist()
+    def get_desirability(self, card: cardtable.Card) -> int:
+        return self.face_scores[card.face]
+
+class HandSummary():
+    """
+    A player's hand sorted by rank for one turn of HNFGame.play_turn.
+
+    Built once after the draw and kept up to date as play_turn lays down and discards
+    (see lay_down), so turn decisions don't regroup the hand. counts is the number of
+    cards of each rank; for cards that aren't wild the rank value is also the RANK meld
+    type. singletons, pairs and ready are the meld types with 1, 2 and 3 or more cards
+    and played the meld types already in the player's down or complete areas. Types and
+    cards come out in Hand.sort order, so the hand itself needn't be kept sorted.
+    """
+    # Rank values in Hand.sort(method = RANK) order, i.e. by shorthand
+    RANK_ORDER = tuple(rank.value for rank in sorted(cardtable.Rank, key = lambda rank: rank.get_shorthand()))
+    _RANK_POSITIONS = {rank: position for position, rank in enumerate(RANK_ORDER)}
+    def __init__(self, player, modifiers):
+        method = cardtable.Meld.RANK
+        self.modifiers = modifiers
+        self.wild_ranks = {rank.value for rank in modifiers.wild_ranks}
+        self.rank_cards = [[] for _ in range(max(self.RANK_ORDER) + 1)]
+        for card in player.get_hand().cards:
+            self.rank_cards[card.face >> cardtable.RANK_SHIFT].append(card)
+        self.counts = [len(cards) for cards in self.rank_cards]
+        self.wild_count = 0
+        self.singletons = set()
+        self.pairs = set()
+        self.ready = set()
+        for rank, count in enumerate(self.counts):
+            if rank in self.wild_ranks:
+                self.wild_count += count
+            else:
+                self._file(rank, count)
+        self.played = player.get_area("down").get_meld_types(method, modifiers) | player.get_area("complete").get_meld_types(method, modifiers)
+        self.played.discard(cardtable.Meld.WILD)
+    def _file(self, meld_type, count) -> None:
+        """ Put meld_type in the set for count cards """
+        self.singletons.discard(meld_type)
+        self.pairs.discard(meld_type)
+        self.ready.discard(meld_type)
+        if count == 1:
+            self.singletons.add(meld_type)
+        elif count == 2:
+            self.pairs.add(meld_type)
+        elif count >= 3:
+            self.ready.add(meld_type)
+    def remove(self, cards) -> None:
+        for card in cards:
+            rank = card.face >> cardtable.RANK_SHIFT
+            self.rank_cards[rank].remove(card)
+            self.counts[rank] -= 1
+            if rank in self.wild_ranks:
+                self.wild_count -= 1
+            else:
+                self._file(rank, self.counts[rank])
+    def lay_down(self, cards, meld_type) -> None:
+        """ Remove cards laid down as meld_type """
+        self.remove(cards)
+        self.played.add(meld_type)
+    @classmethod
+    def sort_key(cls, card) -> int:
+        """ Key for sorting cards in Hand.sort order """
+        return cls._RANK_POSITIONS[card.face >> cardtable.RANK_SHIFT]
+    def get_types(self, meld_types) -> typing.List[int]:
+        return sorted(meld_types, key = self._RANK_POSITIONS.__getitem__)
+    def get_meld(self, meld_type) -> cardtable.Meld:
+        return cardtable.Meld(method = cardtable.Meld.RANK, cards = self.rank_cards[meld_type], modifiers = self.modifiers)
+    def get_wilds(self) -> typing.List['cardtable.Card']:
+        return [card for rank in self.RANK_ORDER if rank in self.wild_ranks for card in self.rank_cards[rank]]
+    def get_cards(self) -> typing.List['cardtable.Card']:
+        return [card for rank in self.RANK_ORDER for card in self.rank_cards[rank]]
 
 class HNFRules():
     DIRTY_MAX_MINORITY = 1 # Wilds need to be minority of cards in fan
@@ -76,8 +273,8 @@ class HNFRules():
         self.allow_melds_of_wilds = False
         self.allow_add_wilds_to_existing_piles = False
         self.dirty_wildcard_max_rule = self.DIRTY_MAX_MINORITY
-        cardtable.Modifiers.set_wild_ranks([cardtable.Rank.TWO, cardtable.Rank.JOKER])
-        cardtable.Modifiers.set_meld_method(cardtable.Meld.RANK)
+        self.jokers_per_pack = 2
+        self.modifiers = cardtable.CardModifiers(wild_ranks = [cardtable.Rank.TWO, cardtable.Rank.JOKER], meld_method = cardtable.Meld.RANK)
         self.rank_points = { \
             cardtable.Rank.TWO:   20, \
             cardtable.Rank.THREE:  5, \
@@ -93,6 +290,17 @@ class HNFRules():
             cardtable.Rank.KING:  10, \
             cardtable.Rank.ACE:   20, \
             cardtable.Rank.JOKER: 50}
+        self.red_three_points = -300
+    def get_face_points(self) -> tuple:
+        """ Points for each card face (see cardtable.face_id) from rank_points and red_three_points """
+        points = [0] * cardtable.NUM_FACES
+        for rank, rank_points in self.rank_points.items():
+            for suit in cardtable.Suit:
+                if rank == cardtable.Rank.THREE and suit.get_color() == cardtable.Color.RED:
+                    points[cardtable.face_id(rank, suit)] = self.red_three_points
+                else:
+                    points[cardtable.face_id(rank, suit)] = rank_points
+        return tuple(points)
     def xget_card_points(self, card):
         if card.get_shorthand() in ["3D", "3H"]:
             return -300
@@ -102,17 +310,54 @@ class HNFRules():
     def round_starting_points(cls, round):
         return [50, 75, 100, 150][round - 1]
 
+def spawn_seeds(seed = None, count = 1) -> typing.List['np.random.SeedSequence']:
+    """ Independent seeds for count games, e.g. one per task in a process pool """
+    import numpy as np
+    return np.random.SeedSequence(seed).spawn(count)
+
 class HNFGame():
-    def __init__(self):
+    """
+    A game of Hand and Foot.
+
+    All randomness comes from self.rng, seeded from seed (an int or a SeedSequence, e.g.
+    from spawn_seeds). Games with equal seeds and players play out the same, so a game can
+    be re-run from its seed_sequence; with no seed, fresh entropy is used.
+    """
+    def __init__(self, pile_cls = None, seed = None):
+        import numpy as np
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self.rng = np.random.default_rng(seed)
         self.setup = False
         self.players = []
         self.round = 0
         self.round_complete = False
         self.rules = HNFRules()
+        self.modifiers = self.rules.modifiers # Wild and meld lookups for this game only
         #self.packs = []
         #self.piles = []
         #self.table = cards.Table()
-        self.table = cardtable.Table()
+        self.table = cardtable.Table(pile_cls = pile_cls)
+        self.tracer = None # A trace.Tracer to get the game's events
+    _rng = None
+    _rng_state = None
+    @property
+    def rng(self) -> 'np.random.Generator':
+        # Clones and restored games keep the bit generator state until the rng is needed
+        if self._rng is None:
+            import numpy as np
+            bit_generator = getattr(np.random, self._rng_state["bit_generator"])()
+            bit_generator.state = self._rng_state
+            self._rng = np.random.Generator(bit_generator)
+            self._rng_state = None
+        return self._rng
+    @rng.setter
+    def rng(self, rng) -> None:
+        self._rng = rng
+        self._rng_state = None
+    def get_rng_state(self) -> dict:
+        return self._rng_state if self._rng is None else self._rng.bit_generator.state
     def add_player(self, player, strategy):
         player.game = self
         player.strategy = strategy
@@ -122,45 +367,76 @@ class HNFGame():
         player.add_area(cardtable.PlayingArea(name="hand"))
         player.add_area(cardtable.PlayingArea(name="foot"))
         self.table.add_player(player)
+    _face_points = None
+    def get_face_points(self) -> tuple:
+        """ Points by card face, built from the rules on first use """
+        if self._face_points is None:
+            self._face_points = self.rules.get_face_points()
+        return self._face_points
     def get_card_points(self, card):
-        if card.rank == cardtable.Rank.THREE and card.get_color() == cardtable.Color.RED:
-            return -300
-        if card.rank == cardtable.Rank.JOKER:
-            return 50
-        if card.rank == cardtable.Rank.ACE or card.rank == cardtable.Rank.TWO:
-            return 20
-        if card.is_face_card() or card.rank == cardtable.Rank.TEN:
-            return 10
-        else:
-            return 5
+        return self.get_face_points()[card.face]
+    _face_arrays = None
+    def get_face_arrays(self) -> tuple:
+        """ NumPy arrays by card face of points, RANK meld type, wild and THREE, for Evaluation """
+        import numpy as np
+        table = self.modifiers.get_meld_type_table(cardtable.Meld.RANK)
+        if self._face_arrays is None or self._face_arrays[0] is not table:
+            points = np.array(self.get_face_points(), dtype = np.int64)
+            meld_types = np.zeros(cardtable.NUM_FACES, dtype = np.int64)
+            three = np.zeros(cardtable.NUM_FACES, dtype = bool)
+            for rank in cardtable.Rank:
+                for suit in cardtable.Suit:
+                    face = cardtable.face_id(rank, suit)
+                    meld_types[face] = table[face]
+                    three[face] = rank == cardtable.Rank.THREE
+            self._face_arrays = (table, (points, meld_types, meld_types == cardtable.Meld.WILD, three))
+        return self._face_arrays[1]
     def get_points(self, group):
+        face_points = self.get_face_points()
         if isinstance(group, cardtable.CardGroup):
-            c = group.cards
-        elif isinstance(group, cardtable.Meld):
-            c = list(group)
-        elif isinstance(group, 'list'):
+            return group.get_face_total(face_points)
+        elif isinstance(group, list): # Including Meld
             c = group
         else:
-            raise TypeError("Unexpected get_points type: "+type(group))
+            raise TypeError("Unexpected get_points type: "+str(type(group)))
         points = 0
         for card in c:
-            points += self.get_card_points(card)
+            points += face_points[card.face]
         return points
     def get_player_score(self, player):
+        """ Score from the running point totals of the player's groups """
+        face_points = self.get_face_points()
+        complete_area = player.get_area("complete")
+        score = complete_area.get_face_total(face_points)
+        for group in complete_area.groups:
+            if group.hnf_pure == True:
+                score += 300
+            else:
+                score += 100
+        score += player.get_area("down").get_face_total(face_points)
+        score -= player.get_area("hand").get_face_total(face_points)
+        score -= player.get_area("foot").get_face_total(face_points)
+        return score
+    def compute_player_score(self, player):
+        """ get_player_score worked out card by card, to check the running totals """
         score = 0
         for group in player.get_area("complete").groups:
-            score += self.get_points(group)
+            score += sum(self.get_card_points(card) for card in group.cards)
             if group.hnf_pure == True:
                 score += 300
             else:
                 score += 100
-        for group in player.get_area("down").groups:
-            score += self.get_points(group)
-        for group in player.get_area("hand").groups:
-            score -= self.get_points(group)
-        for group in player.get_area("foot").groups:
-            score -= self.get_points(group)
+        for name, sign in [("down", 1), ("hand", -1), ("foot", -1)]:
+            for group in player.get_area(name).groups:
+                score += sign * sum(self.get_card_points(card) for card in group.cards)
         return score
+    def check_scores(self) -> None:
+        """ Raise ValueError if any running score disagrees with compute_player_score """
+        for player in self.players:
+            score = self.get_player_score(player)
+            computed = self.compute_player_score(player)
+            if score != computed:
+                raise ValueError(f"Player {player.name} score {score} should be {computed}")
 
     def game_setup(self):
         if self.setup:
@@ -169,15 +445,15 @@ class HNFGame():
         self.setup = True
         self.table.add_area(cardtable.PlayingArea(name="discard"))
         self.table.add_area(cardtable.PlayingArea(name="draw"))
-        for _ in range(len(self.players) + 1):
-            pack = cardtable.Pack()
-            #self.packs.append(pack)
-            self.table.get_area("discard").append(pack.get_pile())
+        # One pack per player plus one
+        self.shoe = cardtable.Shoe(len(self.players) + 1, jokers = self.rules.jokers_per_pack)
+        self.table.get_area("discard").append(self.shoe.get_pile(pile_cls = self.table.pile_cls))
     def round_setup(self):
         self.round += 1
         logging.info("Setting up round "+str(self.round))
-        if self.round > 4:
+        if self.round > NUM_ROUNDS:
             raise ValueError("Too many rounds")
+        self.round_complete = False
         for player in self.players:
             player.hnf_in_foot = False
             player.hnf_is_down = False
@@ -190,19 +466,23 @@ class HNFGame():
             discard_area.transfer_cards(player.areas)
         discard_area.transfer_cards([draw_area])
         # Shuffle all cards together
-        pile = discard_area.clear_groups()
-        discard_area.append(cardtable.Pile())
-        pile.multi_quick_shuffle(players = self.players)
+        pile = discard_area.clear_groups(pile_cls = self.table.pile_cls)
+        discard_area.append(self.table.pile_cls())
+        pile.multi_quick_shuffle(players = self.players, rng = self.rng)
         for draw_pile in pile.split(num_piles=len(self.players)):
             draw_area.append(draw_pile)
         #draw_area.display()
         for idx, player in enumerate(self.players):
             # Get hands from packs in front of other players
             hands = list()
-            hands.append(cardtable.Pile(cards = draw_area.groups[(idx - 1) % len(self.players)].draw(number = 11)))
-            hands.append(cardtable.Pile(cards = draw_area.groups[(idx + 1) % len(self.players)].draw(number = 11)))
+            sources = [(idx - 1) % len(self.players), (idx + 1) % len(self.players)]
+            for source in sources:
+                hands.append(draw_area.groups[source].draw_pile(number = 11))
             #draw_area.display()
-            player.get_area("foot").append(hands.pop(random.randrange(len(hands))))
+            foot_idx = int(self.rng.integers(len(hands)))
+            player.hnf_foot_source = sources.pop(foot_idx)
+            player.hnf_hand_source = sources.pop()
+            player.get_area("foot").append(hands.pop(foot_idx))
             player.get_area("foot").groups[0].sort(method = cardtable.Meld.RANK)
             player.get_area("hand").append(cardtable.Hand(hands.pop().cards))
             player.get_area("hand").groups[0].sort(method = cardtable.Meld.RANK)
@@ -214,159 +494,171 @@ class HNFGame():
     def play_turn(self, player):
         if self.round_complete:
             raise ValueError("Round is over!")
-        method = cardtable.Meld.RANK
-        hand = player.get_hand()
-        foot = player.get_foot()
         # draw
         self.draw(player)
+        self.finish_turn(player, lay_down = player.strategy.choose_lay_down(player))
+    def finish_turn(self, player, lay_down = True):
+        """ The rest of player's turn after the draw: lay down cards unless lay_down is False, then discard """
+        modifiers = self.modifiers
+        hand = player.get_hand()
         # add to down area melds and complete piles
+        summary = HandSummary(player, modifiers)
         keep_playing = True
         while keep_playing:
-            # TODO track what cards can be laid down, but don't move them yet. Have temp hand that doesn't include those??
-            if not player.hnf_is_down:
-                # TODO combine with below?
-                if self.can_lay_down(player):
-                    melds = self.get_ready_melds(player)
-                    for meld in melds:
-                        self.lay_down_meld(player, meld = meld)
-            else:
-                melds = hand.get_melds(method = cardtable.Meld.RANK, exclude_wilds = True)
-                singleton_cnt = 0
-                pair_cnt = 0
-                for meld in melds:
-                    #print(str(len(meld))+" "+meld.get_type())
-                    if len(meld)>=3 or player.get_area("down").includes_meld_type(meld.get_type(), method = method) \
-                            or player.get_area("complete").includes_meld_type(meld.get_type(), method = method):
-                        self.lay_down_meld(player, meld = meld)
-                    else:
-                        if len(meld) == 1:
-                            singleton_cnt += 1
-                        elif len(meld) == 2:
-                            pair_cnt += 1
-                        else:
-                            raise ValueError("Unexpected leftover meld length of "+len(meld))
-                    #    print(player.get_area("down").includes_meld_type(meld.get_type(), method = method))
-                #TODO play wild cards?
-                wilds = hand.get_wilds()
-                if len(wilds) > 0:
-                    if len(wilds) >= pair_cnt and singleton_cnt <= 1:
-                        logging.debug(f"Player {player.name} laying down with wilds.")
-                        melds = hand.get_melds(cardtable.Meld.RANK, exclude_wilds = True)
-                        for meld in melds:
-                            if len(meld) == 1:
-                                continue
-                            if len(meld) != 2:
-                                raise ValueError(f"Unexpected pair meld length of {len(meld)}")
-                            meld.append(wilds.pop()) # TODO use highest value wild
-                            self.lay_down_meld(player, meld = meld)
-                            pair_cnt -= 1
-                    if len(wilds) > 0 and pair_cnt == 0 and singleton_cnt <= 1:
-                        logging.debug(f"Player {player.name} adding wilds.")
-                        # Add wilds to fans
-                        down_groups = player.get_area(name = "down").get_groups()
-                        down_groups.sort(key=len, reverse=True) # sort largest to smallest
-                        # Add to fans that are already dirty
-                        for group in down_groups:
-                            meld_type = group.cards[0].get_meld_type()
-                            if group.count_wilds() == 0:
-                                continue # Don't dirty a clean pile, yet
-                            for _ in range(min(len(wilds), HNFGame.group_wild_deficit(group))):
-                                self.lay_down_card_by_meld(player, wilds.pop(), meld_type = meld_type)
-                            if len(wilds) == 0:
-                                break
-                        # Add to any fan
-                        down_groups = player.get_area(name = "down").get_groups()
-                        down_groups.sort(key=len) # sort smallest to largest (to preserve clean piles)
-                        for group in down_groups:
-                            meld_type = group.cards[0].get_meld_type()
-                            for _ in range(min(len(wilds), HNFGame.group_wild_deficit(group))):
-                                self.lay_down_card_by_meld(player, wilds.pop(), meld_type = meld_type)
-                            if len(wilds) == 0:
-                                break
-
-                # TODO for each meld > 3 and if down area.includes_meld then play
-                pass #TODO
+            if lay_down:
+                self.lay_down_hand(player, summary)
             # make piles?
             # Discard
             if len(hand) > 0:
-                self.discard(player)
+                self.discard(player, summary = summary)
                 keep_playing = False
             if len(hand) == 0:
-                if len(foot) == 0:
-                    logging.debug(f"Player {player.name} ends the round!")
+                self.hand_emptied(player, keep_playing)
+                if self.round_complete:
                     keep_playing = False
-                    self.round_complete = True
                 else:
-                    if keep_playing:
-                        logging.debug(f"Player {player.name} picks up their foot and keeps playing!")
-                    else:
-                        logging.debug(f"Player {player.name} picks up their foot.")
-                    hand.add(foot.remove_all_cards())
-                    player.hnf_in_foot = True
+                    summary = HandSummary(player, modifiers)
+    def lay_down_hand(self, player, summary):
+        """ Lay down what player's strategy plays from their hand, kept in summary """
+        modifiers = self.modifiers
+        strategy = player.strategy
+        hand = player.get_hand()
+        # TODO track what cards can be laid down, but don't move them yet. Have temp hand that doesn't include those??
+        if not player.hnf_is_down:
+            # TODO combine with below?
+            if self.can_lay_down(player):
+                for meld_type in summary.get_types(summary.ready):
+                    self.lay_down_meld(player, meld = summary.get_meld(meld_type), summary = summary)
+        else:
+            for meld_type in summary.get_types(summary.ready | summary.pairs | summary.singletons):
+                if summary.counts[meld_type] >= 3 or meld_type in summary.played:
+                    self.lay_down_meld(player, meld = summary.get_meld(meld_type), summary = summary)
+            singleton_cnt = len(summary.singletons)
+            pair_cnt = len(summary.pairs)
+            if summary.wild_count > 0:
+                if strategy.laydown_dirty and summary.wild_count >= pair_cnt and singleton_cnt <= 1:
+                    for meld_type in summary.get_types(summary.pairs):
+                        meld = summary.get_meld(meld_type)
+                        meld.append(summary.get_wilds()[-1]) # TODO use highest value wild
+                        self.lay_down_meld(player, meld = meld, summary = summary)
+                        pair_cnt -= 1
+                if summary.wild_count > 0 and pair_cnt == 0 and singleton_cnt <= 1:
+                    # Add wilds to fans
+                    down_groups = player.get_area(name = "down").get_groups()
+                    down_groups.sort(key=len, reverse=True) # sort largest to smallest
+                    # Add to fans that are already dirty
+                    for group in down_groups:
+                        meld_type = group.cards[0].get_meld_type(modifiers = modifiers)
+                        if group.count_wilds(modifiers) == 0:
+                            continue # Don't dirty a clean pile, yet
+                        for _ in range(min(summary.wild_count, HNFGame.group_wild_deficit(group, modifiers))):
+                            self.lay_down_card_by_meld(player, summary.get_wilds()[-1], meld_type = meld_type, summary = summary)
+                        if summary.wild_count == 0:
+                            break
+                    # Add to any fan, if it's not safe to hold on to them
+                    if strategy.dirty_for_safety and (strategy.safe_when_hand_gt is None or len(hand) <= strategy.safe_when_hand_gt):
+                        down_groups = player.get_area(name = "down").get_groups()
+                        down_groups.sort(key=len) # sort smallest to largest (to preserve clean piles)
+                        for group in down_groups:
+                            meld_type = group.cards[0].get_meld_type(modifiers = modifiers)
+                            for _ in range(min(summary.wild_count, HNFGame.group_wild_deficit(group, modifiers))):
+                                self.lay_down_card_by_meld(player, summary.get_wilds()[-1], meld_type = meld_type, summary = summary)
+                            if summary.wild_count == 0:
+                                break
+
+            # TODO for each meld > 3 and if down area.includes_meld then play
+            pass #TODO
+    def hand_emptied(self, player, keep_playing = False):
+        """ End the round if player's foot is played too, otherwise pick it up """
+        foot = player.get_foot()
+        if len(foot) == 0:
+            self.round_complete = True
+            if self.tracer is not None:
+                self.tracer.emit(trace.RoundEnd(self.round, player.name))
+        else:
+            if self.tracer is not None:
+                self.tracer.emit(trace.FootPickup(player.name, keep_playing))
+            player.get_hand().add(foot.remove_all_cards())
+            player.hnf_in_foot = True
     def draw(self, player):
-        # select pile
-        pile_idx = self.players.index(player)
+        pile_idx = player.strategy.choose_draw_pile(player)
         draw_area = self.table.get_area("draw")
         cards = []
-        while(len(cards) < 2):
-            draw_pile = draw_area.groups[(pile_idx ) % len(draw_area.groups)]
-            if len(draw_pile.cards) > 0:
-                cards.extend(draw_pile.draw(number = 2 - len(cards)))
-            pile_idx += 1
-            if pile_idx > len(draw_area.groups):
-                raise(ValueError("Can't find card"))
-        logging.debug(f"Player {player.name} draws {cardtable.cards_to_str(cards)}")
+        # The strategy's pile first, then the next ones round the table
+        for offset in range(len(draw_area.groups)):
+            draw_pile = draw_area.groups[(pile_idx + offset) % len(draw_area.groups)]
+            number = min(2 - len(cards), len(draw_pile))
+            if number > 0:
+                cards.extend(draw_pile.draw(number = number))
+            if len(cards) == 2:
+                break
+        if len(cards) == 0:
+            raise ValueError("Can't find card")
+        if self.tracer is not None:
+            self.tracer.emit(trace.Draw(player.name, tuple(cards)))
         player.get_hand().add(cards)
-        player.get_hand().sort(method = cardtable.Meld.RANK)
-    def lay_down_meld(self, player, meld):
+    def lay_down_meld(self, player, meld, summary = None):
         cards = list(meld)
         meld_type = meld.get_type()
-        if meld_type == "WILD":
+        if meld_type == cardtable.Meld.WILD:
             raise ValueError("Trying to lay down wild meld")
-        logging.debug(f"Player {player.name} lays down {cardtable.cards_to_str(cards)} of type {cards[0].get_meld_type(method=cardtable.Meld.RANK)}")
+        if self.tracer is not None:
+            self.tracer.emit(trace.LayDown(player.name, tuple(cards), meld_type))
         hand = player.get_hand()
         down_area = player.get_area(name = "down")
         hand.remove_cards(cards)
-        down_area.add_to_group_by_meld_type(cards = cards, group_cls = cardtable.Fan, meld_type = meld_type, method = cardtable.Meld.RANK)
-        self.add_fans_to_piles(player = player)
+        if summary is not None:
+            summary.lay_down(cards, meld_type)
+        fans = down_area.add_to_group_by_meld_type(cards = cards, group_cls = cardtable.Fan, meld_type = meld_type, method = cardtable.Meld.RANK, modifiers = self.modifiers)
+        self.add_fans_to_piles(player = player, fans = fans)
         #TODO check that fans have at least 3.
         player.hnf_is_down = True
-    def lay_down_card_by_meld(self, player, card, meld_type):
+    def lay_down_card_by_meld(self, player, card, meld_type, summary = None):
         cards = [card]
-        logging.debug(f"Player {player.name} lays down card {cardtable.cards_to_str(cards)} of type {meld_type}")
-        if meld_type == "WILD":
+        if meld_type == cardtable.Meld.WILD:
             raise ValueError("Trying to lay down wild card")
+        if self.tracer is not None:
+            self.tracer.emit(trace.LayDown(player.name, tuple(cards), meld_type))
         hand = player.get_hand()
         down_area = player.get_area(name = "down")
-        hand.remove_cards(cards)
-        down_area.add_to_group_by_meld_type(cards = cards, group_cls = cardtable.Fan, meld_type = meld_type, method = cardtable.Meld.RANK)
-        self.add_fans_to_piles(player = player)
+        hand.remove(card)
+        if summary is not None:
+            summary.lay_down(cards, meld_type)
+        fans = down_area.add_to_group_by_meld_type(cards = cards, group_cls = cardtable.Fan, meld_type = meld_type, method = cardtable.Meld.RANK, modifiers = self.modifiers)
+        self.add_fans_to_piles(player = player, fans = fans)
         #TODO check that fans have at least 3.
         player.hnf_is_down = True
-    def add_fans_to_piles(self, player):
+    def add_fans_to_piles(self, player, fans = None):
+        """ Move fans that make or add to a pile into the complete area.
+
+        fans limits the check to the fans that changed; by default all fans are checked.
+        """
         method = cardtable.Meld.RANK
         down_area = player.get_area(name = "down")
         complete_area = player.get_area(name = "complete")
-        for fan in down_area.groups:
+        if fans is None:
+            fans = down_area.get_groups()
+        for fan in fans:
             if len(fan.cards) == 0:
-                continue # or remove it?
-            meld_type = fan.cards[0].get_meld_type(method = method)
-            pile = complete_area.get_group_by_meld_type(meld_type = meld_type, method = method)
+                down_area.remove(fan)
+                continue
+            meld_type = fan.cards[0].get_meld_type(method = method, modifiers = self.modifiers)
+            pile = complete_area.get_group_by_meld_type(meld_type = meld_type, method = method, modifiers = self.modifiers)
             if pile is None and len(fan.cards) >= MIN_PILE_SIZE:
                 pile = cardtable.Pile()
                 pile.face_up = True
-                if pile.count_wilds() == 0:
+                if pile.count_wilds(self.modifiers) == 0:
                     pile.hnf_pure = True
                 else:
                     pile.hnf_pure = False
                 complete_area.append(pile)
             if pile is not None:
-                logging.debug(f"Player {player.name} added {cardtable.cards_to_str(fan.cards)} to a pile")
-                pile.add(fan.cards)
-                fan.cards = []
+                if self.tracer is not None:
+                    self.tracer.emit(trace.AddToPile(player.name, tuple(fan.cards)))
+                pile.add(fan.remove_all_cards())
+                down_area.remove(fan)
                 #player.display()
-        down_area.remove_empty_groups()
-    def discard(self, player):
+    def discard(self, player, summary = None):
         # Temp simple code
         hand = player.get_hand()
         if len(hand.cards) == 0:
@@ -376,13 +668,20 @@ class HNFGame():
         melds.sort(key=len)
         card = melds[0][0]
         """
-        card = player.strategy.sort_by_desirability(hand.cards, player)[-1]
+        # Candidates in Hand.sort order, which breaks ties between equally desirable cards
+        cards = summary.get_cards() if summary is not None else sorted(hand.cards, key = HandSummary.sort_key)
+        self.discard_card(player, player.strategy.choose_discard(cards, player), summary = summary)
+    def discard_card(self, player, card, summary = None):
+        hand = player.get_hand()
         hand.remove(card)
-        logging.debug(f"Player {player.name} discards {card.get_shorthand()} leaving {cardtable.cards_to_str(hand.cards)}")
+        if summary is not None:
+            summary.remove([card])
+        if self.tracer is not None:
+            self.tracer.emit(trace.Discard(player.name, card, tuple(hand.cards)))
         self.table.get_area("discard").groups[0].push(card)
 
     def get_ready_melds(self, player) -> typing.List['cardtable.Meld']:
-        melds = player.get_hand().get_melds(cardtable.Meld.RANK, exclude_wilds = True)
+        melds = player.get_hand().get_melds(cardtable.Meld.RANK, exclude_wilds = True, modifiers = self.modifiers)
         ready = []
         for meld in melds:
             if len(meld) >= 3:
@@ -401,28 +700,144 @@ class HNFGame():
     def start(self):
         self.game_setup()
         self.round_setup()
+    def clone(self, copy_strategies = True) -> 'HNFGame':
+        """
+        Copy of the game to play on without changing this one, e.g. for lookahead.
+
+        Players, areas, groups and the seed sequence are copied; cards, rules and the
+        shoe are shared. Strategies are deep copied too, rngs and all, unless
+        copy_strategies is False for callers that give the players others. The copy has
+        no tracer and its rngs carry on from this game's states.
+        """
+        import copy
+        game = object.__new__(type(self))
+        game.__dict__.update(self.__dict__)
+        game._rng = None
+        game._rng_state = self.get_rng_state()
+        game.seed_sequence = copy.deepcopy(self.seed_sequence)
+        game.tracer = None
+        game.players = [player.clone() for player in self.players]
+        memo = dict() # Players sharing a strategy still share its copy
+        for player in game.players:
+            player.game = game
+            if copy_strategies:
+                player.strategy = copy.deepcopy(player.strategy, memo)
+        game.table = self.table.clone(players = game.players)
+        return game
     @classmethod
-    def group_wild_deficit(cls, group) -> int:
+    def _snapshot_attrs(cls, obj) -> dict:
+        # The game's own attributes of groups and players: face_up, meld_type and the hnf_ ones
+        return {name: value for name, value in vars(obj).items() if name in ("face_up", "meld_type") or name.startswith("hnf_")}
+    def snapshot(self) -> bytes:
+        """
+        The state of the game in play as bytes, for restore.
+
+        The bytes are JSON of plain values, with each group's cards packed by
+        cardtable.cards_to_bytes, so restoring one runs no code from it.
+        """
+        import json
+        import base64
+        def areas_state(areas):
+            return [[area.name, [[type(group).__name__, self._snapshot_attrs(group), base64.b64encode(cardtable.cards_to_bytes(group.cards)).decode("ascii")]
+                for group in area.groups]] for area in areas]
+        return json.dumps([
+            self.round,
+            self.round_complete,
+            self.setup,
+            self.get_rng_state(),
+            cardtable.get_back_names(),
+            areas_state(self.table.areas),
+            [[self._snapshot_attrs(player), areas_state(player.areas)] for player in self.players],
+            ], separators = (",", ":")).encode("ascii")
+    def restore(self, snapshot) -> None:
+        """ Put the game back in the state of snapshot, from this game or one with the same players """
+        import json
+        import base64
+        (self.round, self.round_complete, self.setup, rng_state, back_names, table_areas, players) = json.loads(snapshot)
+        if len(players) != len(self.players):
+            raise ValueError(f"Snapshot has {len(players)} players, game has {len(self.players)}")
+        def restore_areas(owner, areas):
+            for name, groups in areas:
+                try:
+                    area = owner.get_area(name)
+                except ValueError:
+                    area = cardtable.PlayingArea(name = name)
+                    owner.add_area(area)
+                area.groups = [restore_group(*group) for group in groups]
+        def restore_group(cls_name, attrs, cards):
+            cls = getattr(cardtable, cls_name, None)
+            if not (isinstance(cls, type) and issubclass(cls, cardtable.CardGroup)):
+                raise ValueError("Not a card group: "+cls_name)
+            group = object.__new__(cls)
+            group.__dict__.update(self._snapshot_attrs(SimpleNamespace(**attrs)))
+            group.cards = cardtable.cards_from_bytes(base64.b64decode(cards), back_names)
+            return group
+        self._rng = None
+        self._rng_state = rng_state
+        restore_areas(self.table, table_areas)
+        for player, (attrs, areas) in zip(self.players, players):
+            player.__dict__.update(self._snapshot_attrs(SimpleNamespace(**attrs)))
+            restore_areas(player, areas)
+    def run_round(self, max_turns = 1000) -> typing.Tuple[int, typing.Tuple[int, ...]]:
+        """
+        Set up and play the next round to the end, without display.
+
+        Players take turns starting one seat further round each round. The round also
+        ends if the draw piles run out or after max_turns turns. Returns the number of
+        turns and each player's score for the round.
+        """
+        self.round_setup()
+        players = self.players
+        first = self.round - 1
+        draw_area = self.table.get_area("draw")
+        turns = 0
+        while not self.round_complete and turns < max_turns:
+            if not any(len(pile) for pile in draw_area.groups):
+                break
+            self.play_turn(players[(first + turns) % len(players)])
+            turns += 1
+        if not self.round_complete and self.tracer is not None:
+            self.tracer.emit(trace.RoundEnd(self.round, None))
+        return turns, tuple(self.get_player_score(player) for player in players)
+    def run_game(self, max_turns_per_round = 1000) -> GameResult:
+        """ Set up and play all rounds of a new game, returning a GameResult """
+        if self.setup:
+            raise ValueError("Game already started")
+        self.game_setup()
+        round_turns = []
+        round_scores = []
+        for _ in range(NUM_ROUNDS):
+            turns, scores = self.run_round(max_turns = max_turns_per_round)
+            round_turns.append(turns)
+            round_scores.append(scores)
+        totals = tuple(sum(scores) for scores in zip(*round_scores))
+        return GameResult(
+            seed = (self.seed_sequence.entropy, tuple(self.seed_sequence.spawn_key)),
+            round_turns = tuple(round_turns),
+            round_scores = tuple(round_scores),
+            scores = totals,
+            winner = totals.index(max(totals)))
+    @classmethod
+    def group_wild_deficit(cls, group, modifiers = None) -> int:
         card_cnt = len(group)
         if card_cnt == 0:
             return 0
-        wild_cnt = group.count_wilds()
+        wild_cnt = group.count_wilds(modifiers)
         non_wild_cnt = card_cnt - wild_cnt
         return min(non_wild_cnt - 1, MIN_PILE_SIZE - card_cnt)
 
 if __name__ == "__main__":
-    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.DEBUG)
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
     g = HNFGame()
     g.add_player(cardtable.Player("J", precision=5, speed=1.2), Strategy())
     g.add_player(cardtable.Player("S", precision=10, speed=1), Strategy())
     g.add_player(cardtable.Player("L", precision=7, speed=1), Strategy())
     g.add_player(cardtable.Player("A", precision=15, speed=.9), Strategy())
-    #g.game_setup()
-    #g.round_setup()
-    g.start()
-    #g.display()
-
-    g.players[0].display()
-    for i in range(50):
-        g.play_turn(player = g.players[0])
-    g.players[0].display()
+    g.tracer = trace.Tracer(buffer_size = 10)
+    result = g.run_game()
+    for round, (turns, scores) in enumerate(zip(result.round_turns, result.round_scores), start = 1):
+        print(f"Round {round}: {turns} turns, scores {scores}")
+    print(f"Totals {result.scores}, winner {g.players[result.winner].name}")
+    print("Last events:")
+    for event in g.tracer.buffer:
+        print(event)
@@ -0,0 +1,116 @@
+"""
+Shuffle quality metrics over card orderings.
+
+Metrics take a (num_decks, count) array of decks like handnfoot.shuffling, where
+each row holds the original positions 0 to count - 1 of the cards in their new
+order (see positions_from_ids). They return one value per deck, so millions of
+shuffled decks can be scored in a few array operations.
+"""
+import functools
+import numpy as np
+from . import cardtable
+
+def positions_from_ids(decks, reference_ids) -> np.ndarray:
+    """ Convert decks of card ids into decks of positions in reference_ids """
+    reference_ids = np.asarray(reference_ids)
+    lookup = np.full(reference_ids.max() + 1, -1, dtype = np.int64)
+    lookup[reference_ids] = np.arange(len(reference_ids))
+    return lookup[np.asarray(decks)]
+
+def card_ranks(ids) -> np.ndarray:
+    """ Rank values (see cardtable.Rank) of an array of card ids """
+    return (np.asarray(ids) & cardtable.FACE_MASK) >> cardtable.RANK_SHIFT
+
+def _inverse(decks) -> np.ndarray:
+    """ For each deck, the new position of each original position """
+    decks = np.atleast_2d(decks)
+    inverse = np.empty_like(decks)
+    np.put_along_axis(inverse, decks, np.arange(decks.shape[1]), axis = 1)
+    return inverse
+
+def rising_sequences(decks) -> np.ndarray:
+    """ Number of rising sequences in each deck.
+
+    A rising sequence is a maximal run of consecutive original positions that are still in
+    increasing order. An unshuffled deck has 1; each riffle at most doubles the count.
+    """
+    inverse = _inverse(decks)
+    return 1 + np.count_nonzero(inverse[:, 1:] < inverse[:, :-1], axis = 1)
+
+@functools.lru_cache(maxsize = None)
+def rising_sequence_distribution(count) -> np.ndarray:
+    """ P(rising sequences = k) for k = 0 to count under a uniformly random order.
+
+    These are the Eulerian numbers divided by count!.
+    """
+    # Eulerian numbers A(n, k) for k = 1..n descents + 1, exact with Python ints
+    eulerian = [1]
+    for n in range(2, count + 1):
+        eulerian = [(k + 1) * (eulerian[k] if k < n - 1 else 0) + (n - k) * (eulerian[k - 1] if k > 0 else 0)
+            for k in range(n)]
+    total = sum(eulerian)
+    return np.array([0.0] + [value / total for value in eulerian])
+
+def rising_sequence_tv(decks) -> float:
+    """ Estimated total variation distance of the decks from a uniformly random order.
+
+    Compares the distribution of rising sequence counts with its exact uniform
+    distribution. For riffle shuffles the probability of an order depends only on its
+    rising sequences, so this is also the distance of the shuffle itself (Bayer and
+    Diaconis). The estimate is biased up by sampling noise with few decks.
+    """
+    decks = np.atleast_2d(decks)
+    count = decks.shape[1]
+    observed = np.bincount(rising_sequences(decks), minlength = count + 1) / len(decks)
+    return 0.5 * np.abs(observed - rising_sequence_distribution(count)).sum()
+
+def adjacent_same_rank_rate(ranks) -> np.ndarray:
+    """ Fraction of adjacent card pairs with the same rank in each deck of ranks """
+    ranks = np.atleast_2d(ranks)
+    return np.count_nonzero(ranks[:, 1:] == ranks[:, :-1], axis = 1) / (ranks.shape[1] - 1)
+
+def expected_adjacent_same_rank_rate(ranks) -> float:
+    """ adjacent_same_rank_rate of a uniformly random order of one deck of ranks """
+    counts = np.bincount(np.ravel(ranks)).astype(np.float64)
+    count = counts.sum()
+    return (counts * (counts - 1)).sum() / (count * (count - 1))
+
+def position_drift(decks) -> np.ndarray:
+    """ Mean distance each card moved from its original position, per deck """
+    inverse = _inverse(decks)
+    return np.abs(inverse - np.arange(inverse.shape[1])).mean(axis = 1)
+
+def expected_position_drift(count) -> float:
+    """ position_drift of a uniformly random order of count cards """
+    return (count * count - 1) / (3 * count)
+
+def position_tv(decks) -> float:
+    """ Estimated total variation distance of card positions from uniform.
+
+    For each original position, compares where it ended up across the decks with a
+    uniform 1 / count, and averages over positions. Needs many more decks than cards
+    to be meaningful; the estimate is biased up by sampling noise.
+    """
+    inverse = _inverse(decks)
+    num_decks, count = inverse.shape
+    cells = (np.arange(count) * count + inverse).ravel()
+    frequencies = np.bincount(cells, minlength = count * count).reshape(count, count) / num_decks
+    return 0.5 * np.abs(frequencies - 1 / count).sum(axis = 1).mean()
+
+def summarize(decks, ranks = None) -> dict:
+    """ Batch averages of the metrics, with their values for a uniformly random order """
+    decks = np.atleast_2d(decks)
+    count = decks.shape[1]
+    summary = {
+        "rising_sequences": rising_sequences(decks).mean(),
+        "uniform_rising_sequences": (count + 1) / 2,
+        "rising_sequence_tv": rising_sequence_tv(decks),
+        "position_drift": position_drift(decks).mean(),
+        "uniform_position_drift": expected_position_drift(count),
+        "position_tv": position_tv(decks),
+    }
+    if ranks is not None:
+        ranks = np.atleast_2d(ranks)
+        summary["adjacent_same_rank_rate"] = adjacent_same_rank_rate(ranks).mean()
+        summary["uniform_adjacent_same_rank_rate"] = expected_adjacent_same_rank_rate(ranks[0])
+    return summary
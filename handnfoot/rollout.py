@@ -0,0 +1,151 @@
+"""
+Monte Carlo rollout strategy for Hand and Foot.
+
+RolloutStrategy picks its discard, and whether to lay down cards or hold them, by
+simulation. For each choice it copies the game, reshuffles the cards the player
+can't see (the draw piles, the other hands and all the feet) into their places,
+makes the choice and plays on with the default Strategy for every player. The
+choice with the best average outcome wins. Outcome is the player's score less the
+mean of the other players' scores at the end of the rollout.
+
+Run from the repository root:  python -m handnfoot.rollout
+"""
+import time
+import typing
+import numpy as np
+from . import cardtable
+from . import handnfoot
+
+class RolloutStrategy(handnfoot.Strategy):
+    """
+    Strategy that chooses discards and lay downs by determinized rollouts.
+
+    Each decision spends up to rollouts rollouts or time_budget seconds, whichever
+    runs out first, spread round robin over the choices: the candidates least
+    desirable discards of the default policy, or laying down what the default policy
+    would against holding every card. Rollouts play depth more turns, or to the end
+    of the round if depth is None. Hidden cards are sampled from get_rng, so with no
+    seed a game still replays from its own. rollouts_done and rollout_seconds add up
+    the work done, for rollouts per second.
+    """
+    def __init__(self, rollouts = 32, time_budget = None, candidates = 4, depth = None, seed = None):
+        super(RolloutStrategy, self).__init__(seed = seed)
+        if rollouts is None and time_budget is None:
+            raise ValueError("Need a rollout or time budget")
+        self.rollouts = rollouts
+        self.time_budget = time_budget
+        self.candidates = candidates
+        self.depth = depth
+        self.default_policy = handnfoot.Strategy()
+        self.rollouts_done = 0
+        self.rollout_seconds = 0.0
+    def get_candidates(self, cards, player) -> typing.List['cardtable.Card']:
+        """ Up to self.candidates distinct cards, least desirable first """
+        candidates = []
+        faces = set()
+        for card in reversed(self.default_policy.sort_by_desirability(cards, player)):
+            if card.face not in faces:
+                faces.add(card.face)
+                candidates.append(card)
+                if len(candidates) == self.candidates:
+                    break
+        return candidates
+    def choose_discard(self, cards, player) -> 'cardtable.Card':
+        candidates = self.get_candidates(cards, player)
+        return self.choose(player, candidates, self.rollout)
+    def choose_lay_down(self, player) -> bool:
+        # Only worth rolling out if the default policy would lay anything down
+        game = self.copy_game(player.game)
+        copy = game.players[player.game.players.index(player)]
+        size = len(copy.get_hand())
+        game.lay_down_hand(copy, handnfoot.HandSummary(copy, game.modifiers))
+        if len(copy.get_hand()) == size:
+            return True
+        return self.choose(player, [True, False], self.rollout_lay_down)
+    def choose(self, player, choices, rollout) -> typing.Any:
+        """ The choice with the best mean rollout(player, choice, sample_seed), the first if only one """
+        if len(choices) == 1:
+            return choices[0]
+        totals = [0.0] * len(choices)
+        counts = [0] * len(choices)
+        start = time.perf_counter()
+        done = 0
+        while self.rollouts is None or done < self.rollouts:
+            if self.time_budget is not None and time.perf_counter() - start >= self.time_budget:
+                break
+            idx = done % len(choices)
+            if idx == 0:
+                # Every choice is tried on the same sampled hidden cards, so they're compared fairly
+                sample_seed = int(self.get_rng(player.game).integers(1 << 62))
+            totals[idx] += rollout(player, choices[idx], sample_seed)
+            counts[idx] += 1
+            done += 1
+        self.rollouts_done += done
+        self.rollout_seconds += time.perf_counter() - start
+        if done == 0:
+            return choices[0]
+        # Choices the budget didn't reach are skipped; the first one always gets a rollout
+        means = [total / count if count else float("-inf") for total, count in zip(totals, counts)]
+        return choices[means.index(max(means))]
+    def rollout(self, player, card, sample_seed = None) -> float:
+        """ Outcome for player of discarding card, in the game sampled from sample_seed """
+        game, player = self.sample_game(player, sample_seed)
+        game.discard_card(player, card)
+        if len(player.get_hand()) == 0:
+            game.hand_emptied(player)
+        return self.play_out(game, player)
+    def rollout_lay_down(self, player, lay_down, sample_seed = None) -> float:
+        """ Outcome for player of laying down cards or not, after the draw, in the game sampled from sample_seed """
+        game, player = self.sample_game(player, sample_seed)
+        game.finish_turn(player, lay_down = lay_down)
+        return self.play_out(game, player)
+    def sample_game(self, player, sample_seed) -> typing.Tuple[handnfoot.HNFGame, 'cardtable.Player']:
+        """ Copy of player's game with the hidden cards sampled from sample_seed, and player in it """
+        game = self.copy_game(player.game)
+        player = game.players[player.game.players.index(player)]
+        self.sample_hidden(game, player, np.random.default_rng(sample_seed))
+        return game, player
+    def play_out(self, game, player) -> float:
+        """ Play on from the end of player's turn and return player's outcome """
+        players = game.players
+        next_idx = players.index(player) + 1
+        draw_area = game.table.get_area("draw")
+        turns = 0
+        while not game.round_complete and (self.depth is None or turns < self.depth):
+            if not any(len(pile) for pile in draw_area.groups):
+                break
+            game.play_turn(players[(next_idx + turns) % len(players)])
+            turns += 1
+        scores = [game.get_player_score(other) for other in players]
+        score = scores.pop(players.index(player))
+        return score - sum(scores) / len(scores) if scores else score
+    def copy_game(self, game) -> handnfoot.HNFGame:
+        """ Copy of game for a rollout, with the default policy for every player and no tracer """
+        game = game.clone(copy_strategies = False)
+        for player in game.players:
+            player.strategy = self.default_policy
+        return game
+    def sample_hidden(self, game, player, rng) -> None:
+        """ Deal the cards player can't see back into their groups in a random order """
+        groups = list(game.table.get_area("draw").groups)
+        for other in game.players:
+            groups.extend(other.get_area("foot").groups)
+            if other is not player:
+                groups.extend(other.get_area("hand").groups)
+        cards = [card for group in groups for card in group.cards]
+        order = rng.permutation(len(cards)).tolist()
+        start = 0
+        for group in groups:
+            size = len(group)
+            group.cards = [cards[idx] for idx in order[start:start + size]]
+            start += size
+
+if __name__ == "__main__":
+    game = handnfoot.HNFGame(seed = 0)
+    rollout = RolloutStrategy(rollouts = 16, depth = 8, seed = 0)
+    game.add_player(cardtable.Player("R"), rollout)
+    for name in ["S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy())
+    result = game.run_game()
+    print(f"Scores {result.scores}, winner {game.players[result.winner].name}")
+    print(f"{rollout.rollouts_done} rollouts in {rollout.rollout_seconds:.1f}s: {rollout.rollouts_done / rollout.rollout_seconds:.0f} rollouts/s")
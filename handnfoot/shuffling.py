@@ -0,0 +1,127 @@
+"""
+Vectorized shuffles over card orderings.
+
+Decks are (num_decks, count) integer arrays, one deck per row, with the top of
+each deck at the end of its row like Pile. Every row is shuffled independently
+in one set of array operations. The *_order functions return an order array
+for a single deck: the shuffled deck is deck[order].
+"""
+import numpy as np
+
+# Same values as the Pile shuffle method constants
+PERFECT_SHUFFLE = 1
+RIFFLE_SHUFFLE = 2
+VECTOR_RIFFLE_SHUFFLE = 4
+OVERHAND_SHUFFLE = 5
+
+# Decks are shuffled in blocks of about this many cards (times iterations) to bound memory
+_BLOCK_CELLS = 1 << 20
+
+_rng = np.random.default_rng()
+
+def _clump_sizes(shape, precision, rng) -> np.ndarray:
+    """ Sizes of the clumps of 1 to precision - 1 cards that fall from a half """
+    if precision <= 2:
+        return np.ones(shape, dtype = np.int64)
+    return rng.integers(1, precision, size = shape)
+
+def _riffle_sources(num_riffles, count, precision, rng) -> np.ndarray:
+    """ (num_riffles, count) array of independent riffles, see riffle_order """
+    half = int(count / 2)
+    if precision == 1:
+        mid_idx = np.full(num_riffles, half)
+    else:
+        mid_idx = half + rng.integers(0 - (precision - 1), precision - 1, size = num_riffles)
+    # Each half is a slice of the deck: the top half [mid_idx, count) falls first,
+    # then the bottom half [0, mid_idx). Clump j of each half is cut short once the
+    # half runs out, so the rest of the longer half ends up last.
+    half_starts = np.stack((mid_idx, np.zeros_like(mid_idx)), axis = 1)
+    half_lengths = np.stack((count - mid_idx, mid_idx), axis = 1)
+    sizes = _clump_sizes((num_riffles, 2, count - half + precision), precision, rng)
+    ends = np.minimum(np.cumsum(sizes, axis = 2), half_lengths[:, :, None])
+    starts = np.zeros_like(ends)
+    starts[:, :, 1:] = ends[:, :, :-1]
+    # Interleave the clumps: A0, B0, A1, B1, ...
+    run_sizes = (ends - starts).transpose(0, 2, 1).reshape(num_riffles, -1)
+    run_sources = (starts + half_starts[:, :, None]).transpose(0, 2, 1).reshape(num_riffles, -1)
+    run_targets = np.cumsum(run_sizes, axis = 1) - run_sizes
+    offsets = np.repeat((run_sources - run_targets).ravel(), run_sizes.ravel())
+    return offsets.reshape(num_riffles, count) + np.arange(count)
+
+def _overhand_sources(num_shuffles, count, precision, rng) -> np.ndarray:
+    """ (num_shuffles, count) array of independent overhand shuffles, see overhand_shuffle """
+    sizes = _clump_sizes((num_shuffles, count), precision, rng)
+    ends = np.minimum(np.cumsum(sizes, axis = 1), count)
+    starts = np.zeros_like(ends)
+    starts[:, 1:] = ends[:, :-1]
+    # Packet j is taken from the top, [count - ends_j, count - starts_j), and dropped
+    # onto the new pile at [starts_j, ends_j)
+    run_sizes = ends - starts
+    offsets = np.repeat((count - ends - starts).ravel(), run_sizes.ravel())
+    return offsets.reshape(num_shuffles, count) + np.arange(count)
+
+def _shuffle(decks, iterations, precision, sources, rng) -> np.ndarray:
+    decks = np.array(decks)
+    num_decks, count = decks.shape
+    if count < 2 or iterations < 1 or num_decks == 0:
+        return decks
+    if rng is None:
+        rng = _rng
+    block = max(1, _BLOCK_CELLS // (count * iterations))
+    for first in range(0, num_decks, block):
+        rows = decks[first:first + block]
+        # The shuffles don't depend on the cards they are applied to, so draw them all at once
+        orders = sources(iterations * len(rows), count, precision, rng).reshape(iterations, len(rows), count)
+        for iteration in range(iterations):
+            rows = np.take_along_axis(rows, orders[iteration], axis = 1)
+        decks[first:first + block] = rows
+    return decks
+
+def new_decks(num_decks, count) -> np.ndarray:
+    """ num_decks unshuffled decks, each holding positions 0 to count - 1 """
+    return np.tile(np.arange(count), (num_decks, 1))
+
+def perfect_shuffle(decks, rng = None) -> np.ndarray:
+    """ Uniformly random permutation of each deck """
+    if rng is None:
+        rng = _rng
+    return rng.permuted(decks, axis = 1)
+
+def riffle_shuffle(decks, iterations = 7, precision = 10, rng = None) -> np.ndarray:
+    """ Riffle shuffle each deck, see riffle_order """
+    count = np.shape(decks)[1]
+    if precision > count / 2:
+        precision = max(1, int(count / 2))
+    return _shuffle(decks, iterations, precision, _riffle_sources, rng)
+
+def overhand_shuffle(decks, iterations = 7, precision = 10, rng = None) -> np.ndarray:
+    """ Overhand shuffle each deck.
+
+    Packets of 1 to precision - 1 cards are taken from the top of the deck and dropped
+    onto a new pile, reversing the order of the packets but not the cards in them.
+    """
+    return _shuffle(decks, iterations, precision, _overhand_sources, rng)
+
+def shuffle_decks(decks, method = RIFFLE_SHUFFLE, iterations = 7, precision = 10, rng = None) -> np.ndarray:
+    """ Shuffle each deck with one of the Pile shuffle methods """
+    if method == PERFECT_SHUFFLE:
+        return perfect_shuffle(decks, rng = rng)
+    elif method == RIFFLE_SHUFFLE or method == VECTOR_RIFFLE_SHUFFLE:
+        return riffle_shuffle(decks, iterations = iterations, precision = precision, rng = rng)
+    elif method == OVERHAND_SHUFFLE:
+        return overhand_shuffle(decks, iterations = iterations, precision = precision, rng = rng)
+    else:
+        raise ValueError("Unknown shuffle method: "+str(method))
+
+def riffle_order(count, iterations = 7, precision = 10, rng = None) -> np.ndarray:
+    """ Order for a riffle shuffle of count cards, in linear time per iteration.
+
+    Same model as Pile.riffle_shuffle: the deck is cut near the middle (off by up to
+    precision - 1 cards) and clumps of 1 to precision - 1 cards fall alternately
+    from each half, starting with the top half, until one half runs out.
+    """
+    return riffle_shuffle(new_decks(1, count), iterations = iterations, precision = precision, rng = rng)[0]
+
+def overhand_order(count, iterations = 7, precision = 10, rng = None) -> np.ndarray:
+    """ Order for an overhand shuffle of count cards, see overhand_shuffle """
+    return overhand_shuffle(new_decks(1, count), iterations = iterations, precision = precision, rng = rng)[0]
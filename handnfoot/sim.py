@@ -0,0 +1,152 @@
+"""
+Run many Hand and Foot games over a process pool and aggregate their results.
+
+A GameConfig names the players, their strategies, rule changes and a range of
+seeds. Games are played in chunks by worker processes, each chunk is reduced to
+a SimStats in the worker, and only those small aggregates come back, so the
+runner scales with the number of cores. Game i of a config is seeded with
+spawn_seeds(config.seed, ...)[i] whatever the chunking and number of workers,
+so a run repeats exactly and any single game can be replayed.
+
+Run from the repository root:  python -m handnfoot.sim
+"""
+import os
+import copy
+import time
+import typing
+import collections
+import multiprocessing
+import numpy as np
+from . import cardtable
+from . import handnfoot
+
+class GameConfig(typing.NamedTuple):
+    """ Everything needed to set up the games of a simulation; must be picklable """
+    players: typing.Tuple[tuple, ...] = (("J",), ("S",), ("L",), ("A",)) # cardtable.Player arguments
+    strategies: typing.Optional[tuple] = None # one Strategy per player, default Strategy()
+    rules: typing.Optional[dict] = None # HNFRules attributes to change
+    seed: typing.Optional[int] = None # root entropy; None picks one per run
+    num_games: int = 1000
+    max_turns_per_round: int = 1000
+
+class SimStats():
+    """ Aggregate results of a set of games; merge combines the stats of two sets """
+    SCORE_BIN = 100 # Width of the score_histograms bins
+    def __init__(self, num_players):
+        self.games = 0
+        self.seconds = 0.0
+        self.wins = [0] * num_players
+        self.score_sums = [0] * num_players
+        self.score_squares = [0] * num_players
+        self.score_histograms = [collections.Counter() for _ in range(num_players)]
+        self.round_turns = [0] * handnfoot.NUM_ROUNDS
+    def add(self, result: handnfoot.GameResult) -> None:
+        self.games += 1
+        self.wins[result.winner] += 1
+        for idx, score in enumerate(result.scores):
+            self.score_sums[idx] += score
+            self.score_squares[idx] += score * score
+            self.score_histograms[idx][score // self.SCORE_BIN * self.SCORE_BIN] += 1
+        for idx, turns in enumerate(result.round_turns):
+            self.round_turns[idx] += turns
+    def merge(self, other: 'SimStats') -> None:
+        self.games += other.games
+        for idx in range(len(self.wins)):
+            self.wins[idx] += other.wins[idx]
+            self.score_sums[idx] += other.score_sums[idx]
+            self.score_squares[idx] += other.score_squares[idx]
+            self.score_histograms[idx].update(other.score_histograms[idx])
+        for idx in range(len(self.round_turns)):
+            self.round_turns[idx] += other.round_turns[idx]
+    def win_rates(self) -> typing.List[float]:
+        return [wins / self.games for wins in self.wins]
+    def mean_scores(self) -> typing.List[float]:
+        return [total / self.games for total in self.score_sums]
+    def score_stds(self) -> typing.List[float]:
+        """ Population standard deviation of each player's total score """
+        return [max(0.0, squares / self.games - mean * mean) ** 0.5
+            for squares, mean in zip(self.score_squares, self.mean_scores())]
+    def mean_round_turns(self) -> typing.List[float]:
+        """ Average turns taken in each round """
+        return [turns / self.games for turns in self.round_turns]
+    def games_per_second(self) -> float:
+        return self.games / self.seconds if self.seconds > 0 else 0.0
+
+def game_seed(config: GameConfig, game_idx: int) -> 'np.random.SeedSequence':
+    """ Seed of game game_idx of config, the same as spawn_seeds(config.seed, n)[game_idx] """
+    if config.seed is None:
+        raise ValueError("Config has no seed")
+    return np.random.SeedSequence(config.seed, spawn_key = (game_idx,))
+
+def new_game(config: GameConfig, game_idx: int) -> handnfoot.HNFGame:
+    """ Game game_idx of config, set up with its players and ready to run """
+    game = handnfoot.HNFGame(seed = game_seed(config, game_idx))
+    for name, value in (config.rules or {}).items():
+        if not hasattr(game.rules, name):
+            raise ValueError("Unknown rule: "+name)
+        setattr(game.rules, name, value)
+    game.modifiers = game.rules.modifiers
+    strategies = config.strategies
+    if strategies is None:
+        strategies = [handnfoot.Strategy() for _ in config.players]
+    if len(strategies) != len(config.players):
+        raise ValueError("Need one strategy per player")
+    # Strategies may keep state, e.g. their rng, so every game starts from fresh copies
+    strategies = copy.deepcopy(strategies)
+    for args, strategy in zip(config.players, strategies):
+        game.add_player(cardtable.Player(*args), strategy)
+    return game
+
+def run_chunk(config: GameConfig, start: int, stop: int) -> SimStats:
+    """ Play games start to stop - 1 of config and aggregate them """
+    stats = SimStats(len(config.players))
+    for game_idx in range(start, stop):
+        stats.add(new_game(config, game_idx).run_game(max_turns_per_round = config.max_turns_per_round))
+    return stats
+
+def _run_chunk(args) -> SimStats:
+    return run_chunk(*args)
+
+def iter_stats(config: GameConfig, workers = None, chunk_size = None) -> typing.Iterator[SimStats]:
+    """
+    Run the games of config, yielding the running SimStats as each chunk finishes.
+
+    The same SimStats is updated and yielded each time; the last one covers all games.
+    workers defaults to the number of cores, and workers = 1 plays in this process.
+    chunk_size defaults to a size giving each worker several chunks to balance load.
+    """
+    if config.seed is None:
+        config = config._replace(seed = np.random.SeedSequence().entropy)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, min(100, config.num_games // (workers * 4)))
+    chunks = [(config, start, min(start + chunk_size, config.num_games))
+        for start in range(0, config.num_games, chunk_size)]
+    stats = SimStats(len(config.players))
+    start_time = time.perf_counter()
+    def merged(results):
+        for chunk_stats in results:
+            stats.merge(chunk_stats)
+            stats.seconds = time.perf_counter() - start_time
+            yield stats
+    if workers == 1:
+        yield from merged(map(_run_chunk, chunks))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            yield from merged(pool.imap_unordered(_run_chunk, chunks))
+
+def simulate(config: GameConfig, workers = None, chunk_size = None) -> SimStats:
+    """ Run all the games of config and return their SimStats """
+    stats = SimStats(len(config.players))
+    for stats in iter_stats(config, workers = workers, chunk_size = chunk_size):
+        pass
+    return stats
+
+if __name__ == "__main__":
+    config = GameConfig(players = (("J", 5, 1.2), ("S", 10, 1), ("L", 7, 1), ("A", 15, .9)), seed = 0, num_games = 200)
+    stats = simulate(config)
+    for (name, *_), win_rate, mean, std in zip(config.players, stats.win_rates(), stats.mean_scores(), stats.score_stds()):
+        print(f"{name}: win rate {win_rate:.3f}, score {mean:.0f} +/- {std:.0f}")
+    print("Turns per round: "+", ".join(f"{turns:.1f}" for turns in stats.mean_round_turns()))
+    print(f"{stats.games} games in {stats.seconds:.1f}s: {stats.games_per_second():.1f} games/s")
@@ -0,0 +1,69 @@
+"""
+Sprite sheet of card faces for Card.get_HTML(type="sprite")
+
+Cards sit in one image, in a grid with a column per Rank and a row per Suit (in enum
+order), so a page loads a single image however many cards it shows. The back of a
+card goes in the ACE of BLACK cell, which no card uses.
+"""
+from . import cardtable
+
+SPRITE_PATH = "handnfoot/pcassets/cards.png"
+PNG_PATH = "handnfoot/pcassets/png"
+CARD_WIDTH = 70
+CARD_HEIGHT = 102
+BACK_CELL = (cardtable.Rank.ACE, cardtable.Suit.BLACK)
+
+def get_cell(rank, suit) -> tuple:
+    """ (column, row) of a card in the sprite sheet """
+    return (rank.value - 1, suit.value - 1)
+
+def sprite_css(sprite_path = SPRITE_PATH, width = CARD_WIDTH, height = CARD_HEIGHT) -> str:
+    """ CSS placing cardtable_sprite cards on the sheet; kept in styles/cardtable.css """
+    columns = len(cardtable.Rank)
+    rows = len(cardtable.Suit)
+    back_column, back_row = get_cell(*BACK_CELL)
+    lines = [
+        ".cardtable_sprite {",
+        "    display: inline-block;",
+        f"    width: {width}px;",
+        f"    height: {height}px;",
+        f'    background-image: url("{sprite_path}");',
+        f"    background-size: {columns * width}px {rows * height}px;",
+        "    background-color: white;",
+        "    border-radius: 5px;",
+        "    box-shadow: 0px 0px 0 1px black;",
+        "}",
+        f".cardtable_sprite.cardtable_back {{ background-position: {-back_column * width}px {-back_row * height}px; }}",
+    ]
+    for rank in cardtable.Rank:
+        column = get_cell(rank, cardtable.Suit.HEARTS)[0]
+        lines.append(f".cardtable_r{rank.value} {{ background-position-x: {-column * width}px; }}")
+    for suit in cardtable.Suit:
+        row = get_cell(cardtable.Rank.ACE, suit)[1]
+        lines.append(f".cardtable_s{suit.value} {{ background-position-y: {-row * height}px; }}")
+    return "\n".join(lines) + "\n"
+
+def build_sprite_sheet(png_path = PNG_PATH, sprite_path = SPRITE_PATH, back_file = None, scale = 2) -> None:
+    """
+    Build the sprite sheet from the per-card PNGs in png_path.
+
+    Cells are scale times the CSS card size so the sheet stays sharp on high density
+    screens. Needs Pillow, which the rest of the package doesn't.
+    """
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise ImportError("build_sprite_sheet needs Pillow (pip install Pillow)") from e
+    width = CARD_WIDTH * scale
+    height = CARD_HEIGHT * scale
+    sheet = Image.new("RGBA", (len(cardtable.Rank) * width, len(cardtable.Suit) * height))
+    cells = [(card.get_name_for_file() + ".png", get_cell(card.rank, card.suit)) for card in cardtable.Pack("B1").cards]
+    if back_file is not None:
+        cells.append((back_file, get_cell(*BACK_CELL)))
+    for file_name, (column, row) in cells:
+        with Image.open(png_path + "/" + file_name) as image:
+            sheet.paste(image.convert("RGBA").resize((width, height)), (column * width, row * height))
+    sheet.save(sprite_path)
+
+if __name__ == "__main__":
+    build_sprite_sheet()
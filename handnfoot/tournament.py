@@ -0,0 +1,217 @@
+"""
+Head to head tournaments between two Hand and Foot strategies.
+
+A match deals one game per seating, from the same seed, with the two strategies
+alternating round the table and swapping seats between the seatings, so neither
+gets the better seats or the better cards. A match scores the mean total of
+strategy A's seats less the mean of strategy B's, summed over its seatings.
+
+Matches are played in batches over a process pool. After each batch a stopping
+rule (Racing or SPRT) looks at the score differences so far and the tournament
+stops as soon as the rule decides. Rules only look between batches, and each match
+is seeded by its index, so a tournament repeats exactly whatever the number of
+workers. The stopping rule also gives the fixed number of matches a one-off test
+with the same error rates would have needed, to compare with the matches used.
+
+Run from the repository root:  python -m handnfoot.tournament
+"""
+import os
+import copy
+import math
+import time
+import typing
+import statistics
+import multiprocessing
+import numpy as np
+from . import handnfoot
+from . import sim
+
+A_BETTER = 1
+B_BETTER = -1
+TIED = 0 # Any difference is smaller than the rule's min_difference
+
+SEATINGS = 2
+
+class TournamentConfig(typing.NamedTuple):
+    """ Everything needed to play the matches of a tournament; must be picklable """
+    strategies: tuple # strategies A and B
+    seats: int = 4
+    rules: typing.Optional[dict] = None # HNFRules attributes to change
+    seed: typing.Optional[int] = None # root entropy; None picks one per run
+    max_matches: int = 1000
+    batch_size: int = 20 # matches between looks by the stopping rule
+    max_turns_per_round: int = 1000
+
+class TournamentStats():
+    """ Score differences of the matches played so far, in match order """
+    def __init__(self):
+        self.differences = []
+        self.looks = 0
+        self.seconds = 0.0
+        self.decision = None
+    @property
+    def matches(self) -> int:
+        return len(self.differences)
+    @property
+    def games(self) -> int:
+        return self.matches * SEATINGS
+    def mean_difference(self) -> float:
+        return statistics.fmean(self.differences) if self.differences else 0.0
+    def difference_std(self) -> float:
+        """ Sample standard deviation of the match score differences """
+        return statistics.stdev(self.differences) if self.matches > 1 else 0.0
+    def games_per_second(self) -> float:
+        return self.games / self.seconds if self.seconds > 0 else 0.0
+
+class Racing():
+    """
+    Stop once a confidence interval on the mean score difference excludes zero
+    (A_BETTER or B_BETTER) or lies within min_difference of zero (TIED).
+
+    The error rate alpha is spread over the looks, alpha / (k * (k + 1)) at look k,
+    so it holds however many looks the tournament takes.
+    """
+    def __init__(self, alpha = 0.05, min_difference = 100, min_matches = 10):
+        self.alpha = alpha
+        self.min_difference = min_difference
+        self.min_matches = min_matches
+    def decide(self, stats: TournamentStats) -> typing.Optional[int]:
+        if stats.matches < self.min_matches:
+            return None
+        look_alpha = self.alpha / (stats.looks * (stats.looks + 1))
+        z = statistics.NormalDist().inv_cdf(1 - look_alpha / 2)
+        mean = stats.mean_difference()
+        half_width = z * stats.difference_std() / math.sqrt(stats.matches)
+        if mean - half_width > 0:
+            return A_BETTER
+        if mean + half_width < 0:
+            return B_BETTER
+        if abs(mean) + half_width < self.min_difference:
+            return TIED
+        return None
+    def fixed_matches(self, stats: TournamentStats, power = 0.8) -> int:
+        """ Matches a single two-sided test would need to find a min_difference difference """
+        normal = statistics.NormalDist()
+        z = normal.inv_cdf(1 - self.alpha / 2) + normal.inv_cdf(power)
+        return math.ceil((z * stats.difference_std() / self.min_difference) ** 2)
+
+class SPRT():
+    """
+    Sequential probability ratio tests that A scores min_difference more than B a
+    match (A_BETTER) and that B scores min_difference more than A (B_BETTER), each
+    rather than the same, run side by side. TIED once both accept the same.
+
+    Differences are taken as normal with the variance seen so far. Each side gets
+    half of alpha, so alpha bounds the chance of either false decision; beta is the
+    chance of missing a min_difference difference.
+    """
+    def __init__(self, alpha = 0.05, beta = 0.05, min_difference = 100, min_matches = 10):
+        self.alpha = alpha
+        self.beta = beta
+        self.min_difference = min_difference
+        self.min_matches = min_matches
+        self.lower = math.log(beta / (1 - alpha / 2))
+        self.upper = math.log((1 - beta) / (alpha / 2))
+    def llr(self, stats: TournamentStats, decision = A_BETTER) -> float:
+        """ Log likelihood ratio of decision (A_BETTER or B_BETTER) to TIED """
+        variance = stats.difference_std() ** 2
+        if variance == 0:
+            variance = 1.0
+        delta = self.min_difference
+        return delta / variance * (decision * sum(stats.differences) - stats.matches * delta / 2)
+    def decide(self, stats: TournamentStats) -> typing.Optional[int]:
+        if stats.matches < self.min_matches:
+            return None
+        llrs = [self.llr(stats, decision) for decision in (A_BETTER, B_BETTER)]
+        for decision, llr in zip((A_BETTER, B_BETTER), llrs):
+            if llr >= self.upper:
+                return decision
+        if all(llr <= self.lower for llr in llrs):
+            return TIED
+        return None
+    def fixed_matches(self, stats: TournamentStats) -> int:
+        """ Matches a single two-sided test with the same alpha and beta would need """
+        normal = statistics.NormalDist()
+        z = normal.inv_cdf(1 - self.alpha / 2) + normal.inv_cdf(1 - self.beta)
+        return math.ceil((z * stats.difference_std() / self.min_difference) ** 2)
+
+def seating(config: TournamentConfig, seating_idx: int) -> typing.List[int]:
+    """ Index into config.strategies of the strategy in each seat """
+    return [(seat + seating_idx) % 2 for seat in range(config.seats)]
+
+def play_match(config: TournamentConfig, match_idx: int) -> float:
+    """ Mean score of A's seats less the mean of B's, summed over the seatings of match match_idx """
+    difference = 0.0
+    for seating_idx in range(SEATINGS):
+        seats = seating(config, seating_idx)
+        # Strategies may keep state, so every game starts from fresh copies
+        strategies = copy.deepcopy(config.strategies)
+        game_config = sim.GameConfig(
+            players = tuple(("AB"[idx] + str(seat + 1),) for seat, idx in enumerate(seats)),
+            strategies = tuple(strategies[idx] for idx in seats),
+            rules = config.rules,
+            seed = config.seed)
+        result = sim.new_game(game_config, match_idx).run_game(max_turns_per_round = config.max_turns_per_round)
+        for idx, sign in ((0, 1), (1, -1)):
+            scores = [score for score, seat_idx in zip(result.scores, seats) if seat_idx == idx]
+            if scores:
+                difference += sign * sum(scores) / len(scores)
+    return difference
+
+def _play_match(args) -> float:
+    return play_match(*args)
+
+def iter_tournament(config: TournamentConfig, rule = None, workers = None) -> typing.Iterator[TournamentStats]:
+    """
+    Play the matches of config a batch at a time, yielding the running TournamentStats
+    after each batch until rule decides or max_matches have been played.
+
+    rule defaults to Racing(). workers defaults to the number of cores, and workers = 1
+    plays in this process.
+    """
+    if len(config.strategies) != 2:
+        raise ValueError("Need two strategies")
+    if config.seats < 2:
+        raise ValueError("Need at least two seats")
+    if config.seed is None:
+        config = config._replace(seed = np.random.SeedSequence().entropy)
+    if rule is None:
+        rule = Racing()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    stats = TournamentStats()
+    start_time = time.perf_counter()
+    def batches(play):
+        for start in range(0, config.max_matches, config.batch_size):
+            stop = min(start + config.batch_size, config.max_matches)
+            stats.differences.extend(play(_play_match, [(config, match_idx) for match_idx in range(start, stop)]))
+            stats.seconds = time.perf_counter() - start_time
+            stats.looks += 1
+            stats.decision = rule.decide(stats)
+            yield stats
+            if stats.decision is not None:
+                break
+    if workers == 1:
+        yield from batches(lambda func, args: list(map(func, args)))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            yield from batches(pool.map)
+
+def run_tournament(config: TournamentConfig, rule = None, workers = None) -> TournamentStats:
+    """ Play config to a decision or max_matches and return its TournamentStats """
+    stats = TournamentStats()
+    for stats in iter_tournament(config, rule = rule, workers = workers):
+        pass
+    return stats
+
+def decision_name(decision) -> str:
+    return {A_BETTER: "A is better", B_BETTER: "B is better", TIED: "tied", None: "undecided"}[decision]
+
+if __name__ == "__main__":
+    from . import rollout
+    config = TournamentConfig(strategies = (rollout.RolloutStrategy(rollouts = 8, depth = 4, seed = 0), handnfoot.Strategy()), seed = 0, batch_size = 8, max_matches = 400)
+    rule = Racing()
+    for stats in iter_tournament(config, rule = rule):
+        print(f"{stats.matches} matches: A - B = {stats.mean_difference():.0f} +/- {stats.difference_std():.0f}")
+    print(f"{decision_name(stats.decision)} after {stats.games} games in {stats.seconds:.1f}s")
+    print(f"A fixed-N test would need {rule.fixed_matches(stats) * SEATINGS} games, against {config.max_matches * SEATINGS} at most here")
@@ -0,0 +1,76 @@
+"""
+Structured events from a Hand and Foot game.
+
+HNFGame emits an event for each draw, lay down, pile, discard, foot pickup and
+round end, but only when a Tracer is attached (game.tracer); otherwise the turn
+path just checks game.tracer is None. A Tracer passes events to its subscribers
+and can keep the latest ones in a ring buffer to look at after a game goes wrong.
+str(event) gives a readable line, and log_event sends events to logging.
+"""
+import typing
+import logging
+import collections
+from . import cardtable
+
+class Draw(typing.NamedTuple):
+    player: str
+    cards: tuple
+    def __str__(self):
+        return f"Player {self.player} draws {cardtable.cards_to_str(self.cards)}"
+
+class LayDown(typing.NamedTuple):
+    player: str
+    cards: tuple
+    meld_type: int
+    def __str__(self):
+        return f"Player {self.player} lays down {cardtable.cards_to_str(self.cards)} of type {cardtable.Meld.get_type_name(self.meld_type)}"
+
+class AddToPile(typing.NamedTuple):
+    player: str
+    cards: tuple
+    def __str__(self):
+        return f"Player {self.player} added {cardtable.cards_to_str(self.cards)} to a pile"
+
+class Discard(typing.NamedTuple):
+    player: str
+    card: 'cardtable.Card'
+    hand: tuple # Cards left in hand
+    def __str__(self):
+        return f"Player {self.player} discards {self.card.get_shorthand()} leaving {cardtable.cards_to_str(self.hand)}"
+
+class FootPickup(typing.NamedTuple):
+    player: str
+    keep_playing: bool
+    def __str__(self):
+        if self.keep_playing:
+            return f"Player {self.player} picks up their foot and keeps playing!"
+        return f"Player {self.player} picks up their foot."
+
+class RoundEnd(typing.NamedTuple):
+    round: int
+    player: typing.Optional[str] # Player who went out, None if the round was stopped
+    def __str__(self):
+        if self.player is None:
+            return f"Round {self.round} stopped"
+        return f"Player {self.player} ends round {self.round}!"
+
+class Tracer():
+    """ Passes events to subscribers, keeping the last buffer_size of them in buffer """
+    def __init__(self, buffer_size = None):
+        self.subscribers = []
+        self.buffer = None
+        if buffer_size is not None:
+            self.buffer = collections.deque(maxlen = buffer_size)
+    def subscribe(self, callback) -> None:
+        self.subscribers.append(callback)
+    def unsubscribe(self, callback) -> None:
+        self.subscribers.remove(callback)
+    def emit(self, event) -> None:
+        if self.buffer is not None:
+            self.buffer.append(event)
+        for callback in self.subscribers:
+            callback(event)
+
+def log_event(event) -> None:
+    """ Subscriber logging each event at DEBUG level """
+    logging.debug("%s", event)
@@ -0,0 +1,159 @@
+"""
+Search Strategy parameters for the ones that play best.
+
+Candidates are drawn at random from a space of parameter choices, the default
+Strategy first, and whittled down by successive halving: every candidate plays a
+few tournament matches against the default Strategy, the best 1/eta of them play
+eta times as many, and so on until one is left. Match i is dealt the same cards for
+every candidate, so candidates are compared on the same games.
+
+Matches are spread over a process pool. Each result is appended to a study file as
+it comes back, so a run that is stopped picks up where it left off when run again
+with the same file and settings.
+
+Run from the repository root:  python -m handnfoot.tune [study file]
+"""
+import os
+import sys
+import json
+import typing
+import multiprocessing
+import numpy as np
+from . import handnfoot
+from . import tournament
+
+Strategy = handnfoot.Strategy
+
+# Choices for each tuned Strategy parameter
+SPACE = {
+    "laydown_dirty": (True, False),
+    "dirty_for_safety": (True, False),
+    "safe_when_hand_gt": (None, 0, 2, 5, 8, 11),
+    "prefer_high": (True, False),
+    "draw_from": (Strategy.DRAW_CLOSEST, Strategy.DRAW_RANDOM, Strategy.DRAW_HAND_SOURCE, Strategy.DRAW_FOOT_SOURCE, Strategy.DRAW_CURRENT_SOURCE),
+    "down_tier": (6000, 10000, 14000),
+    "ready_tier": (6000, 9000, 12000),
+    "wild_tier": (6000, 8000, 11000),
+    "complete_tier": (3000, 7000, 9000),
+    "pair_tier": (None, 1000, 5000),
+    }
+
+class TuneConfig(typing.NamedTuple):
+    """ Settings of a tuning run; a study file is only resumed with the same ones """
+    num_candidates: int = 27
+    min_matches: int = 4 # matches each candidate plays in the first rung
+    eta: int = 3 # 1/eta of the candidates go through to each next rung, with eta times the matches
+    seats: int = 4
+    seed: int = 0
+    max_turns_per_round: int = 1000
+
+class Study():
+    """
+    Match results of a tuning run, by candidate, kept in a JSON lines file.
+
+    The first line holds the TuneConfig and the space; each other line is one match.
+    With no path, results are only kept in memory.
+    """
+    def __init__(self, config: TuneConfig, space = None, path = None):
+        if space is None:
+            space = SPACE
+        self.config = config
+        self.space = space
+        self.path = path
+        self.candidates = sample_candidates(config, space)
+        self.results = [dict() for _ in self.candidates] # match index -> score difference
+        header = {"config": config._asdict(), "space": {name: list(choices) for name, choices in space.items()}}
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                lines = [json.loads(line) for line in file if line.strip()]
+            if not lines or lines[0] != header:
+                raise ValueError("Study file is for other settings: "+path)
+            for line in lines[1:]:
+                if line["params"] != self.candidates[line["candidate"]]:
+                    raise ValueError(f"Study file candidate {line['candidate']} doesn't match")
+                self.results[line["candidate"]][line["match"]] = line["difference"]
+        elif path is not None:
+            with open(path, "w") as file:
+                file.write(json.dumps(header) + "\n")
+    def record(self, candidate: int, match_idx: int, difference: float) -> None:
+        self.results[candidate][match_idx] = difference
+        if self.path is not None:
+            with open(self.path, "a") as file:
+                file.write(json.dumps({"candidate": candidate, "params": self.candidates[candidate],
+                    "match": match_idx, "difference": difference}) + "\n")
+    def mean_difference(self, candidate: int, matches: int) -> float:
+        """ Mean score difference from the default Strategy over the first matches matches """
+        results = self.results[candidate]
+        return sum(results[match_idx] for match_idx in range(matches)) / matches
+
+def sample_candidates(config: TuneConfig, space) -> typing.List[dict]:
+    """ The default Strategy's parameters, then num_candidates - 1 random picks from space """
+    defaults = Strategy().get_params()
+    candidates = [defaults]
+    rng = np.random.default_rng(config.seed)
+    for _ in range(config.num_candidates - 1):
+        params = dict(defaults)
+        for name, choices in space.items():
+            params[name] = choices[int(rng.integers(len(choices)))]
+        candidates.append(params)
+    return candidates
+
+def play_match(config: TuneConfig, params: dict, match_idx: int) -> float:
+    """ Score difference of a Strategy with params over the default in match match_idx """
+    tournament_config = tournament.TournamentConfig(
+        strategies = (Strategy(**params), Strategy()),
+        seats = config.seats,
+        seed = config.seed,
+        max_turns_per_round = config.max_turns_per_round)
+    return tournament.play_match(tournament_config, match_idx)
+
+def _play_match(args) -> typing.Tuple[int, int, float]:
+    config, candidate, params, match_idx = args
+    return candidate, match_idx, play_match(config, params, match_idx)
+
+def iter_rungs(study: Study, workers = None) -> typing.Iterator[typing.List[typing.Tuple[float, int]]]:
+    """
+    Run successive halving on study, yielding (mean difference, candidate) best first
+    for the candidates of each rung once its matches are played.
+
+    Matches already in the study are not played again. workers defaults to the number
+    of cores, and workers = 1 plays in this process.
+    """
+    config = study.config
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        candidates = list(range(len(study.candidates)))
+        matches = config.min_matches
+        while True:
+            tasks = [(config, candidate, study.candidates[candidate], match_idx)
+                for candidate in candidates for match_idx in range(matches)
+                if match_idx not in study.results[candidate]]
+            results = map(_play_match, tasks) if pool is None else pool.imap_unordered(_play_match, tasks)
+            for candidate, match_idx, difference in results:
+                study.record(candidate, match_idx, difference)
+            ranked = sorted(((study.mean_difference(candidate, matches), candidate) for candidate in candidates), key = lambda item: -item[0])
+            yield ranked
+            if len(candidates) == 1:
+                break
+            candidates = [candidate for _, candidate in ranked[:max(1, len(candidates) // config.eta)]]
+            matches *= config.eta
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+def tune(study: Study, workers = None) -> typing.Tuple[dict, float]:
+    """ Parameters of the best candidate of study and its mean score difference from the default """
+    for ranked in iter_rungs(study, workers = workers):
+        pass
+    difference, candidate = ranked[0]
+    return study.candidates[candidate], difference
+
+if __name__ == "__main__":
+    study = Study(TuneConfig(), path = sys.argv[1] if len(sys.argv) > 1 else "tune_study.jsonl")
+    for ranked in iter_rungs(study):
+        difference, candidate = ranked[0]
+        print(f"{len(ranked)} candidates, best {candidate}: {difference:+.0f} a match")
+    print("Best parameters:", study.candidates[candidate])
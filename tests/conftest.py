@@ -0,0 +1,17 @@
+import random
+import pytest
+
+from context import cardtable
+
+@pytest.fixture(autouse = True)
+def restore_global_state():
+    """ Put back the shared Modifiers and the random state after tests that change them """
+    random_state = random.getstate()
+    wild_ranks = cardtable.Modifiers.wild_ranks
+    meld_method = cardtable.Modifiers.meld_method
+    try:
+        yield
+    finally:
+        random.setstate(random_state)
+        cardtable.Modifiers.set_meld_method(meld_method)
+        cardtable.Modifiers.set_wild_ranks(wild_ranks)
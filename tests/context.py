@@ -5,3 +5,11 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from handnfoot import cardtable
 from handnfoot import handnfoot
+from handnfoot import shuffling
+from handnfoot import metrics
+from handnfoot import sprites
+from handnfoot import sim
+from handnfoot import trace
+from handnfoot import rollout
+from handnfoot import tournament
+from handnfoot import tune
@@ -4,8 +4,11 @@ import os
 import sys
 import logging
 import pytest
+import random
+import numpy as np
 
 from context import cardtable
+from context import sprites
 #from handnfoot import cardtable
 
 cp = cardtable.Card.parse
@@ -17,6 +20,17 @@ def test_card_names():
     card2 = cardtable.Card.parse("5H")
     assert str(card2) == "FIVE of HEARTS"
 
+def test_card_flyweight():
+    card = cardtable.Card(cardtable.Rank.QUEEN, cardtable.Suit.DIAMONDS, "B1")
+    assert card is cardtable.Card.parse("QD", "B1")
+    assert card is not cardtable.Card.parse("QD", "R1")
+    assert cardtable.Card.from_id(card.id) is card
+    assert card.back == "B1"
+    assert card.get_color() == cardtable.Color.RED
+    assert card.is_face_card()
+    assert not cardtable.Card.parse("*R").is_face_card()
+    assert cardtable.Card.parse("9S").is_number_card()
+
 def test_meld_Rank():
     method = cardtable.Meld.RANK
     hand = cardtable.Hand()
@@ -26,14 +40,14 @@ def test_meld_Rank():
     meld = cardtable.Meld(method = method, cards = hand.cards)
     assert meld.method == method
     assert str(meld) == "[ACE of SPADES, ACE of CLUBS, ACE of HEARTS]"
-    assert meld[0].get_meld_type(method = method) == "A"
-    assert meld.get_type() == "A"
+    assert cardtable.Meld.get_type_name(meld[0].get_meld_type(method = method)) == "A"
+    assert cardtable.Meld.get_type_name(meld.get_type()) == "A"
     hand.push(cardtable.Card(cardtable.Rank.ACE, cardtable.Suit.HEARTS))
     hand.push(cardtable.Card(cardtable.Rank.TWO, cardtable.Suit.HEARTS))
     melds = cardtable.Meld.get_melds(cards = hand.cards, method = method)
     assert len(melds) == 2
-    assert melds[0].get_type() == "A"
-    assert melds[1].get_type() == "2"
+    assert cardtable.Meld.get_type_name(melds[0].get_type()) == "A"
+    assert cardtable.Meld.get_type_name(melds[1].get_type()) == "2"
 
 def test_meld_RankColor():
     method = cardtable.Meld.RANKCOLOR
@@ -43,15 +57,31 @@ def test_meld_RankColor():
     meld = cardtable.Meld(method = method, cards = hand.cards)
     assert meld.method == method
     assert str(meld) == "[ACE of SPADES, ACE of CLUBS]"
-    assert meld[0].get_meld_type(method = method) == "ABLACK"
-    assert meld.get_type() == "ABLACK"
+    assert cardtable.Meld.get_type_name(meld[0].get_meld_type(method = method)) == "ABLACK"
+    assert cardtable.Meld.get_type_name(meld.get_type()) == "ABLACK"
     hand.push(cardtable.Card(cardtable.Rank.ACE, cardtable.Suit.HEARTS))
     hand.push(cardtable.Card(cardtable.Rank.TWO, cardtable.Suit.HEARTS))
     melds = cardtable.Meld.get_melds(cards = hand.cards, method = method)
     assert len(melds) == 3
-    assert melds[0].get_type() == "ABLACK"
-    assert melds[1].get_type() == "ARED"
-    assert melds[2].get_type() == "2RED"
+    assert cardtable.Meld.get_type_name(melds[0].get_type()) == "ABLACK"
+    assert cardtable.Meld.get_type_name(melds[1].get_type()) == "ARED"
+    assert cardtable.Meld.get_type_name(melds[2].get_type()) == "2RED"
+
+def test_meld_type_codes():
+    cardtable.Modifiers.set_wild_ranks([cardtable.Rank.TWO, cardtable.Rank.JOKER])
+    cp = cardtable.Card.parse
+    for method in [cardtable.Meld.RANK, cardtable.Meld.RANKCOLOR]:
+        assert cp("2S").get_meld_type(method = method) == cardtable.Meld.WILD
+        assert cardtable.Meld.get_type_name(cp("2S").get_meld_type(method = method)) == "WILD"
+        assert cp("AS").get_meld_type(method = method) == cp("AC").get_meld_type(method = method)
+        assert isinstance(cp("AS").get_meld_type(method = method), int)
+    assert cp("AS").get_meld_type(method = cardtable.Meld.RANK) == cp("AH").get_meld_type(method = cardtable.Meld.RANK)
+    assert cp("AS").get_meld_type(method = cardtable.Meld.RANKCOLOR) != cp("AH").get_meld_type(method = cardtable.Meld.RANKCOLOR)
+    assert cardtable.Meld.get_type_name(cp("KD").get_meld_type(method = cardtable.Meld.RANKCOLOR)) == "KRED"
+    with pytest.raises(ValueError):
+        cp("AS").get_meld_type(method = 99)
+    cardtable.Modifiers.set_wild_ranks([])
+    assert cp("2S").get_meld_type(method = cardtable.Meld.RANK) != cardtable.Meld.WILD
 
 def test_includes_meld():
     # Setup
@@ -93,6 +123,133 @@ def test_includes_meld():
         meld_type = meld_type = card.get_meld_type(method = method)
         assert not area.includes_meld_type(meld_type = meld_type, method = method)
 
+def test_area_group_by_meld_type():
+    cardtable.Modifiers.set_wild_ranks([cardtable.Rank.TWO, cardtable.Rank.JOKER])
+    method = cardtable.Meld.RANK
+    cp = cardtable.Card.parse
+    area = cardtable.PlayingArea(name = "down")
+    changed = area.add_to_group_by_meld_type(cards = [cp("5S"), cp("5H"), cp("9C")], group_cls = cardtable.Fan, method = method)
+    assert len(changed) == 2 and len(area.groups) == 2
+    fives = area.get_group_by_meld_type(cp("5D").get_meld_type(method = method), method = method)
+    assert fives.cards == [cp("5S"), cp("5H")]
+    assert area.get_group_by_meld_type(cp("KD").get_meld_type(method = method), method = method) is None
+    # Groups appended empty are found once they have cards
+    pile = cardtable.Pile()
+    area.append(pile)
+    pile.push(cp("KD"))
+    assert area.get_group_by_meld_type(cp("KD").get_meld_type(method = method), method = method) is pile
+    # Wilds go to the group for the meld type they are laid on
+    assert area.add_to_group_by_meld_type(cards = [cp("2D")], group_cls = cardtable.Fan, method = method, meld_type = cp("5D").get_meld_type(method = method)) == [fives]
+    assert area.get_meld_types(method = method) == {cp("5D").get_meld_type(method = method), cp("9C").get_meld_type(method = method),
+        cp("KD").get_meld_type(method = method), cardtable.Meld.WILD}
+    area.remove(fives)
+    assert area.get_group_by_meld_type(cp("5D").get_meld_type(method = method), method = method) is None
+    # Groups are found by any meld type in them, even when led by a wild
+    sevens = cardtable.Fan([cp("2D"), cp("7S"), cp("7H")])
+    area.append(sevens)
+    assert area.get_group_by_meld_type(cp("7D").get_meld_type(method = method), method = method) is sevens
+    assert area.get_group_by_meld_type(cardtable.Meld.WILD, method = method) is None
+    laid = area.add_to_group_by_meld_type(cards = [cp("2C"), cp("8S")], group_cls = cardtable.Fan, method = method, meld_type = cp("8D").get_meld_type(method = method))
+    assert len(laid) == 1 and laid[0].cards == [cp("2C"), cp("8S")]
+    # and the index follows cards changed outside the area
+    sevens.cards = [cp("JS"), cp("JH")]
+    assert area.get_group_by_meld_type(cp("7D").get_meld_type(method = method), method = method) is None
+    assert area.get_group_by_meld_type(cp("JD").get_meld_type(method = method), method = method) is sevens
+    # A group of only wilds is found by the meld type it was laid as, rebuilt or not
+    sixes = cp("6D").get_meld_type(method = method)
+    wilds = area.add_to_group_by_meld_type(cards = [cp("2S")], group_cls = cardtable.Fan, method = method, meld_type = sixes)[0]
+    sevens.push(cp("JC"))
+    assert area.add_to_group_by_meld_type(cards = [cp("6S")], group_cls = cardtable.Fan, method = method) == [wilds]
+    assert area.get_group_by_meld_type(sixes, method = method) is wilds
+    # and a group of wilds given other cards is no longer found as wild
+    jokers = cardtable.Fan([cp("2H")])
+    area.append(jokers)
+    assert area.get_group_by_meld_type(cardtable.Meld.WILD, method = method) is jokers
+    area.add_to_group_by_meld_type(cards = [cp("4S")], group_cls = cardtable.Fan, method = method, meld_type = cardtable.Meld.WILD)
+    assert area.get_group_by_meld_type(cardtable.Meld.WILD, method = method) is None
+    assert area.get_group_by_meld_type(cp("4D").get_meld_type(method = method), method = method) is jokers
+
+    table = cardtable.Table()
+    table.add_area(cardtable.PlayingArea(name = "draw"))
+    table.add_area(area)
+    assert table.get_area("down") is area
+    with pytest.raises(ValueError):
+        table.get_area("hand")
+
+def test_group_version_and_meld_counts():
+    cardtable.Modifiers.set_wild_ranks([cardtable.Rank.TWO, cardtable.Rank.JOKER])
+    method = cardtable.Meld.RANK
+    cp = cardtable.Card.parse
+    hand = cardtable.Hand([cp("5S"), cp("5H"), cp("2C")])
+    assert hand.get_meld_counts(method = method) == {cp("5D").get_meld_type(method = method): 2, cardtable.Meld.WILD: 1}
+    version = hand.version
+    hand.add([cp("5D")])
+    assert hand.version > version
+    assert hand.get_meld_counts(method = method)[cp("5D").get_meld_type(method = method)] == 3
+    version = hand.version
+    hand.remove_cards([cp("5S"), cp("2C")])
+    assert hand.version > version
+    assert hand.get_meld_counts(method = method) == {cp("5D").get_meld_type(method = method): 2}
+
+def test_face_total():
+    cp = cardtable.Card.parse
+    table = [0] * cardtable.NUM_FACES
+    table[cp("5S").face] = 5
+    table[cp("KD").face] = 10
+    for group in [cardtable.Hand([cp("5S"), cp("KD")]), cardtable.Pile([cp("5S"), cp("KD")]), cardtable.ArrayPile([cp("5S"), cp("KD")])]:
+        assert group.get_face_total(table) == 15
+        group.add([cp("5S"), cp("9C")])
+        assert group.get_face_total(table) == 20
+        group.pop()
+        group.pop()
+        assert group.get_face_total(table) == 15
+        group.cards = [cp("KD")]
+        assert group.get_face_total(table) == 10
+    hand = cardtable.Hand([cp("5S"), cp("KD"), cp("5S")])
+    hand.get_face_total(table)
+    hand.remove_cards([cp("5S"), cp("KD")])
+    assert hand.get_face_total(table) == 5
+    area = cardtable.PlayingArea(groups = [hand, cardtable.Fan([cp("KD")])])
+    assert area.get_face_total(table) == 15
+
+def test_clone():
+    cp = cardtable.Card.parse
+    modifiers = cardtable.CardModifiers(wild_ranks = [cardtable.Rank.TWO], meld_method = cardtable.Meld.RANK)
+    for group in [cardtable.Hand([cp("5S"), cp("KD")]), cardtable.Pile([cp("5S"), cp("KD")], face_up = True), cardtable.ArrayPile([cp("5S"), cp("KD")])]:
+        group.get_meld_counts(cardtable.Meld.RANK, modifiers)
+        clone = group.clone()
+        assert type(clone) == type(group)
+        assert clone.cards == group.cards
+        assert getattr(clone, "face_up", None) == getattr(group, "face_up", None)
+        clone.add([cp("5H")])
+        assert len(group) == 2
+        assert len(clone) == 3
+        assert clone.get_meld_counts(cardtable.Meld.RANK, modifiers)[cp("5C").get_meld_type(modifiers = modifiers)] == 2
+        assert group.get_meld_counts(cardtable.Meld.RANK, modifiers)[cp("5C").get_meld_type(modifiers = modifiers)] == 1
+    player = cardtable.Player("J")
+    player.add_area(cardtable.PlayingArea(name = "hand", groups = [cardtable.Hand([cp("5S")])]))
+    player.hnf_is_down = True
+    clone = player.clone()
+    assert clone.hnf_is_down
+    clone.get_area("hand").groups[0].add([cp("KD")])
+    clone.get_area("hand").append(cardtable.Hand())
+    assert len(player.get_hand()) == 1
+    assert len(player.get_area("hand").groups) == 1
+    table = cardtable.Table()
+    table.add_area(cardtable.PlayingArea(name = "draw", groups = [cardtable.Pile([cp("5S")])]))
+    table.add_player(player)
+    clone_table = table.clone(players = [clone])
+    assert clone_table.players == [clone]
+    assert clone_table.get_area("draw").groups[0] is not table.get_area("draw").groups[0]
+    cards = [cp("5S"), cp("QD", "B1"), cp("*R", "R2")]
+    data = cardtable.cards_to_bytes(cards)
+    assert len(data) == 4 * len(cards)
+    # More backs than two bytes would hold
+    many = [cp("KH", "W" + str(idx)) for idx in range(600)]
+    assert cardtable.cards_from_bytes(cardtable.cards_to_bytes(many), cardtable.get_back_names()) == many
+    assert cardtable.cards_from_bytes(data) == cards
+    assert cardtable.cards_from_bytes(data, cardtable.get_back_names()) == cards
+
 def test_get_wilds():
     cardtable.Modifiers.set_wild_ranks([cardtable.Rank.TWO, cardtable.Rank.JOKER])
     group = cardtable.Hand()
@@ -119,9 +276,9 @@ def test_get_melds():
 
     melds = hand.get_melds(exclude_wilds=True)
     assert len(melds) == 3
-    assert melds[0].get_type() == "4"
-    assert melds[1].get_type() == "9"
-    assert melds[2].get_type() == "J"
+    assert cardtable.Meld.get_type_name(melds[0].get_type()) == "4"
+    assert cardtable.Meld.get_type_name(melds[1].get_type()) == "9"
+    assert cardtable.Meld.get_type_name(melds[2].get_type()) == "J"
 
 def test_get_cards_by_meld():
     # Setup
@@ -136,5 +293,242 @@ def test_get_cards_by_meld():
 
     assert str(hand.get_cards_by_meld(cp("9D").get_meld_type())) == str([cp("9S"), cp("9H")])
 
+def test_count_melds():
+    pile = cardtable.Pile(cards = [cardtable.Card.parse(shorthand) for shorthand in ["4H", "4S", "9C", "2D"]])
+    assert pile.count_melds(method = cardtable.Meld.RANK) == 3
+    assert pile.calc_entropy(method = cardtable.Meld.RANK) == pytest.approx(2 / 3)
+
+def test_hand_remove_cards():
+    b1 = {card.get_shorthand(): card for card in cardtable.Pack("B1").cards}
+    r1 = {card.get_shorthand(): card for card in cardtable.Pack("R1").cards}
+    hand = cardtable.Hand([b1["AS"], r1["AS"], b1["KD"], b1["AS"], b1["5C"]])
+    assert hand.remove_cards([b1["AS"], b1["KD"]]) == [b1["AS"], b1["KD"]]
+    assert hand.cards == [r1["AS"], b1["AS"], b1["5C"]]
+    with pytest.raises(ValueError):
+        hand.remove_cards([b1["5C"], b1["5C"]])
+    assert hand.cards == [r1["AS"], b1["AS"], b1["5C"]]
+    removed = hand.remove_cards([cardtable.Card.parse("AS"), cardtable.Card.parse("AS")], by_face = True)
+    assert removed == [r1["AS"], b1["AS"]]
+    assert hand.cards == [b1["5C"]]
+    assert hand.get_melds(method = cardtable.Meld.RANK)[0] == [b1["5C"]]
+
+def test_get_HTML():
+    cp = cardtable.Card.parse
+    assert cp("AS").get_HTML() is cp("AS").get_HTML()
+    assert cp("AS").get_HTML() == '<span class="cardtable_card cardtable_sprite cardtable_r1 cardtable_s3"></span>'
+    assert cp("AS").get_HTML(type = "png") == '<span class="cardtable_card"><img src="handnfoot/pcassets/png/ace_of_spades.png"></span>'
+    with pytest.raises(ValueError):
+        cp("AS").get_HTML(type = "gif")
+    hand = cardtable.Hand([cp("AS"), cp("5H")])
+    assert hand.get_HTML() == '<span class="cardtable_hand">' + cp("AS").get_HTML() + cp("5H").get_HTML() + '</span>'
+    pile = cardtable.Pile(cards = [cp("AS")] * 8)
+    assert pile.get_HTML().count("cardtable_back") == cardtable.Pile.HTML_EDGES
+    table = cardtable.Table()
+    area = cardtable.PlayingArea(name = "draw", groups = [pile])
+    table.add_area(area)
+    player = cardtable.Player("<J>")
+    player.add_area(cardtable.PlayingArea(name = "hand", groups = [hand]))
+    table.add_player(player)
+    page = table.get_HTML()
+    assert area.get_HTML() in page and hand.get_HTML() in page
+    assert "&lt;J&gt;" in page
+
+def test_sprite_css_is_current():
+    css_path = os.path.join(os.path.dirname(__file__), "..", "styles", "cardtable.css")
+    with open(css_path) as css:
+        assert sprites.sprite_css() in css.read()
+
+def test_shoe():
+    shoe = cardtable.Shoe(3)
+    assert len(shoe) == 3 * 54
+    assert list(shoe.cards) == [card for back in ["B1", "R1", "B2"] for card in cardtable.Pack(back).cards]
+    pile = shoe.get_pile()
+    pile.shuffle(method = cardtable.Pile.PERFECT_SHUFFLE)
+    assert shoe.get_pile().cards == list(shoe.cards)
+    array_pile = shoe.get_pile(pile_cls = cardtable.ArrayPile)
+    array_pile.shuffle(method = cardtable.Pile.VECTOR_RIFFLE_SHUFFLE)
+    array_pile.draw(10)
+    assert shoe.get_pile(pile_cls = cardtable.ArrayPile).cards == list(shoe.cards)
+    # Shoes of any size riffle shuffle by default
+    for pile_cls in [cardtable.Pile, cardtable.ArrayPile]:
+        pile = cardtable.Shoe(6).get_pile(pile_cls = pile_cls)
+        pile.shuffle()
+        assert sorted(card.id for card in pile.cards) == sorted(card.id for card in cardtable.Shoe(6).cards)
+    jokers = [card.rank for card in cardtable.Shoe(backs = ["G1"], jokers = 3).cards if card.rank == cardtable.Rank.JOKER]
+    assert len(jokers) == 3
+    assert len(cardtable.Shoe(2, jokers = 0)) == 2 * 52
+    with pytest.raises(ValueError):
+        cardtable.Shoe(2, backs = ["B1"])
+
+def test_array_pile_matches_pile():
+    cards = cardtable.Pack("B1").cards + cardtable.Pack("R1").cards
+    pile = cardtable.Pile(cards = list(cards))
+    array_pile = cardtable.ArrayPile(cards = list(cards))
+    assert array_pile.cards == pile.cards
+    assert array_pile.draw(3) == pile.draw(3)
+    assert array_pile.draw_pile(11).cards == pile.draw_pile(11).cards
+    dealt = pile.deal(4, 5)
+    array_dealt = array_pile.deal(4, 5)
+    assert [p.cards for p in array_dealt] == [p.cards for p in dealt]
+    assert all(isinstance(p, cardtable.ArrayPile) for p in array_dealt)
+    card = dealt[0].pop()
+    array_pile.push(card)
+    pile.push(card)
+    assert array_pile.peek() is pile.peek()
+    split = pile.split(3)
+    array_split = array_pile.split(3)
+    assert [len(p) for p in array_split] == [len(p) for p in split] == cardtable.split_sizes(len(cards) - 3 - 11 - 20 + 1, 3)
+    assert [p.cards for p in array_split] == [p.cards for p in split]
+    assert len(array_pile) == len(pile) == 0
+    array_pile.add(array_split[0])
+    array_pile.add(split[1])
+    assert len(array_split[0]) == 0 and len(split[1]) == 0
+    assert array_pile.cards == split[0].cards + array_split[1].cards
+    with pytest.raises(ValueError):
+        array_pile.deal(len(array_pile) + 1)
+
+def test_array_pile_buffer():
+    cards = cardtable.Pack("B1").cards
+    pile = cardtable.ArrayPile()
+    for card in cards:
+        version = pile.version
+        pile.push(card)
+        assert pile.version > version
+    assert pile.cards == cards
+    table = [1] * cardtable.NUM_FACES
+    assert pile.get_face_total(table) == len(cards)
+    # Drawn and cloned cards aren't written over by later pushes
+    drawn = pile.draw_pile(5)
+    clone = pile.clone()
+    version = pile.version
+    assert pile.pop() is cards[-6]
+    assert pile.version > version
+    assert pile.get_face_total(table) == len(cards) - 6
+    pile.add(cards[:7])
+    assert drawn.cards == cards[-5:][::-1]
+    assert clone.cards == cards[:-5]
+    clone.push(cards[0])
+    assert pile.cards == cards[:-6] + cards[:7]
+    class SubPile(cardtable.ArrayPile):
+        pass
+    assert type(SubPile(cards).clone()) is SubPile
+    # Nor are the shared arrays of a Shoe
+    shoe = cardtable.Shoe(1)
+    shoe_pile = shoe.get_pile(pile_cls = cardtable.ArrayPile)
+    shoe_pile.pop()
+    shoe_pile.push(cards[0])
+    assert shoe.get_pile(pile_cls = cardtable.ArrayPile).cards == list(shoe.cards)
+
+def assert_meld_index_matches_scan(group, method):
+    melds = group.get_melds(method = method)
+    scanned = cardtable.Meld.get_melds(cards = group.cards, method = method)
+    assert sorted((meld.get_type(), sorted(card.id for card in meld)) for meld in melds) == \
+        sorted((meld.get_type(), sorted(card.id for card in meld)) for meld in scanned)
+    assert group.count_wilds() == cardtable.Card.count_wilds(group.cards)
+    for meld in scanned:
+        assert group.includes_meld_type(meld.get_type(), method = method)
+
+def test_meld_index_tracks_changes():
+    random.seed(2)
+    cardtable.Modifiers.set_wild_ranks([cardtable.Rank.TWO, cardtable.Rank.JOKER])
+    deck = cardtable.Pile(cards = cardtable.Pack("B1").cards + cardtable.Pack("R1").cards)
+    deck.shuffle(method = cardtable.Pile.PERFECT_SHUFFLE)
+    hand = cardtable.Hand(deck.draw(10))
+    fan = cardtable.Fan()
+    for step in range(200):
+        for method in [cardtable.Meld.RANK, cardtable.Meld.RANKCOLOR]:
+            for group in [hand, fan, deck]:
+                assert_meld_index_matches_scan(group, method)
+        action = random.randrange(7)
+        if action == 0 and len(deck) > 3:
+            hand.add(deck.draw(3))
+        elif action == 1 and len(hand):
+            card = random.choice(hand.cards)
+            hand.remove(card)
+            fan.push(card)
+        elif action == 2 and len(hand) > 2:
+            cards = random.sample(hand.cards, 2)
+            hand.remove_cards(cards)
+            fan.add(cards)
+        elif action == 3 and len(fan):
+            deck.push(fan.pop())
+        elif action == 4:
+            hand.sort(method = cardtable.Meld.RANK)
+        elif action == 5:
+            cardtable.Modifiers.set_wild_ranks(random.choice([[cardtable.Rank.TWO, cardtable.Rank.JOKER], [cardtable.Rank.JOKER]]))
+        elif action == 6 and len(fan):
+            deck.add(fan)
+
+def tick_multi_quick_shuffle(pile, players, iterations = 1, seconds = 120):
+    """ Reference multi_quick_shuffle that steps the clock one second at a time """
+    piles = pile.split(len(players))
+    state = {player: [None, None] for player in players} # pile, done_time
+    while seconds > 0:
+        for player in players:
+            if state[player][0] == None or state[player][1] >= seconds:
+                old_pile = None
+                if state[player][0]:
+                    if state[player][0].count() < 30:
+                        old_pile = state[player][0]
+                        state[player][0] = None
+                    else:
+                        old_pile = state[player][0].split(2, include_current = True)[0]
+                if len(piles) > 0:
+                    new_pile = random.choice(piles)
+                    max_count = 40 if state[player][0] else 80
+                    if new_pile.count() < max_count:
+                        piles.remove(new_pile)
+                    else:
+                        new_pile = new_pile.split(2, include_current = True)[0]
+                    if state[player][0]:
+                        state[player][0].add(new_pile)
+                    else:
+                        state[player][0] = new_pile
+                    state[player][0].shuffle(precision = player.precision, iterations = iterations)
+                    state[player][1] = seconds - (max(1, int((5 + 10 * iterations) / player.speed))) - random.normalvariate(0, 3)
+                if old_pile: piles.append(old_pile)
+        seconds -= 1
+    for player in players:
+        if state[player][0] is not None:
+            piles.append(state[player][0])
+    for p in piles:
+        pile.add(p)
+
+def ks_statistic(a, b) -> float:
+    values = np.sort(np.concatenate((a, b)))
+    cdf_a = np.searchsorted(np.sort(a), values, side = "right") / len(a)
+    cdf_b = np.searchsorted(np.sort(b), values, side = "right") / len(b)
+    return np.abs(cdf_a - cdf_b).max()
+
+def test_multi_quick_shuffle_matches_tick_loop():
+    random.seed(1)
+    cards = [card for back in ["B1", "R1", "B2", "R2", "B3"] for card in cardtable.Pack(back).cards]
+    players = [cardtable.Player(precision = precision, speed = speed) for precision, speed in [(5, 1.2), (10, 1), (7, 1), (15, .9)]]
+    original_idx = {card: idx for idx, card in enumerate(cards)}
+    trials = 150
+    stats = np.zeros((2, trials, 2))
+    for trial in range(trials):
+        for idx in range(2):
+            pile = cardtable.Pile(cards = list(cards))
+            if idx == 0:
+                pile.multi_quick_shuffle(players = players, seconds = 60)
+            else:
+                tick_multi_quick_shuffle(pile, players, seconds = 60)
+            assert sorted(card.id for card in pile.cards) == sorted(card.id for card in cards)
+            # Where each card ended up, in original order
+            positions = np.argsort([original_idx[card] for card in pile.cards])
+            stats[idx, trial, 0] = np.abs(positions - np.arange(len(cards))).mean()
+            stats[idx, trial, 1] = np.count_nonzero(np.diff(positions) < 0) # Rising sequences - 1
+    # Two-sample Kolmogorov-Smirnov test at alpha = 0.001
+    critical = 1.95 * np.sqrt(2 / trials)
+    for stat in range(2):
+        assert ks_statistic(stats[0, :, stat], stats[1, :, stat]) < critical
+
+def test_multi_quick_shuffle_many_players():
+    cards = [card for idx in range(12) for card in cardtable.Pack("M" + str(idx)).cards]
+    pile = cardtable.Pile(cards = list(cards))
+    pile.multi_quick_shuffle(num_players = 30, seconds = 20 * 60)
+    assert sorted(card.id for card in pile.cards) == sorted(card.id for card in cards)
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -3,6 +3,7 @@
 import os
 import sys
 import logging
+import subprocess
 import pytest
 
 from context import handnfoot
@@ -18,17 +19,55 @@ def test_card_points():
     assert game.get_card_points(cardtable.Card(cardtable.Rank.THREE, cardtable.Suit.HEARTS)) == -300
     assert game.get_card_points(cardtable.Card(cardtable.Rank.JOKER, cardtable.Suit.RED)) == 50
 
+def test_get_points():
+    game = handnfoot.HNFGame()
+    cp = cardtable.Card.parse
+    cards = [cp("3H"), cp("KD"), cardtable.Card(cardtable.Rank.JOKER, cardtable.Suit.RED)]
+    assert game.get_points(cards) == -240
+    assert game.get_points(cardtable.Hand(cards)) == -240
+    assert game.get_points(cardtable.Meld(cards = cards[1:])) == 60
+    with pytest.raises(TypeError):
+        game.get_points(None)
+
+def test_running_scores():
+    game = handnfoot.HNFGame(seed = 8)
+    for name in ["J", "S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy())
+    game.start()
+    for turn in range(60):
+        if game.round_complete:
+            break
+        game.play_turn(game.players[turn % len(game.players)])
+        game.check_scores()
+    game.players[0].get_hand().cards.append(cardtable.Card.parse("AS")) # Behind the running totals' back
+    with pytest.raises(ValueError):
+        game.check_scores()
+
 def test_card_is_wild():
     rules = handnfoot.HNFRules()
-    assert (cardtable.Card(cardtable.Rank.JOKER, cardtable.Suit.RED)).is_wild() == True
-    assert (cardtable.Card(cardtable.Rank.TWO, cardtable.Suit.SPADES)).is_wild() == True
-    assert (cardtable.Card(cardtable.Rank.TWO, cardtable.Suit.HEARTS)).is_wild() == True
-    assert (cardtable.Card(cardtable.Rank.THREE, cardtable.Suit.DIAMONDS)).is_wild() == False
-    assert (cardtable.Card(cardtable.Rank.KING, cardtable.Suit.CLUBS)).is_wild() == False
-    assert (cardtable.Card(cardtable.Rank.ACE, cardtable.Suit.HEARTS)).is_wild() == False
+    modifiers = rules.modifiers
+    assert (cardtable.Card(cardtable.Rank.JOKER, cardtable.Suit.RED)).is_wild(modifiers) == True
+    assert (cardtable.Card(cardtable.Rank.TWO, cardtable.Suit.SPADES)).is_wild(modifiers) == True
+    assert (cardtable.Card(cardtable.Rank.TWO, cardtable.Suit.HEARTS)).is_wild(modifiers) == True
+    assert (cardtable.Card(cardtable.Rank.THREE, cardtable.Suit.DIAMONDS)).is_wild(modifiers) == False
+    assert (cardtable.Card(cardtable.Rank.KING, cardtable.Suit.CLUBS)).is_wild(modifiers) == False
+    assert (cardtable.Card(cardtable.Rank.ACE, cardtable.Suit.HEARTS)).is_wild(modifiers) == False
 
-def test_get_card_desirability():
+def test_games_have_own_modifiers():
     game = handnfoot.HNFGame()
+    other = handnfoot.HNFGame()
+    other.modifiers.set_wild_ranks([cardtable.Rank.JOKER])
+    two = cardtable.Card(cardtable.Rank.TWO, cardtable.Suit.SPADES)
+    assert two.is_wild(game.modifiers)
+    assert not two.is_wild(other.modifiers)
+    hand = cardtable.Hand([two, cardtable.Card(cardtable.Rank.TWO, cardtable.Suit.HEARTS)])
+    assert hand.count_wilds(game.modifiers) == 2
+    assert hand.count_wilds(other.modifiers) == 0
+    assert hand.count_wilds(game.modifiers) == 2
+
+def test_get_card_desirability():
+    # The dealt hand counts too, so deal the same one every run
+    game = handnfoot.HNFGame(seed = 0)
     player = cardtable.Player("J", precision=5, speed=1.2)
     strategy = handnfoot.Strategy()
     game.add_player(player, strategy)
@@ -43,7 +82,8 @@ def test_get_card_desirability():
     assert (strategy.get_card_desirability(cp("9H"), player) < strategy.get_card_desirability(cp("AH"), player))
 
 def test_sort_by_desirability():
-    game = handnfoot.HNFGame()
+    # The dealt hand counts too, so deal the same one every run
+    game = handnfoot.HNFGame(seed = 0)
     player = cardtable.Player("J", precision=5, speed=1.2)
     strategy = handnfoot.Strategy()
     game.add_player(player, strategy)
@@ -58,5 +98,200 @@ def test_sort_by_desirability():
     print(sorted_cards)
     assert cardtable.cards_to_str(sorted_cards) == cardtable.cards_to_str(expected)
 
+def test_evaluation():
+    game = handnfoot.HNFGame(seed = 3)
+    for name in ["J", "S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy())
+    game.start()
+    for turn in range(30):
+        game.play_turn(game.players[turn % len(game.players)])
+    player = game.players[0]
+    strategy = player.strategy
+    evaluation = strategy.get_evaluation(player)
+    for card in cardtable.Pack().cards:
+        assert evaluation.get_desirability(card) == strategy.get_card_desirability(card, player)
+    # Reused until the hand changes
+    assert strategy.get_evaluation(player) is evaluation
+    player.get_hand().add([cardtable.Card.parse("KD")])
+    assert strategy.get_evaluation(player) is not evaluation
+    # And with other parameters
+    strategy = handnfoot.Strategy(prefer_high = False, pair_tier = 500, wild_tier = 9500)
+    evaluation = strategy.get_evaluation(player)
+    for card in cardtable.Pack().cards:
+        assert evaluation.get_desirability(card) == strategy.get_card_desirability(card, player)
+
+def test_strategy_params():
+    strategy = handnfoot.Strategy(laydown_dirty = False, draw_from = handnfoot.Strategy.DRAW_FOOT_SOURCE)
+    params = strategy.get_params()
+    assert params["laydown_dirty"] == False
+    assert params["safe_when_hand_gt"] is None
+    assert handnfoot.Strategy(**params).get_params() == params
+    game = handnfoot.HNFGame(seed = 2)
+    for name in ["J", "S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy(**params))
+    game.start()
+    for idx, player in enumerate(game.players):
+        assert {player.hnf_hand_source, player.hnf_foot_source} == {(idx - 1) % 4, (idx + 1) % 4}
+        assert player.strategy.choose_draw_pile(player) == player.hnf_foot_source
+        player.strategy.draw_from = handnfoot.Strategy.DRAW_CURRENT_SOURCE
+        assert player.strategy.choose_draw_pile(player) == player.hnf_hand_source
+        player.strategy.draw_from = handnfoot.Strategy.DRAW_CLOSEST
+        assert player.strategy.choose_draw_pile(player) == idx
+    for turn in range(40):
+        if game.round_complete:
+            break
+        game.play_turn(game.players[turn % len(game.players)])
+    game.check_scores()
+    # Random draws come from the strategy's own rng, not the game's
+    strategy = handnfoot.Strategy(draw_from = handnfoot.Strategy.DRAW_RANDOM, seed = 3)
+    player = game.players[0]
+    rng_state = game.get_rng_state()
+    choices = [strategy.choose_draw_pile(player) for _ in range(8)]
+    assert game.get_rng_state() == rng_state
+    again = handnfoot.Strategy(draw_from = handnfoot.Strategy.DRAW_RANDOM, seed = 3)
+    assert [again.choose_draw_pile(player) for _ in range(8)] == choices
+    # With no seed it is spawned from the game's, so games still repeat
+    results = []
+    for _ in range(2):
+        game = handnfoot.HNFGame(seed = 4)
+        for name in ["J", "S", "L", "A"]:
+            game.add_player(cardtable.Player(name), handnfoot.Strategy(draw_from = handnfoot.Strategy.DRAW_RANDOM))
+        results.append(game.run_game())
+    assert results[0] == results[1]
+
+def test_hand_summary():
+    game = handnfoot.HNFGame()
+    player = cardtable.Player("J")
+    game.add_player(player, handnfoot.Strategy())
+    cp = cardtable.Card.parse
+    player.get_area("hand").append(cardtable.Hand([cp("KD"), cp("5S"), cp("2C"), cp("5H"), cp("KS"), cp("9C"), cp("5D"), cp("2H")]))
+    player.get_area("down").append(cardtable.Fan([cp("9H"), cp("9D"), cp("9S")]))
+    summary = handnfoot.HandSummary(player, game.modifiers)
+    five, nine, king = [cp(card).get_meld_type(modifiers = game.modifiers) for card in ["5C", "9C", "KC"]]
+    assert summary.counts[five] == 3
+    assert summary.wild_count == 2
+    assert (summary.singletons, summary.pairs, summary.ready) == ({nine}, {king}, {five})
+    assert summary.played == {nine}
+    assert summary.get_types([king, nine, five]) == [five, nine, king]
+    player.get_hand().sort(method = cardtable.Meld.RANK)
+    assert summary.get_cards() == player.get_hand().cards
+    assert summary.get_wilds() == [cp("2C"), cp("2H")]
+    summary.lay_down([cp("KD"), cp("2H")], king)
+    assert summary.wild_count == 1
+    assert (summary.singletons, summary.pairs, summary.ready) == ({nine, king}, set(), {five})
+    assert summary.played == {nine, king}
+    assert list(summary.get_meld(five)) == [cp("5S"), cp("5H"), cp("5D")]
+
+def play_seeded_round(seed, turns = 40) -> str:
+    game = handnfoot.HNFGame(seed = seed)
+    for name in ["J", "S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy())
+    game.start()
+    for turn in range(turns):
+        if game.round_complete:
+            break
+        game.play_turn(game.players[turn % len(game.players)])
+    return " ".join(str(group) for player in game.players for area in player.areas for group in area.groups)
+
+def test_seeded_games_repeat():
+    assert play_seeded_round(5) == play_seeded_round(5)
+    assert play_seeded_round(5) != play_seeded_round(6)
+    seeds = handnfoot.spawn_seeds(5, count = 2)
+    assert play_seeded_round(seeds[1]) == play_seeded_round(handnfoot.spawn_seeds(5, count = 2)[1])
+    assert play_seeded_round(seeds[0]) != play_seeded_round(seeds[1])
+
+def play_seeded_game(seed) -> handnfoot.GameResult:
+    game = handnfoot.HNFGame(seed = seed)
+    for name in ["J", "S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy())
+    return game.run_game()
+
+def test_run_game():
+    result = play_seeded_game(5)
+    assert result == play_seeded_game(5)
+    assert len(result.round_turns) == handnfoot.NUM_ROUNDS
+    assert len(result.round_scores) == handnfoot.NUM_ROUNDS
+    assert all(len(scores) == 4 for scores in result.round_scores)
+    assert result.scores == tuple(sum(scores) for scores in zip(*result.round_scores))
+    assert result.scores[result.winner] == max(result.scores)
+    assert result.seed == (5, ())
+    game = handnfoot.HNFGame(seed = 5)
+    game.add_player(cardtable.Player("J"), handnfoot.Strategy())
+    game.start()
+    with pytest.raises(ValueError):
+        game.run_game()
+
+def mid_round_game(seed = 4, turns = 24, **params) -> handnfoot.HNFGame:
+    game = handnfoot.HNFGame(seed = seed)
+    for name in ["J", "S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy(**params))
+    game.start()
+    for turn in range(turns):
+        game.play_turn(game.players[turn % len(game.players)])
+    return game
+
+def game_state(game) -> str:
+    return " ".join(str(group) for area in game.table.areas for group in area.groups) \
+        + " ".join(f"{player.hnf_in_foot}{player.hnf_is_down} " + " ".join(str(group) for area in player.areas for group in area.groups) for player in game.players)
+
+def play_on(game, turns = 40) -> str:
+    for turn in range(turns):
+        if game.round_complete:
+            break
+        game.play_turn(game.players[turn % len(game.players)])
+    while game.round < handnfoot.NUM_ROUNDS:
+        game.run_round()
+    return game_state(game)
+
+def test_clone():
+    game = mid_round_game()
+    before = game_state(game)
+    clone = game.clone()
+    assert game_state(clone) == before
+    assert all(player.game is clone for player in clone.players)
+    assert clone.table.players == clone.players
+    # Playing on the clone leaves the game as it was, and plays as the game would
+    after = play_on(clone)
+    assert game_state(game) == before
+    clone.check_scores()
+    assert play_on(game) == after
+    # Strategies with rngs of their own too
+    game = mid_round_game(draw_from = handnfoot.Strategy.DRAW_RANDOM)
+    clone = game.clone()
+    assert clone.players[0].strategy is not game.players[0].strategy
+    after = play_on(clone)
+    assert play_on(game) == after
+    assert play_on(mid_round_game(draw_from = handnfoot.Strategy.DRAW_RANDOM)) == after
+
+def test_snapshot_restore():
+    game = mid_round_game()
+    before = game_state(game)
+    snapshot = game.snapshot()
+    assert isinstance(snapshot, bytes)
+    after = play_on(game)
+    game.restore(snapshot)
+    assert game_state(game) == before
+    game.check_scores()
+    assert play_on(game) == after
+    # Into another game with the same players
+    other = handnfoot.HNFGame()
+    for name in ["J", "S", "L", "A"]:
+        other.add_player(cardtable.Player(name), handnfoot.Strategy())
+    other.restore(snapshot)
+    assert game_state(other) == before
+    assert play_on(other) == after
+    with pytest.raises(ValueError):
+        handnfoot.HNFGame().restore(snapshot)
+    # Snapshots are plain JSON and only make card groups
+    assert snapshot.startswith(b"[")
+    with pytest.raises(ValueError):
+        other.restore(snapshot.replace(b'"Hand"', b'"Table"'))
+
+def test_import_has_no_side_effects():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    code = "import sys; sys.path.insert(0, sys.argv[1]); import handnfoot.handnfoot; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code, root], capture_output = True, text = True, check = True)
+    assert result.stdout == "False\n"
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import itertools
+import pytest
+import numpy as np
+
+from context import cardtable
+from context import metrics
+from context import shuffling
+
+def test_rising_sequences():
+    assert metrics.rising_sequences(np.arange(10)).tolist() == [1]
+    assert metrics.rising_sequences(np.arange(10)[::-1]).tolist() == [10]
+    # Interleaving two halves gives two rising sequences
+    assert metrics.rising_sequences([[0, 5, 1, 6, 2, 7, 3, 8, 4, 9]]).tolist() == [2]
+
+def test_rising_sequence_distribution():
+    count = 5
+    observed = np.bincount(metrics.rising_sequences(list(itertools.permutations(range(count)))), minlength = count + 1)
+    assert np.allclose(metrics.rising_sequence_distribution(count), observed / observed.sum())
+
+def test_rising_sequence_tv():
+    rng = np.random.default_rng(1)
+    decks = shuffling.new_decks(20000, 54)
+    assert metrics.rising_sequence_tv(decks) == pytest.approx(1.0)
+    assert metrics.rising_sequence_tv(shuffling.perfect_shuffle(decks, rng = rng)) < 0.1
+    one_riffle = metrics.rising_sequence_tv(shuffling.riffle_shuffle(decks, iterations = 1, rng = rng))
+    assert one_riffle == pytest.approx(1.0)
+
+def test_position_metrics():
+    rng = np.random.default_rng(2)
+    decks = shuffling.new_decks(20000, 20)
+    assert metrics.position_drift(decks).tolist() == [0.0] * 20000
+    assert metrics.position_tv(decks) == pytest.approx(1 - 1 / 20)
+    shuffled = shuffling.perfect_shuffle(decks, rng = rng)
+    assert metrics.position_drift(shuffled).mean() == pytest.approx(metrics.expected_position_drift(20), rel = 0.02)
+    assert metrics.position_tv(shuffled) < 0.05
+
+def test_adjacent_same_rank_rate():
+    ids = cardtable.card_ids(cardtable.Pack("B1").cards)
+    ranks = metrics.card_ranks(ids)
+    assert ranks[:4].tolist() == [cardtable.Rank.ACE.value] * 4
+    # Packs are built rank by rank, so 3 of every 4 neighbours match
+    assert metrics.adjacent_same_rank_rate(ranks)[0] == pytest.approx((13 * 3 + 1) / 53)
+    assert metrics.expected_adjacent_same_rank_rate(ranks) == pytest.approx((13 * 4 * 3 + 2) / (54 * 53))
+    positions = metrics.positions_from_ids(ids[::-1], ids)
+    assert positions.tolist() == list(range(54))[::-1]
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import pytest
+
+from context import cardtable
+from context import handnfoot
+from context import rollout
+
+def mid_round_game(strategy, turns = 12, seed = 6) -> handnfoot.HNFGame:
+    game = handnfoot.HNFGame(seed = seed)
+    game.add_player(cardtable.Player("R"), strategy)
+    for name in ["S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy())
+    game.start()
+    for turn in range(turns):
+        game.play_turn(game.players[turn % len(game.players)])
+    return game
+
+def game_state(game) -> str:
+    return " ".join(str(group) for area in game.table.areas for group in area.groups) \
+        + " ".join(str(group) for player in game.players for area in player.areas for group in area.groups)
+
+def test_choose_discard():
+    strategy = rollout.RolloutStrategy(rollouts = 8, depth = 4, seed = 1)
+    game = mid_round_game(strategy)
+    player = game.players[0]
+    cards = sorted(player.get_hand().cards, key = handnfoot.HandSummary.sort_key)
+    candidates = strategy.get_candidates(cards, player)
+    # Seed 6 deals a hand with a full set of candidates by then
+    assert len(candidates) == strategy.candidates
+    assert len({card.face for card in candidates}) == len(candidates)
+    before = game_state(game)
+    done = strategy.rollouts_done
+    card = strategy.choose_discard(cards, player)
+    assert card in candidates
+    # Rollouts play on copies
+    assert game_state(game) == before
+    assert strategy.rollouts_done == done + 8
+    # Same seed, same choice
+    again = rollout.RolloutStrategy(rollouts = 8, depth = 4, seed = 1)
+    assert again.choose_discard(cards, mid_round_game(again).players[0]) == card
+
+def test_choose_lay_down():
+    strategy = rollout.RolloutStrategy(rollouts = 8, depth = 4, seed = 1)
+    # Seed 1 has cards to lay down after the draw on turn 12
+    game = mid_round_game(strategy, seed = 1)
+    player = game.players[0]
+    game.draw(player)
+    before = game_state(game)
+    done = strategy.rollouts_done
+    lay_down = strategy.choose_lay_down(player)
+    assert lay_down in (True, False)
+    assert game_state(game) == before
+    assert strategy.rollouts_done == done + 8
+    again = rollout.RolloutStrategy(rollouts = 8, depth = 4, seed = 1)
+    game = mid_round_game(again, seed = 1)
+    game.draw(game.players[0])
+    assert again.choose_lay_down(game.players[0]) == lay_down
+    # Holding lays nothing down
+    hand_size = len(player.get_hand())
+    down = str(player.get_area("down").groups)
+    game = player.game
+    game.finish_turn(player, lay_down = False)
+    assert len(player.get_hand()) == hand_size - 1
+    assert str(player.get_area("down").groups) == down
+    # Nothing to decide when the default policy would lay nothing down
+    strategy = rollout.RolloutStrategy(rollouts = 8, depth = 4, seed = 1)
+    game = mid_round_game(strategy)
+    game.draw(game.players[0])
+    done = strategy.rollouts_done
+    assert strategy.choose_lay_down(game.players[0]) == True
+    assert strategy.rollouts_done == done
+
+def test_params():
+    strategy = rollout.RolloutStrategy(rollouts = 8, depth = 4, seed = 1)
+    params = strategy.get_params()
+    assert params == {"rollouts": 8, "time_budget": None, "candidates": 4, "depth": 4, "seed": 1}
+    assert rollout.RolloutStrategy(**params).get_params() == params
+
+def test_budgets():
+    with pytest.raises(ValueError):
+        rollout.RolloutStrategy(rollouts = None)
+    strategy = rollout.RolloutStrategy(rollouts = None, time_budget = 0.0, seed = 1)
+    game = mid_round_game(strategy)
+    player = game.players[0]
+    cards = player.get_hand().cards
+    assert strategy.choose_discard(cards, player) == strategy.get_candidates(cards, player)[0]
+    assert strategy.rollouts_done == 0
+
+def test_rollout_game():
+    strategy = rollout.RolloutStrategy(rollouts = 4, depth = 2, seed = 2)
+    game = handnfoot.HNFGame(seed = 2)
+    game.add_player(cardtable.Player("R"), strategy)
+    game.add_player(cardtable.Player("S"), handnfoot.Strategy())
+    result = game.run_game()
+    assert len(result.scores) == 2
+    game.check_scores()
+    # With no seed of its own, a game with rollouts replays from the game's seed
+    results = []
+    for _ in range(2):
+        game = handnfoot.HNFGame(seed = 2)
+        game.add_player(cardtable.Player("R"), rollout.RolloutStrategy(rollouts = 4, depth = 2))
+        game.add_player(cardtable.Player("S"), handnfoot.Strategy())
+        results.append(game.run_game())
+    assert results[0] == results[1]
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import random
+import pytest
+import numpy as np
+
+from context import cardtable
+from context import shuffling
+
+def test_riffle_order_is_permutation():
+    rng = np.random.default_rng(1)
+    for count in [0, 1, 2, 3, 54, 270, 1000]:
+        order = shuffling.riffle_order(count, iterations = 7, precision = 10, rng = rng)
+        assert sorted(order.tolist()) == list(range(count))
+
+def test_riffle_order_precision_one_matches_riffle_shuffle():
+    cards = cardtable.Pack("B1").cards
+    pile = cardtable.Pile(cards = list(cards))
+    pile.riffle_shuffle(iterations = 3, precision = 1)
+    vector_pile = cardtable.Pile(cards = list(cards))
+    vector_pile.shuffle(iterations = 3, precision = 1, method = cardtable.Pile.VECTOR_RIFFLE_SHUFFLE)
+    assert vector_pile.cards == pile.cards
+
+def test_riffle_order_matches_riffle_shuffle_distribution():
+    count = 20
+    trials = 4000
+    random.seed(1)
+    rng = np.random.default_rng(1)
+    positions = np.zeros((2, count))
+    for _ in range(trials):
+        pile = cardtable.Pile(cards = list(range(count)))
+        pile.riffle_shuffle(iterations = 1, precision = 4)
+        positions[0, pile.cards] += np.arange(count)
+        positions[1, shuffling.riffle_order(count, iterations = 1, precision = 4, rng = rng)] += np.arange(count)
+    positions /= trials
+    # Standard error of each mean position is under 0.1
+    assert np.abs(positions[0] - positions[1]).max() < 0.6
+
+def test_vector_riffle_shuffle_large_pile():
+    cards = [card for back in ["B1", "R1", "B2", "R2", "B3"] for card in cardtable.Pack(back).cards]
+    for pile in [cardtable.Pile(cards = list(cards)), cardtable.ArrayPile(cards = list(cards))]:
+        pile.shuffle(method = cardtable.Pile.VECTOR_RIFFLE_SHUFFLE)
+        assert len(pile) == len(cards)
+        assert sorted(card.id for card in pile.cards) == sorted(card.id for card in cards)
+        assert pile.cards != cards
+
+def test_shuffle_decks_batches():
+    rng = np.random.default_rng(2)
+    decks = shuffling.new_decks(500, 54)
+    for method in [shuffling.PERFECT_SHUFFLE, shuffling.RIFFLE_SHUFFLE, shuffling.OVERHAND_SHUFFLE]:
+        shuffled = shuffling.shuffle_decks(decks, method = method, iterations = 3, precision = 8, rng = rng)
+        assert shuffled.shape == decks.shape
+        assert (np.sort(shuffled, axis = 1) == decks).all()
+        assert len(np.unique(shuffled, axis = 0)) == len(decks) # Each row shuffled independently
+    assert (decks == np.arange(54)).all() # Input is left alone
+    with pytest.raises(ValueError):
+        shuffling.shuffle_decks(decks, method = cardtable.Pile.MULTI_QUICK_SHUFFLE)
+
+def test_overhand_shuffle():
+    decks = shuffling.new_decks(3, 10)
+    # Packets of one card reverse the deck
+    assert (shuffling.overhand_shuffle(decks, iterations = 1, precision = 1) == decks[:, ::-1]).all()
+    pile = cardtable.Pile(cards = list(range(10)))
+    pile.shuffle(iterations = 2, precision = 1, method = cardtable.Pile.OVERHAND_SHUFFLE)
+    assert pile.cards == list(range(10))
+
+def test_riffle_shuffle_batch_matches_single_deck():
+    # Blocks of decks and single decks draw the same kind of riffle
+    rng = np.random.default_rng(3)
+    count = 20
+    batch = shuffling.riffle_shuffle(shuffling.new_decks(4000, count), iterations = 1, precision = 4, rng = rng)
+    singles = np.array([shuffling.riffle_order(count, iterations = 1, precision = 4, rng = rng) for _ in range(4000)])
+    positions = np.argsort(batch, axis = 1).mean(axis = 0)
+    single_positions = np.argsort(singles, axis = 1).mean(axis = 0)
+    assert np.abs(positions - single_positions).max() < 0.6
+
+if __name__ == "__main__":
+    pytest.main([__file__])
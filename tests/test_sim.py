@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import pytest
+
+from context import handnfoot
+from context import sim
+
+def test_game_seed():
+    config = sim.GameConfig(seed = 7, num_games = 3)
+    seeds = handnfoot.spawn_seeds(7, count = 3)
+    assert [sim.game_seed(config, idx).generate_state(4).tolist() for idx in range(3)] \
+        == [seed.generate_state(4).tolist() for seed in seeds]
+    with pytest.raises(ValueError):
+        sim.game_seed(sim.GameConfig(), 0)
+
+def test_new_game():
+    config = sim.GameConfig(players = (("J", 5, 1.2), ("S",)), rules = {"allow_melds_of_threes": False}, seed = 1)
+    game = sim.new_game(config, 0)
+    assert [player.name for player in game.players] == ["J", "S"]
+    assert game.players[0].precision == 5
+    assert game.rules.allow_melds_of_threes == False
+    with pytest.raises(ValueError):
+        sim.new_game(config._replace(rules = {"no_such_rule": 1}), 0)
+    with pytest.raises(ValueError):
+        sim.new_game(config._replace(strategies = (handnfoot.Strategy(),)), 0)
+
+def test_simulate():
+    config = sim.GameConfig(seed = 3, num_games = 8)
+    stats = sim.simulate(config, workers = 1, chunk_size = 3)
+    assert stats.games == 8
+    assert sum(stats.wins) == 8
+    assert sum(stats.win_rates()) == pytest.approx(1.0)
+    assert all(sum(histogram.values()) == 8 for histogram in stats.score_histograms)
+    assert len(stats.mean_round_turns()) == handnfoot.NUM_ROUNDS
+    # Game by game, the same games give the same stats
+    expected = sim.SimStats(len(config.players))
+    for idx in range(config.num_games):
+        expected.add(sim.new_game(config, idx).run_game())
+    assert stats.wins == expected.wins
+    assert stats.score_sums == expected.score_sums
+    assert stats.round_turns == expected.round_turns
+    # And so does a pool with other chunks
+    pooled = sim.simulate(config, workers = 2, chunk_size = 2)
+    assert pooled.wins == stats.wins
+    assert pooled.score_squares == stats.score_squares
+    assert pooled.score_histograms == stats.score_histograms
+
+def test_simulate_random_strategies():
+    # Strategies with their own rng still give the same games however they are split
+    strategies = tuple(handnfoot.Strategy(draw_from = handnfoot.Strategy.DRAW_RANDOM) for _ in range(4))
+    config = sim.GameConfig(strategies = strategies, seed = 1, num_games = 4)
+    stats = sim.simulate(config, workers = 1)
+    pooled = sim.simulate(config, workers = 2, chunk_size = 1)
+    assert pooled.score_sums == stats.score_sums
+    assert pooled.wins == stats.wins
+    assert strategies[0]._rng is None
+
+def test_iter_stats():
+    counts = [stats.games for stats in sim.iter_stats(sim.GameConfig(num_games = 5), workers = 1, chunk_size = 2)]
+    assert counts == [2, 4, 5]
+
+if __name__ == "__main__":
+    pytest.main([__file__])
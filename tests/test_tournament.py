@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import pytest
+
+from context import handnfoot
+from context import tournament
+
+class WorstDiscard(handnfoot.Strategy):
+    """ Throws away its most desirable card """
+    def choose_discard(self, cards, player):
+        return self.sort_by_desirability(cards, player)[0]
+
+def stats_of(differences, looks = 1) -> tournament.TournamentStats:
+    stats = tournament.TournamentStats()
+    stats.differences.extend(differences)
+    stats.looks = looks
+    return stats
+
+def test_seating():
+    config = tournament.TournamentConfig(strategies = (handnfoot.Strategy(), WorstDiscard()))
+    assert tournament.seating(config, 0) == [0, 1, 0, 1]
+    assert tournament.seating(config, 1) == [1, 0, 1, 0]
+    assert tournament.seating(config._replace(seats = 3), 1) == [1, 0, 1]
+
+def test_play_match():
+    # The same strategy in every seat plays the same games in both seatings
+    config = tournament.TournamentConfig(strategies = (handnfoot.Strategy(), handnfoot.Strategy()), seats = 2, seed = 1)
+    assert [tournament.play_match(config, idx) for idx in range(2)] == [0.0, 0.0]
+    config = config._replace(strategies = (handnfoot.Strategy(), WorstDiscard()))
+    assert tournament.play_match(config, 0) == -tournament.play_match(config._replace(strategies = config.strategies[::-1]), 0)
+
+def test_racing():
+    rule = tournament.Racing(min_difference = 100, min_matches = 4)
+    assert rule.decide(stats_of([500, 600, 400])) is None
+    assert rule.decide(stats_of([500, 600, 400, 550])) == tournament.A_BETTER
+    assert rule.decide(stats_of([-500, -600, -400, -550])) == tournament.B_BETTER
+    assert rule.decide(stats_of([10, -10, 5, -5])) == tournament.TIED
+    assert rule.decide(stats_of([1000, -1000, 900, -950])) is None
+    # A narrow interval about a difference near min_difference isn't a tie
+    assert rule.decide(stats_of([200, -80] * 8)) is None
+    # Later looks need more evidence
+    assert rule.decide(stats_of([100, 200, 50, 150], looks = 1)) == tournament.A_BETTER
+    assert rule.decide(stats_of([100, 200, 50, 150], looks = 100)) is None
+    assert 150 < rule.fixed_matches(stats_of([500, -500] * 10)) < 250
+
+def test_sprt():
+    rule = tournament.SPRT(min_difference = 100, min_matches = 4)
+    assert rule.decide(stats_of([300, 200, 250, 150] * 2)) == tournament.A_BETTER
+    assert rule.decide(stats_of([-100, 50, 0, -50] * 2)) == tournament.TIED
+    assert rule.decide(stats_of([900, -700, 800, -900])) is None
+    # Both ways round
+    assert rule.decide(stats_of([-300, -200, -250, -150] * 2)) == tournament.B_BETTER
+    assert rule.llr(stats_of([-300, -200]), tournament.B_BETTER) == rule.llr(stats_of([300, 200]), tournament.A_BETTER)
+
+def test_run_tournament():
+    config = tournament.TournamentConfig(strategies = (handnfoot.Strategy(), WorstDiscard()), seats = 2, seed = 1, batch_size = 5, max_matches = 40)
+    stats = tournament.run_tournament(config, workers = 1)
+    assert stats.decision == tournament.A_BETTER
+    assert stats.matches < config.max_matches
+    assert stats.matches % config.batch_size == 0
+    assert stats.games == 2 * stats.matches
+    # Looks are between batches, so the number of workers doesn't matter
+    pooled = tournament.run_tournament(config, workers = 2)
+    assert pooled.differences == stats.differences
+    # Undecided at max_matches
+    tied = tournament.run_tournament(config._replace(strategies = (handnfoot.Strategy(), handnfoot.Strategy()), max_matches = 7),
+        rule = tournament.Racing(min_difference = 0), workers = 1)
+    assert (tied.matches, tied.looks, tied.decision) == (7, 2, None)
+    with pytest.raises(ValueError):
+        tournament.run_tournament(config._replace(strategies = (handnfoot.Strategy(),)), workers = 1)
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import pytest
+
+from context import cardtable
+from context import handnfoot
+from context import trace
+
+def test_event_str():
+    cards = tuple(cardtable.Card.parse(card) for card in ["QD", "QH"])
+    assert str(trace.Draw("J", cards)) == "Player J draws [QD[QH]"
+    meld_type = cards[0].get_meld_type(method = cardtable.Meld.RANK)
+    assert str(trace.LayDown("J", cards, meld_type)) == "Player J lays down [QD[QH] of type Q"
+    assert str(trace.Discard("J", cards[0], ())) == "Player J discards QD leaving [Empty]"
+    assert str(trace.RoundEnd(2, None)) == "Round 2 stopped"
+
+def test_tracer():
+    tracer = trace.Tracer(buffer_size = 2)
+    events = []
+    tracer.subscribe(events.append)
+    for round in range(3):
+        tracer.emit(trace.RoundEnd(round, "J"))
+    assert len(events) == 3
+    assert [event.round for event in tracer.buffer] == [1, 2]
+    tracer.unsubscribe(events.append)
+    tracer.emit(trace.RoundEnd(3, "J"))
+    assert len(events) == 3
+    assert trace.Tracer().buffer is None
+
+def play_game(tracer = None) -> handnfoot.GameResult:
+    game = handnfoot.HNFGame(seed = 2)
+    game.tracer = tracer
+    for name in ["J", "S", "L", "A"]:
+        game.add_player(cardtable.Player(name), handnfoot.Strategy())
+    return game.run_game()
+
+def test_game_events():
+    tracer = trace.Tracer()
+    events = []
+    tracer.subscribe(events.append)
+    # Tracing doesn't change the game
+    assert play_game(tracer) == play_game()
+    kinds = {type(event) for event in events}
+    assert {trace.Draw, trace.LayDown, trace.Discard, trace.RoundEnd} <= kinds
+    assert [event.round for event in events if isinstance(event, trace.RoundEnd)] == [1, 2, 3, 4]
+    draws = [event for event in events if isinstance(event, trace.Draw)]
+    assert all(1 <= len(event.cards) <= 2 for event in draws)
+
+if __name__ == "__main__":
+    pytest.main([__file__])
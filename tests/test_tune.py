@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import pytest
+
+from context import handnfoot
+from context import tune
+
+CONFIG = tune.TuneConfig(num_candidates = 4, min_matches = 1, eta = 2, seats = 2, seed = 1)
+
+def test_sample_candidates():
+    candidates = tune.sample_candidates(CONFIG, tune.SPACE)
+    assert len(candidates) == 4
+    assert candidates[0] == handnfoot.Strategy().get_params()
+    assert candidates == tune.sample_candidates(CONFIG, tune.SPACE)
+    for params in candidates[1:]:
+        assert all(params[name] in choices for name, choices in tune.SPACE.items())
+        handnfoot.Strategy(**params)
+
+def test_tune(tmp_path):
+    path = str(tmp_path / "study.jsonl")
+    rungs = list(tune.iter_rungs(tune.Study(CONFIG, path = path), workers = 1))
+    assert [len(ranked) for ranked in rungs] == [4, 2, 1]
+    # 4 candidates play match 0, 2 play matches 0 and 1, 1 plays matches 0 to 3
+    with open(path) as file:
+        lines = file.readlines()
+    assert len(lines) == 1 + 4 + 2 + 2
+    # The default plays itself to a draw
+    assert tune.Study(CONFIG, path = path).mean_difference(0, 1) == 0.0
+    # A stopped study resumes where it left off
+    with open(path, "w") as file:
+        file.writelines(lines[:6])
+    study = tune.Study(CONFIG, path = path)
+    assert tune.tune(study, workers = 1) == (study.candidates[rungs[-1][0][1]], rungs[-1][0][0])
+    with open(path) as file:
+        assert len(file.readlines()) == len(lines)
+    with pytest.raises(ValueError):
+        tune.Study(CONFIG._replace(seed = 2), path = path)
+
+if __name__ == "__main__":
+    pytest.main([__file__])